@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+"""add comfyui_settings version column
+
+Revision ID: 0011_comfyui_settings_version
+Revises: 0010_task_schedule_at
+Create Date: 2026-03-02 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0011_comfyui_settings_version"
+down_revision = "0010_task_schedule_at"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "comfyui_settings" not in existing_tables:
+        return
+    if not _has_column(inspector, "comfyui_settings", "version"):
+        op.add_column(
+            "comfyui_settings",
+            sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+        )
+        op.alter_column("comfyui_settings", "version", server_default=None)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "comfyui_settings" not in existing_tables:
+        return
+    if _has_column(inspector, "comfyui_settings", "version"):
+        op.drop_column("comfyui_settings", "version")
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+"""add comfyui endpoint registry and task schedule_server_ip
+
+Revision ID: 0012_comfyui_endpoint_registry
+Revises: 0011_comfyui_settings_version
+Create Date: 2026-03-03 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0012_comfyui_endpoint_registry"
+down_revision = "0011_comfyui_settings_version"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if "comfyui_settings" in existing_tables and not _has_column(inspector, "comfyui_settings", "endpoints"):
+        op.add_column(
+            "comfyui_settings",
+            sa.Column("endpoints", sa.JSON(), nullable=False, server_default=sa.text("'[]'")),
+        )
+        op.alter_column("comfyui_settings", "endpoints", server_default=None)
+
+    if "tasks" in existing_tables and not _has_column(inspector, "tasks", "schedule_server_ip"):
+        op.add_column("tasks", sa.Column("schedule_server_ip", sa.String(length=255), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if "tasks" in existing_tables and _has_column(inspector, "tasks", "schedule_server_ip"):
+        op.drop_column("tasks", "schedule_server_ip")
+    if "comfyui_settings" in existing_tables and _has_column(inspector, "comfyui_settings", "endpoints"):
+        op.drop_column("comfyui_settings", "endpoints")
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+"""add service_leases table for leader election
+
+Revision ID: 0013_service_leases
+Revises: 0012_comfyui_endpoint_registry
+Create Date: 2026-03-04 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0013_service_leases"
+down_revision = "0012_comfyui_endpoint_registry"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "service_leases" in existing_tables:
+        return
+    op.create_table(
+        "service_leases",
+        sa.Column("name", sa.String(length=64), nullable=False),
+        sa.Column("holder", sa.String(length=64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("acquired_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("renewed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "service_leases" in existing_tables:
+        op.drop_table("service_leases")
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+"""add template parameters and task parameter values
+
+Revision ID: 0015_template_parameters
+Revises: 0014_task_workflow_hash
+Create Date: 2026-03-06 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0015_template_parameters"
+down_revision = "0014_task_workflow_hash"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if "task_templates" in existing_tables and not _has_column(inspector, "task_templates", "parameters"):
+        op.add_column(
+            "task_templates",
+            sa.Column("parameters", sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+        )
+        op.alter_column("task_templates", "parameters", server_default=None)
+
+    if "tasks" in existing_tables:
+        if not _has_column(inspector, "tasks", "template_id"):
+            op.add_column("tasks", sa.Column("template_id", sa.Uuid(), nullable=True))
+            op.create_foreign_key("fk_tasks_template_id", "tasks", "task_templates", ["template_id"], ["id"])
+            op.create_index(op.f("ix_tasks_template_id"), "tasks", ["template_id"], unique=False)
+        if not _has_column(inspector, "tasks", "parameter_values"):
+            op.add_column(
+                "tasks",
+                sa.Column("parameter_values", sa.JSON(), nullable=False, server_default=sa.text("'{}'")),
+            )
+            op.alter_column("tasks", "parameter_values", server_default=None)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+
+    if "tasks" in existing_tables:
+        if _has_column(inspector, "tasks", "parameter_values"):
+            op.drop_column("tasks", "parameter_values")
+        if _has_column(inspector, "tasks", "template_id"):
+            op.drop_index(op.f("ix_tasks_template_id"), table_name="tasks")
+            op.drop_constraint("fk_tasks_template_id", "tasks", type_="foreignkey")
+            op.drop_column("tasks", "template_id")
+    if "task_templates" in existing_tables and _has_column(inspector, "task_templates", "parameters"):
+        op.drop_column("task_templates", "parameters")
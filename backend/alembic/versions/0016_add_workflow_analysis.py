@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+"""add workflow_analysis to tasks and task_templates
+
+Revision ID: 0016_workflow_analysis
+Revises: 0015_template_parameters
+Create Date: 2026-03-07 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0016_workflow_analysis"
+down_revision = "0015_template_parameters"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    # Existing rows stay NULL and are analyzed on their next execute.
+    for table_name in ("tasks", "task_templates"):
+        if table_name in existing_tables and not _has_column(inspector, table_name, "workflow_analysis"):
+            op.add_column(table_name, sa.Column("workflow_analysis", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table_name in ("task_templates", "tasks"):
+        if table_name in existing_tables and _has_column(inspector, table_name, "workflow_analysis"):
+            op.drop_column(table_name, "workflow_analysis")
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+"""add node_duration_stats table for progress estimation
+
+Revision ID: 0017_node_duration_stats
+Revises: 0016_workflow_analysis
+Create Date: 2026-03-08 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0017_node_duration_stats"
+down_revision = "0016_workflow_analysis"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "node_duration_stats" in existing_tables:
+        return
+    op.create_table(
+        "node_duration_stats",
+        sa.Column("workflow_hash", sa.String(length=64), nullable=False),
+        sa.Column("class_type", sa.String(length=255), nullable=False),
+        sa.Column("base_url", sa.String(length=512), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("mean_ms", sa.Float(), nullable=False),
+        sa.Column("p50_ms", sa.Float(), nullable=False),
+        sa.Column("p90_ms", sa.Float(), nullable=False),
+        sa.Column("recent_ms", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("workflow_hash", "class_type", "base_url"),
+    )
+    op.create_index("ix_node_duration_stats_class_type", "node_duration_stats", ["class_type"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "node_duration_stats" in existing_tables:
+        op.drop_index("ix_node_duration_stats_class_type", table_name="node_duration_stats")
+        op.drop_table("node_duration_stats")
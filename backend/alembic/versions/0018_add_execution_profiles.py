@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+"""add execution_profiles table for per-run node timing
+
+Revision ID: 0018_execution_profiles
+Revises: 0017_node_duration_stats
+Create Date: 2026-03-09 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0018_execution_profiles"
+down_revision = "0017_node_duration_stats"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "execution_profiles" in existing_tables:
+        return
+    op.create_table(
+        "execution_profiles",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("task_id", sa.Uuid(), nullable=False),
+        sa.Column("prompt_id", sa.String(length=64), nullable=False),
+        sa.Column("workflow_hash", sa.String(length=64), nullable=True),
+        sa.Column("base_url", sa.String(length=512), nullable=False),
+        sa.Column("status", sa.String(length=32), nullable=False),
+        sa.Column("submitted_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("queue_wait_ms", sa.Integer(), nullable=True),
+        sa.Column("wall_ms", sa.Integer(), nullable=False),
+        sa.Column("executed_node_count", sa.Integer(), nullable=False),
+        sa.Column("cached_node_count", sa.Integer(), nullable=False),
+        sa.Column("timeline", sa.JSON(), nullable=False),
+        sa.ForeignKeyConstraint(["task_id"], ["tasks.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_execution_profiles_task_id", "execution_profiles", ["task_id"])
+    op.create_index("ix_execution_profiles_workflow_hash", "execution_profiles", ["workflow_hash"])
+    op.create_index("ix_execution_profiles_finished_at", "execution_profiles", ["finished_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "execution_profiles" in existing_tables:
+        op.drop_index("ix_execution_profiles_finished_at", table_name="execution_profiles")
+        op.drop_index("ix_execution_profiles_workflow_hash", table_name="execution_profiles")
+        op.drop_index("ix_execution_profiles_task_id", table_name="execution_profiles")
+        op.drop_table("execution_profiles")
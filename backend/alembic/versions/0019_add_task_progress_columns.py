@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+"""add progress_percent and estimated_finish_at to tasks
+
+Revision ID: 0019_task_progress_columns
+Revises: 0018_execution_profiles
+Create Date: 2026-03-10 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0019_task_progress_columns"
+down_revision = "0018_execution_profiles"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "tasks" not in set(inspector.get_table_names()):
+        return
+    # Existing rows stay NULL until their execution state is next persisted.
+    if not _has_column(inspector, "tasks", "progress_percent"):
+        op.add_column("tasks", sa.Column("progress_percent", sa.Float(), nullable=True))
+    if not _has_column(inspector, "tasks", "estimated_finish_at"):
+        op.add_column("tasks", sa.Column("estimated_finish_at", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "tasks" not in set(inspector.get_table_names()):
+        return
+    for column_name in ("estimated_finish_at", "progress_percent"):
+        if _has_column(inspector, "tasks", column_name):
+            op.drop_column("tasks", column_name)
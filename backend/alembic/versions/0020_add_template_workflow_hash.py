@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+"""add task_templates.workflow_hash
+
+Revision ID: 0020_template_workflow_hash
+Revises: 0019_task_progress_columns
+Create Date: 2026-03-11 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0020_template_workflow_hash"
+down_revision = "0019_task_progress_columns"
+branch_labels = None
+depends_on = None
+
+
+def _has_column(inspector: sa.Inspector, table_name: str, column_name: str) -> bool:
+    try:
+        columns = inspector.get_columns(table_name)
+    except Exception:
+        return False
+    return any(str(col.get("name")) == column_name for col in columns)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    # Existing rows stay NULL; resolving a linked task hashes the workflow until the template is next saved.
+    if "task_templates" in existing_tables and not _has_column(inspector, "task_templates", "workflow_hash"):
+        op.add_column("task_templates", sa.Column("workflow_hash", sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    if "task_templates" in existing_tables and _has_column(inspector, "task_templates", "workflow_hash"):
+        op.drop_column("task_templates", "workflow_hash")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from app.core.sampling_profiler import profiler_busy, run_sampling_profile, to_collapsed, to_speedscope
+from app.core.security import require_current_user
+
+router = APIRouter(prefix="/diagnostics", tags=["diagnostics"], dependencies=[Depends(require_current_user)])
+
+
+@router.post("/profile")
+async def run_profile_api(
+    duration_seconds: float = Query(default=10.0, gt=0, le=120),
+    interval_ms: float = Query(default=10.0, ge=1, le=1000),
+    mode: Literal["all", "wall", "tasks"] = Query(default="all"),
+    output: Literal["collapsed", "speedscope"] = Query(default="collapsed"),
+    request_id: str | None = Query(
+        default=None,
+        max_length=64,
+        description="Only sample work for the request sent with this X-Request-ID header",
+    ),
+) -> Response:
+    if profiler_busy():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+    result = await run_sampling_profile(
+        duration_seconds=duration_seconds,
+        interval_ms=interval_ms,
+        mode=mode,
+        request_id=request_id,
+    )
+    headers = {"X-Profile-Samples": str(result.sample_count)}
+    if output == "speedscope":
+        return JSONResponse(
+            to_speedscope(result),
+            headers={**headers, "Content-Disposition": 'attachment; filename="profile.speedscope.json"'},
+        )
+    return PlainTextResponse(to_collapsed(result), headers=headers)
@@ -1,17 +1,26 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import functools
 import logging
+import time
 import uuid
+from collections import deque
+from collections.abc import AsyncIterator
 from datetime import datetime, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import json_codec
 from app.core.config import settings
+from app.core.logging import RATE_LIMITED
+from app.core.loop_watchdog import set_operation_label
+from app.core.metrics import SIZE_BUCKETS, counter, gauge, histogram
 from app.db.session import SessionLocal, get_db
 from app.models.enums import TaskStatus
 from app.models.task import Task
@@ -19,23 +28,59 @@ from app.services.comfyui_service import (
     ComfyEvent,
     build_ws_base_url,
     delete_prompt_from_queue,
-    fetch_queue_status,
     fetch_queue_prompt_ids,
     interrupt_execution,
     listen_comfyui_ws,
     submit_prompt,
 )
+from app.services.comfyui_health_service import get_queue_status, is_endpoint_available
+from app.services.comfyui_object_info_service import check_workflow_compatibility, ensure_object_info
 from app.services.comfyui_settings_service import ensure_allowed_endpoint, parse_endpoint_from_execution_state
+from app.services.execution_profile_service import ExecutionProfileRecorder, save_execution_profile
+from app.services.node_duration_service import ExecutionProgressEstimator, load_node_duration_history
+from app.services.execution_wire_service import CompactWireSession, negotiate_subprotocol
+from app.services.preview_service import offer_preview_frame, subscribe_previews, unsubscribe_previews
+from app.services.pubsub_service import WORKER_ID, get_pubsub_backend
 from app.services.task_service import bind_task_id_to_workflow, get_task_or_404
+from app.services.template_service import resolve_task_workflow, resolve_task_workflow_analysis
+from app.services.workflow_analysis_service import (
+    ANALYSIS_VERSION,
+    analysis_errors_summary,
+    analyze_workflow,
+)
+from app.services.workflow_metadata_service import (
+    WorkflowMetadata,
+    build_workflow_metadata,
+    cache_workflow_metadata,
+    get_cached_workflow_metadata,
+    get_workflow_metadata,
+)
 
 router = APIRouter(prefix="/execution", tags=["execution"])
 logger = logging.getLogger("app.execution")
 
-# In-memory registry of active execution sessions
+# Per-worker registry of active execution sessions.
+# Browser sockets and listener tasks are local to the worker that holds them;
+# events reach sockets on other workers through the pub/sub backend, and
+# listener ownership is guarded by a per-task lock on the same backend.
 # Maps task_id -> set of WebSocket connections for broadcasting
 _ws_connections: dict[str, set[WebSocket]] = {}
+# Connections that negotiated a compact wire protocol; all others get plain JSON.
+_wire_sessions: dict[WebSocket, CompactWireSession] = {}
+# Connections still receiving their initial snapshot/replay; live broadcasts skip
+# them and they catch up from the replay buffer instead.
+_ws_syncing: set[WebSocket] = set()
+# Every broadcast event carries a per-task "seq"; the latest ones are kept here so
+# reconnecting clients can resume with ?since=<seq> instead of a full state_sync.
+_replay_buffers: dict[str, deque[tuple[int, dict]]] = {}
+_event_seqs: dict[str, int] = {}
+# SSE and long-poll readers waiting for a task's next buffered event.
+_event_waiters: dict[str, set[asyncio.Event]] = {}
+# Authoritative only on the worker that owns the task's listener; other
+# workers fall back to the persisted snapshot.
 _execution_states: dict[str, dict] = {}
 _MAX_EVENT_LOG = 300
+_PONG_FRAME = json_codec.dumps({"type": "pong"})
 _PERSIST_FLUSH_INTERVAL_SECONDS = 2.0
 _STATE_CLEANUP_INTERVAL_SECONDS = 3600.0
 _STATE_RETENTION_SECONDS = 3600.0
@@ -44,6 +89,40 @@ _persist_worker_task: asyncio.Task | None = None
 _cleanup_worker_task: asyncio.Task | None = None
 _listener_stop_events: dict[str, asyncio.Event] = {}
 _listener_tasks: dict[str, asyncio.Task] = {}
+_progress_estimators: dict[str, ExecutionProgressEstimator] = {}
+_profile_recorders: dict[str, ExecutionProfileRecorder] = {}
+_EXECUTION_EVENTS_CHANNEL = "execution_events"
+_EXECUTION_CONTROL_CHANNEL = "execution_control"
+_LISTENER_LOCK_WAIT_SECONDS = 3.0
+_LISTENER_LOCK_RETRY_SECONDS = 0.2
+_SSE_KEEPALIVE_SECONDS = 15.0
+# A run is over once one of these is sent; SSE streams end there.
+_FINAL_EVENT_TYPES = frozenset({"all_completed", "listener_error"})
+_FINAL_STATUSES = frozenset({TaskStatus.success.value, TaskStatus.fail.value, TaskStatus.cancelled.value})
+_LONG_POLL_MAX_SECONDS = 55.0
+
+_persist_flush_seconds = histogram("execution_state_persist_duration_seconds", "Execution state persist flush duration")
+_persist_flush_bytes = histogram(
+    "execution_state_persist_bytes",
+    "Serialized execution state bytes written per persist flush",
+    buckets=SIZE_BUCKETS,
+)
+_persist_flush_states = counter("execution_state_persisted_total", "Execution states written to the database")
+_broadcast_seconds = histogram("execution_broadcast_duration_seconds", "Time to fan one event out to WS clients and pub/sub")
+_broadcasts_in_flight = gauge("execution_broadcasts_in_flight", "Execution event broadcasts currently being sent")
+gauge("comfyui_active_listeners", "ComfyUI WS listeners running on this worker").set_function(
+    lambda: len(_listener_tasks)
+)
+gauge("execution_ws_clients", "Frontend WS clients connected to this worker").set_function(
+    lambda: sum(len(clients) for clients in _ws_connections.values())
+)
+_ws_syncs = counter("execution_ws_syncs_total", "Execution WS connection syncs, by kind", ("kind",))
+gauge("execution_event_waiters", "SSE and long-poll readers waiting for execution events").set_function(
+    lambda: sum(len(waiters) for waiters in _event_waiters.values())
+)
+gauge("execution_state_dirty", "Execution states waiting for the next persist flush").set_function(
+    lambda: len(_dirty_execution_task_ids)
+)
 
 
 # ──────────────────────────────────────────────
@@ -68,6 +147,14 @@ class ExecuteTaskResponse(BaseModel):
     endpoint: ExecuteEndpoint
 
 
+class ExecutionPollResponse(BaseModel):
+    # Latest seq the client has now seen; pass it back as `since`.
+    seq: int | None = None
+    # Full public state when `since` was missing or too old to replay from.
+    state: dict | None = None
+    events: list[dict] = []
+
+
 class CancelTaskResponse(BaseModel):
     task_id: UUID
     status: str
@@ -89,6 +176,9 @@ def _new_execution_state(task_id: str, *, status_value: str) -> dict:
         "error_message": "",
         "event_log": [],
         "completed_node_count": 0,
+        "percent": 0.0,
+        "eta_seconds": None,
+        "estimated_finish_at": None,
         "updated_at": _now_iso(),
     }
 
@@ -115,25 +205,6 @@ def _append_event_log(task_id: str, message: str, level: str = "info") -> None:
     _mark_execution_state_dirty(task_id)
 
 
-def _build_workflow_node_map(workflow_json: dict | None) -> dict[str, dict[str, str]]:
-    result: dict[str, dict[str, str]] = {}
-    if not isinstance(workflow_json, dict):
-        return result
-    for raw_node_id, raw_node in workflow_json.items():
-        node_id = str(raw_node_id)
-        if not isinstance(raw_node, dict):
-            result[node_id] = {"title": "", "class_type": ""}
-            continue
-        meta = raw_node.get("_meta") or {}
-        title = meta.get("title", "") if isinstance(meta, dict) else ""
-        class_type = raw_node.get("class_type", "")
-        result[node_id] = {
-            "title": str(title or ""),
-            "class_type": str(class_type or ""),
-        }
-    return result
-
-
 def _resolve_node_meta(task_id: str, node_id: str | None) -> tuple[str, str]:
     if not node_id:
         return "", ""
@@ -235,6 +306,7 @@ def _should_cleanup_execution_state(task_id: str, state: dict, now_utc: datetime
 
 
 def _cleanup_execution_states_once() -> None:
+    _cleanup_replay_buffers()
     if not _execution_states:
         return
     now_utc = datetime.now(timezone.utc)
@@ -251,6 +323,15 @@ def _cleanup_execution_states_once() -> None:
     logger.info("Execution state cleanup completed: removed=%s", len(removable_task_ids))
 
 
+def _cleanup_replay_buffers() -> None:
+    # Runs before state cleanup, so a buffer outlives its state by one interval.
+    # Covers tasks only relayed from other workers; resuming them later falls back to a snapshot.
+    for task_id in list(_replay_buffers):
+        if task_id not in _execution_states and task_id not in _ws_connections:
+            _replay_buffers.pop(task_id, None)
+            _event_seqs.pop(task_id, None)
+
+
 async def _cleanup_worker_loop() -> None:
     try:
         while True:
@@ -274,8 +355,18 @@ async def execute_task(
     session: AsyncSession = Depends(get_db),
 ) -> ExecuteTaskResponse:
     task = await get_task_or_404(session, task_id)
-    workflow_json, workflow_changed, matched_node_count = bind_task_id_to_workflow(task.workflow_json, task.id)
-    if workflow_changed:
+    # Template-linked tasks get their payload assembled here from the template and parameter values.
+    workflow_source, workflow_hash = await resolve_task_workflow(session, task)
+    # The bound task_id is excluded from the fingerprint, so the stored hash stays valid after binding.
+    workflow_meta = get_workflow_metadata(workflow_source, workflow_hash=workflow_hash)
+    if workflow_meta.workflow_hash and task.workflow_hash != workflow_meta.workflow_hash:
+        task.workflow_hash = workflow_meta.workflow_hash
+    workflow_json, workflow_changed, matched_node_count = bind_task_id_to_workflow(
+        workflow_source,
+        task.id,
+        task_info_node_ids=workflow_meta.task_info_node_ids,
+    )
+    if workflow_changed and task.workflow_json is not None:
         task.workflow_json = workflow_json
         logger.info(
             "GetTaskInfoNode task_id bound before execute: task_id=%s matched_nodes=%s",
@@ -288,7 +379,7 @@ async def execute_task(
             detail="Task is already running",
         )
 
-    node_count = len(workflow_json) if isinstance(workflow_json, dict) else 0
+    node_count = workflow_meta.node_count
     logger.info(
         "Execute task requested: task_id=%s status=%s has_workflow=%s node_count=%s",
         task_id,
@@ -312,12 +403,19 @@ async def execute_task(
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    probe_running_count, probe_pending_count, probe_error = await fetch_queue_status(api_base_url=endpoint.base_url)
+    if not is_endpoint_available(endpoint.base_url):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Selected ComfyUI endpoint is unreachable: health check failing, retry later",
+        )
+
+    probe_running_count, probe_pending_count, probe_error = await get_queue_status(endpoint.base_url)
     if probe_error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Selected ComfyUI endpoint is unreachable: {probe_error}",
         )
+    await _ensure_workflow_runnable(session, task, workflow_json, base_url=endpoint.base_url)
 
     # Generate a unique client_id for this execution
     client_id = uuid.uuid4().hex
@@ -326,15 +424,38 @@ async def execute_task(
     prompt_ids: set[str] = set()
     listener_stop_event = asyncio.Event()
     listener_connected_event = asyncio.Event()
+    previous_status = task.status
+    previous_message = task.comfy_message
+
+    # Mark task as running immediately once execution is requested. The claim is a
+    # conditional UPDATE so that concurrent execute requests, on this worker or any
+    # other replica, can never both submit the same task to ComfyUI.
+    claimed = await session.execute(
+        update(Task)
+        .where(Task.id == task.id, Task.status != TaskStatus.running)
+        .values(status=TaskStatus.running, comfy_message="Execution requested")
+        .returning(Task.id)
+    )
+    if claimed.scalar_one_or_none() is None:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task is already running",
+        )
+    await session.commit()
+
     old_stop_event = _listener_stop_events.pop(task_id_str, None)
     _listener_tasks.pop(task_id_str, None)
     if old_stop_event is not None:
         old_stop_event.set()
-
-    # Mark task as running immediately once execution is requested.
-    task.status = TaskStatus.running
-    task.comfy_message = "Execution requested"
-    await session.commit()
+    if not await _acquire_listener_ownership(task_id_str):
+        task.status = previous_status
+        task.comfy_message = previous_message
+        await session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Task listener is still active on another worker, retry shortly",
+        )
     logger.info(
         "Task marked running on execute request: task_id=%s endpoint=%s queue_running=%s queue_pending=%s",
         task_id,
@@ -343,31 +464,47 @@ async def execute_task(
         probe_pending_count,
     )
 
-    initial_state = _new_execution_state(task_id_str, status_value=TaskStatus.running.value)
-    initial_state["_node_map"] = _build_workflow_node_map(workflow_json)
-    initial_state["target_endpoint"] = {
-        "server_ip": endpoint.server_ip,
-        "port": endpoint.port,
-        "base_url": endpoint.base_url,
-    }
-    _execution_states[task_id_str] = initial_state
-    _append_event_log(task_id_str, "执行请求已提交，等待 ComfyUI 响应…", "info")
-    _append_event_log(task_id_str, f"目标端口: {endpoint.server_ip}:{endpoint.port}", "info")
-    _mark_execution_state_dirty(task_id_str)
-
-    # Start ComfyUI listener first to avoid missing fast execution events.
-    listener_task = asyncio.create_task(
-        _run_comfyui_listener(
-            client_id=client_id,
-            task_id=task_id_str,
-            ws_base_url=ws_base_url,
-            prompt_ids=prompt_ids,
-            stop_event=listener_stop_event,
-            connected_event=listener_connected_event,
+    # Until the listener task is registered nothing else would release the lock or
+    # the running claim, so undo both if setup fails or the request is cancelled.
+    try:
+        estimator = await _build_progress_estimator(workflow_meta, base_url=endpoint.base_url)
+        _progress_estimators[task_id_str] = estimator
+        recorder = ExecutionProfileRecorder(
+            task_id=task.id,
+            workflow_hash=workflow_meta.workflow_hash or None,
+            base_url=endpoint.base_url,
+            node_class_types={node_id: info["class_type"] for node_id, info in workflow_meta.node_map.items()},
         )
-    )
-    _listener_stop_events[task_id_str] = listener_stop_event
-    _listener_tasks[task_id_str] = listener_task
+        _profile_recorders[task_id_str] = recorder
+        initial_state = _new_execution_state(task_id_str, status_value=TaskStatus.running.value)
+        initial_state["_node_map"] = workflow_meta.node_map
+        initial_state.update(estimator.snapshot())
+        initial_state["target_endpoint"] = {
+            "server_ip": endpoint.server_ip,
+            "port": endpoint.port,
+            "base_url": endpoint.base_url,
+        }
+        _execution_states[task_id_str] = initial_state
+        _append_event_log(task_id_str, "执行请求已提交，等待 ComfyUI 响应…", "info")
+        _append_event_log(task_id_str, f"目标端口: {endpoint.server_ip}:{endpoint.port}", "info")
+        _mark_execution_state_dirty(task_id_str)
+
+        # Start ComfyUI listener first to avoid missing fast execution events.
+        listener_task = asyncio.create_task(
+            _run_comfyui_listener(
+                client_id=client_id,
+                task_id=task_id_str,
+                ws_base_url=ws_base_url,
+                prompt_ids=prompt_ids,
+                stop_event=listener_stop_event,
+                connected_event=listener_connected_event,
+            )
+        )
+        _listener_stop_events[task_id_str] = listener_stop_event
+        _listener_tasks[task_id_str] = listener_task
+    except BaseException:
+        await _abandon_execute_claim(task_id_str, previous_status, previous_message)
+        raise
     try:
         await asyncio.wait_for(listener_connected_event.wait(), timeout=3.0)
         logger.info("ComfyUI listener connected before submit: task_id=%s client_id=%s", task_id, client_id)
@@ -379,6 +516,7 @@ async def execute_task(
         )
 
     # Submit to ComfyUI
+    recorder.mark_submitted()
     result = await submit_prompt(workflow_json, client_id=client_id, api_base_url=endpoint.base_url)
     logger.info(
         "ComfyUI submit result: task_id=%s prompt_id=%s error=%s",
@@ -393,7 +531,7 @@ async def execute_task(
         state = _execution_states.get(task_id_str)
         if state is None:
             fail_state = _new_execution_state(task_id_str, status_value=TaskStatus.fail.value)
-            fail_state["_node_map"] = _build_workflow_node_map(workflow_json)
+            fail_state["_node_map"] = workflow_meta.node_map
             fail_state["target_endpoint"] = {
                 "server_ip": endpoint.server_ip,
                 "port": endpoint.port,
@@ -423,7 +561,7 @@ async def execute_task(
         state = _execution_states.get(task_id_str)
         if state is None:
             fail_state = _new_execution_state(task_id_str, status_value=TaskStatus.fail.value)
-            fail_state["_node_map"] = _build_workflow_node_map(workflow_json)
+            fail_state["_node_map"] = workflow_meta.node_map
             fail_state["target_endpoint"] = {
                 "server_ip": endpoint.server_ip,
                 "port": endpoint.port,
@@ -448,11 +586,12 @@ async def execute_task(
     task.comfy_message = None
     await session.commit()
     prompt_ids.add(result.prompt_id)
+    recorder.prompt_id = result.prompt_id
     logger.info("Prompt id attached to listener: task_id=%s prompt_id=%s", task_id, result.prompt_id)
     state = _execution_states.get(task_id_str)
     if state is None:
         running_state = _new_execution_state(task_id_str, status_value=TaskStatus.running.value)
-        running_state["_node_map"] = _build_workflow_node_map(workflow_json)
+        running_state["_node_map"] = workflow_meta.node_map
         running_state["target_endpoint"] = {
             "server_ip": endpoint.server_ip,
             "port": endpoint.port,
@@ -493,6 +632,48 @@ async def execute_task(
     )
 
 
+async def _build_progress_estimator(workflow_meta: WorkflowMetadata, *, base_url: str) -> ExecutionProgressEstimator:
+    try:
+        await load_node_duration_history(list(workflow_meta.class_type_counts))
+    except Exception:
+        # Estimates only; execution goes ahead on whatever history is already in memory.
+        logger.warning("Loading node duration history failed", exc_info=True)
+    return ExecutionProgressEstimator.build(
+        workflow_meta.node_map,
+        workflow_hash=workflow_meta.workflow_hash,
+        base_url=base_url,
+    )
+
+
+async def _ensure_workflow_runnable(session: AsyncSession, task: Task, workflow_json: dict, *, base_url: str) -> None:
+    """Reject graphs ComfyUI would refuse before a queue slot is taken; only the first check per endpoint hits the network."""
+    analysis = await resolve_task_workflow_analysis(session, task)
+    if not isinstance(analysis, dict) or analysis.get("version") != ANALYSIS_VERSION:
+        analysis = analyze_workflow(workflow_json).to_dict()
+    if not analysis.get("valid", False):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Workflow is invalid: {analysis_errors_summary(analysis)}",
+        )
+
+    if await ensure_object_info(base_url) is None:
+        return
+    compatibility = check_workflow_compatibility(base_url, workflow_json)
+    if compatibility.missing_class_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                "Node classes not installed on the selected ComfyUI endpoint: "
+                f"{', '.join(compatibility.missing_class_types)}"
+            ),
+        )
+    if compatibility.missing_models:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Models not available on the selected ComfyUI endpoint: {'; '.join(compatibility.missing_models[:10])}",
+        )
+
+
 @router.post("/task/{task_id}/cancel", response_model=CancelTaskResponse)
 async def cancel_task_execution(
     task_id: UUID,
@@ -510,6 +691,12 @@ async def cancel_task_execution(
 
     if stop_event is not None:
         stop_event.set()
+    else:
+        # The listener may live on another worker; its owner stops it and marks its state cancelled.
+        await get_pubsub_backend().publish(
+            _EXECUTION_CONTROL_CHANNEL,
+            {"action": "cancel", "task_id": task_id_str},
+        )
     state = _execution_states.get(task_id_str)
     if state is None:
         state = await _load_persisted_execution_state(task_id_str)
@@ -559,7 +746,8 @@ async def cancel_task_execution(
     state = _execution_states.get(task_id_str)
     if state is None:
         state = _new_execution_state(task_id_str, status_value=TaskStatus.cancelled.value)
-        state["_node_map"] = _build_workflow_node_map(task.workflow_json)
+        workflow_source, workflow_hash = await resolve_task_workflow(session, task)
+        state["_node_map"] = get_workflow_metadata(workflow_source, workflow_hash=workflow_hash).node_map
         _execution_states[task_id_str] = state
 
     state["status"] = TaskStatus.cancelled.value
@@ -592,7 +780,7 @@ async def cancel_task_execution(
 
 
 @router.websocket("/ws/{task_id}")
-async def execution_ws(websocket: WebSocket, task_id: str):
+async def execution_ws(websocket: WebSocket, task_id: str, previews: bool = False, since: int | None = None):
     """
     Frontend connects here to receive real-time execution progress.
     Messages are JSON objects with:
@@ -600,15 +788,34 @@ async def execution_ws(websocket: WebSocket, task_id: str):
         "type": "...",
         "data": { ... }
     }
+
+    Every event carries a monotonic "seq" (state_sync carries the seq it is
+    current to). Reconnecting with ?since=<last seq seen> replays only the missed
+    events when they are still buffered, and sends a full state_sync otherwise.
+
+    Offering a subprotocol from execution_wire_service (compact JSON, or
+    MessagePack when installed) switches the connection to the compact protocol
+    described there; JSON stays the default.
+
+    With ?previews=true (and PREVIEW_STREAMING_ENABLED), sampler previews also
+    arrive as binary frames: 4-byte big-endian frame type 1, 4-byte image format
+    (1 = JPEG, 2 = PNG), then the image. Previews come from the worker running
+    the task's ComfyUI listener only.
     """
-    await websocket.accept()
+    subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols") or [])
+    await websocket.accept(subprotocol=subprotocol)
+    if subprotocol is not None:
+        _wire_sessions[websocket] = CompactWireSession(subprotocol)
 
     if task_id not in _ws_connections:
         _ws_connections[task_id] = set()
     _ws_connections[task_id].add(websocket)
+    previews = previews and settings.preview_streaming_enabled
+    if previews:
+        subscribe_previews(task_id, websocket)
 
     logger.info("WS client connected for task %s (total: %d)", task_id, len(_ws_connections[task_id]))
-    await _send_state_sync(websocket, task_id)
+    await _sync_new_client(websocket, task_id, since)
 
     try:
         while True:
@@ -617,51 +824,445 @@ async def execution_ws(websocket: WebSocket, task_id: str):
             # Client can send {"type": "ping"}, we respond with pong
             if data:
                 try:
-                    msg = json.loads(data)
-                    if msg.get("type") == "ping":
-                        await websocket.send_json({"type": "pong"})
-                except json.JSONDecodeError:
+                    msg = json_codec.loads(data)
+                    if isinstance(msg, dict) and msg.get("type") == "ping":
+                        if websocket in _wire_sessions:
+                            await _send_message(websocket, {"type": "pong"})
+                        else:
+                            await websocket.send_text(_PONG_FRAME)
+                except json_codec.JSONDecodeError:
                     pass
     except WebSocketDisconnect:
         pass
     finally:
+        if previews:
+            unsubscribe_previews(task_id, websocket)
+        _wire_sessions.pop(websocket, None)
         _ws_connections.get(task_id, set()).discard(websocket)
         if task_id in _ws_connections and not _ws_connections[task_id]:
             del _ws_connections[task_id]
         logger.info("WS client disconnected for task %s", task_id)
 
 
+# ──────────────────────────────────────────────
+# SSE and Long-Poll Fallbacks
+# ──────────────────────────────────────────────
+
+
+def _sse_frame(message: dict) -> str:
+    seq = message.get("seq")
+    event_id = f"id: {seq}\n" if seq is not None else ""
+    return f"{event_id}data: {json_codec.dumps(message)}\n\n"
+
+
+def _parse_since(since: int | None, last_event_id: str | None) -> int | None:
+    if since is not None:
+        return since
+    try:
+        return int(last_event_id) if last_event_id else None
+    except ValueError:
+        return None
+
+
+async def _iter_sse_events(task_id: str, since: int | None) -> AsyncIterator[str]:
+    yield "retry: 2000\n\n"
+    seq = since
+    events = _replay_after(task_id, since) if since is not None else None
+    while True:
+        if events is None:
+            public_state, seq, _ = await _load_state_sync(task_id)
+            if public_state is None:
+                return
+            # 0 stands for "before any event", so a reconnect always carries a Last-Event-ID.
+            seq = seq or 0
+            yield _sse_frame({"type": "state_sync", "seq": seq, "data": public_state})
+            events = _stream_events_after(task_id, seq)
+            if events is None:
+                # The snapshot predates everything buffered here (e.g. a persisted state read
+                # on a non-owner worker); resync after the next event rather than right away.
+                if not await _wait_for_next_event(task_id, _SSE_KEEPALIVE_SECONDS):
+                    yield ": keep-alive\n\n"
+                continue
+            if not events and public_state.get("status") in _FINAL_STATUSES:
+                return
+        for message in events:
+            yield _sse_frame(message)
+            seq = message["seq"]
+            if message.get("type") in _FINAL_EVENT_TYPES:
+                return
+        events = await _wait_for_events(task_id, seq, _SSE_KEEPALIVE_SECONDS)
+        if events == []:
+            yield ": keep-alive\n\n"
+
+
+@router.get("/events/{task_id}", response_class=StreamingResponse)
+async def execution_events_sse(
+    task_id: str,
+    since: int | None = None,
+    last_event_id: str | None = Header(default=None),
+) -> Response:
+    """
+    Server-Sent Events fallback for /ws/{task_id}, fed by the same event stream.
+
+    Each SSE event's data is one execution message (state_sync first unless
+    resuming) and its id is the message seq, so EventSource reconnects resume
+    through Last-Event-ID; ?since=<seq> does the same explicitly. The stream ends
+    after the run's final event. Unknown tasks get 404, and a reconnect after the
+    final event gets 204, both of which stop EventSource from reconnecting.
+    """
+    since = _parse_since(since, last_event_id)
+    public_state, seq, _ = await _load_state_sync(task_id)
+    if public_state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Execution state not found")
+    if since is not None and since >= (seq or 0) and public_state.get("status") in _FINAL_STATUSES:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return StreamingResponse(
+        _iter_sse_events(task_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _poll_state(task_id: str) -> ExecutionPollResponse:
+    public_state, seq, _ = await _load_state_sync(task_id)
+    if public_state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Execution state not found")
+    # 0 stands for "before any event", so polls for idle tasks wait instead of re-fetching state.
+    seq = seq or 0
+    events = _stream_events_after(task_id, seq) or []
+    return ExecutionPollResponse(seq=events[-1]["seq"] if events else seq, state=public_state, events=events)
+
+
+@router.get("/poll/{task_id}", response_model=ExecutionPollResponse)
+async def execution_events_poll(
+    task_id: str,
+    since: int | None = None,
+    timeout: float = Query(default=25.0, ge=0.0, le=_LONG_POLL_MAX_SECONDS),
+) -> ExecutionPollResponse:
+    """
+    Long-poll fallback: returns events with seq > since as soon as there is at
+    least one, or an empty list after `timeout` seconds. Without `since`, or when
+    it is too old to replay, the full state comes back instead.
+    """
+    events = _replay_after(task_id, since) if since is not None else None
+    if events is None:
+        response = await _poll_state(task_id)
+        if response.seq != since:
+            return response
+        # The client already holds this state but it cannot be bridged to the buffered
+        # events; hand back a fresh state once the next event arrives.
+        if not await _wait_for_next_event(task_id, timeout):
+            return ExecutionPollResponse(seq=since)
+        return await _poll_state(task_id)
+    if not events:
+        events = await _wait_for_events(task_id, since, timeout)
+        if events is None:
+            # A hole opened while waiting, e.g. an event this worker never received.
+            return await _poll_state(task_id)
+    return ExecutionPollResponse(seq=events[-1]["seq"] if events else since, events=events)
+
+
 # ──────────────────────────────────────────────
 # Background ComfyUI WS Listener
 # ──────────────────────────────────────────────
 
 
 async def _broadcast_to_task(task_id: str, message: dict) -> None:
-    """Send a message to all connected WebSocket clients for a task."""
+    """Send a message to every WebSocket client for a task, on this and other workers."""
+    started = time.perf_counter()
+    _broadcasts_in_flight.inc()
+    try:
+        seq = _event_seqs.get(task_id)
+        if seq is None:
+            # No history on this worker (first event, or after a restart): start from
+            # the clock in microseconds so a new run still numbers above any earlier
+            # one. Stays below 2**53, so browsers read it exactly.
+            state = _execution_states.get(task_id) or {}
+            seq = max(int(state.get("seq") or 0), time.time_ns() // 1000)
+        message["seq"] = seq + 1
+        state = _execution_states.get(task_id)
+        if state is not None:
+            state["seq"] = message["seq"]
+        _record_replay_event(task_id, message)
+        await _send_to_local_clients(task_id, message)
+        backend = get_pubsub_backend()
+        envelope = {"task_id": task_id, "message": message}
+        if not backend.payload_fits(envelope):
+            # Too large to fan out (e.g. execution_cached for a big workflow): persist the
+            # state it produced and have other workers resync their clients from it.
+            await _persist_execution_states([task_id])
+            envelope = {"task_id": task_id, "resync_seq": message["seq"]}
+        await backend.publish(_EXECUTION_EVENTS_CHANNEL, envelope)
+    finally:
+        _broadcasts_in_flight.dec()
+        if settings.metrics_enabled:
+            _broadcast_seconds.observe(time.perf_counter() - started)
+
+
+def _record_replay_event(task_id: str, message: dict) -> None:
+    seq = message["seq"]
+    buffer = _replay_buffers.get(task_id)
+    if buffer is None:
+        buffer = deque(maxlen=max(settings.execution_replay_buffer_size, 1))
+        _replay_buffers[task_id] = buffer
+    buffer.append((seq, message))
+    _advance_event_seq(task_id, seq)
+
+
+def _advance_event_seq(task_id: str, seq: int) -> None:
+    """Move the task's latest seq forward; a seq that was never buffered leaves a hole replays refuse."""
+    if seq > _event_seqs.get(task_id, 0):
+        _event_seqs[task_id] = seq
+    for waiter in _event_waiters.get(task_id, ()):
+        waiter.set()
+
+
+def _replay_after(task_id: str, seq: int) -> list[dict] | None:
+    """Buffered events after `seq`, or None when the buffer cannot prove none are missing."""
+    last_seq = _event_seqs.get(task_id)
+    if last_seq is None or seq > last_seq:
+        return None
+    if seq == last_seq:
+        return []
+    buffer = _replay_buffers.get(task_id)
+    if not buffer or buffer[0][0] > seq + 1:
+        return None
+    events = [message for event_seq, message in buffer if event_seq > seq]
+    if len(events) != last_seq - seq:
+        # A hole: an event that never reached this worker, or a new run renumbered.
+        return None
+    return events
+
+
+async def _send_to_local_clients(task_id: str, message: dict) -> None:
+    """Send a message to every local client; JSON clients share one encoded frame."""
     clients = _ws_connections.get(task_id, set()).copy()
+    frame: str | None = None
     for ws in clients:
+        if ws in _ws_syncing:
+            continue
         try:
-            await ws.send_json(message)
+            session = _wire_sessions.get(ws)
+            if session is not None:
+                await session.send(ws, message)
+                continue
+            if frame is None:
+                frame = json_codec.dumps(message)
+            await ws.send_text(frame)
         except Exception:
             _ws_connections.get(task_id, set()).discard(ws)
 
 
-async def _send_state_sync(websocket: WebSocket, task_id: str) -> None:
+# ──────────────────────────────────────────────
+# Cross-worker Coordination
+# ──────────────────────────────────────────────
+
+
+async def _abandon_execute_claim(task_id: str, previous_status: TaskStatus, previous_message: str | None) -> None:
+    """Undo an execute request's running claim and listener lock after it failed before starting."""
+    _progress_estimators.pop(task_id, None)
+    _profile_recorders.pop(task_id, None)
+    _execution_states.pop(task_id, None)
+    _dirty_execution_task_ids.discard(task_id)
+    try:
+        await get_pubsub_backend().release_lock(_listener_lock_name(task_id))
+        async with SessionLocal() as session:
+            await session.execute(
+                update(Task)
+                .where(Task.id == UUID(task_id), Task.status == TaskStatus.running)
+                .values(status=previous_status, comfy_message=previous_message)
+            )
+            await session.commit()
+    except Exception:
+        logger.exception("Failed to release execute claim: task_id=%s", task_id)
+
+
+def _listener_lock_name(task_id: str) -> str:
+    return f"execution_listener:{task_id}"
+
+
+async def _acquire_listener_ownership(task_id: str) -> bool:
+    """Ask any other owner to stop, then wait briefly for the per-task listener lock."""
+    backend = get_pubsub_backend()
+    if await backend.try_acquire_lock(_listener_lock_name(task_id)):
+        return True
+    await backend.publish(_EXECUTION_CONTROL_CHANNEL, {"action": "stop_listener", "task_id": task_id})
+    deadline = asyncio.get_running_loop().time() + _LISTENER_LOCK_WAIT_SECONDS
+    while asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(_LISTENER_LOCK_RETRY_SECONDS)
+        if await backend.try_acquire_lock(_listener_lock_name(task_id)):
+            return True
+    return False
+
+
+async def _on_remote_execution_event(envelope: dict) -> None:
+    if envelope.get("origin") == WORKER_ID:
+        return
+    task_id = str(envelope.get("task_id") or "")
+    message = envelope.get("message")
+    resync_seq = envelope.get("resync_seq")
+    if not task_id or not (isinstance(message, dict) or isinstance(resync_seq, int)):
+        return
+    if task_id not in _listener_tasks:
+        # A snapshot cached here is stale once the owner emits new events.
+        _execution_states.pop(task_id, None)
+    if isinstance(resync_seq, int):
+        # The owner persisted the state but the event itself was too large to publish.
+        _advance_event_seq(task_id, resync_seq)
+        for websocket in list(_ws_connections.get(task_id, ())):
+            if websocket not in _ws_syncing:
+                _ws_syncs.labels("resync").inc()
+                await _sync_new_client(websocket, task_id, None)
+        return
+    if isinstance(message.get("seq"), int):
+        _record_replay_event(task_id, message)
+    if task_id in _ws_connections:
+        await _send_to_local_clients(task_id, message)
+
+
+async def _on_execution_control(envelope: dict) -> None:
+    if envelope.get("origin") == WORKER_ID:
+        return
+    task_id = str(envelope.get("task_id") or "")
+    action = envelope.get("action")
+    stop_event = _listener_stop_events.get(task_id)
+    if not task_id or stop_event is None:
+        return
+    stop_event.set()
+    logger.info("Listener stopped by remote request: task_id=%s action=%s", task_id, action)
+    if action != "cancel":
+        return
+    state = _execution_states.get(task_id)
+    if state is not None:
+        state["status"] = TaskStatus.cancelled.value
+        state["current_node_id"] = ""
+        state["current_node_title"] = ""
+        state["current_node_class_type"] = ""
+        state["error_message"] = ""
+        state["updated_at"] = _now_iso()
+        _append_event_log(task_id, "执行已取消", "warning")
+
+
+def _on_listener_lock_lost(name: str) -> None:
+    """Another worker took a listener lock while the pub/sub connection was down; it owns the task now."""
+    prefix = _listener_lock_name("")
+    if not name.startswith(prefix):
+        return
+    task_id = name[len(prefix):]
+    stop_event = _listener_stop_events.get(task_id)
+    if stop_event is not None:
+        stop_event.set()
+        logger.warning("Listener stopped after losing its lock: task_id=%s", task_id)
+
+
+def register_execution_pubsub_handlers() -> None:
+    backend = get_pubsub_backend()
+    backend.subscribe(_EXECUTION_EVENTS_CHANNEL, _on_remote_execution_event)
+    backend.subscribe(_EXECUTION_CONTROL_CHANNEL, _on_execution_control)
+    backend.on_lock_lost(_on_listener_lock_lost)
+
+
+async def _send_message(websocket: WebSocket, message: dict) -> None:
+    session = _wire_sessions.get(websocket)
+    if session is not None:
+        await session.send(websocket, message)
+    else:
+        await websocket.send_text(json_codec.dumps(message))
+
+
+async def _sync_new_client(websocket: WebSocket, task_id: str, since: int | None) -> None:
+    """Replay the events a client missed, or send a full state_sync, then let live broadcasts through."""
+    _ws_syncing.add(websocket)
+    try:
+        events = _replay_after(task_id, since) if since is not None else None
+        if events is None:
+            _ws_syncs.labels("snapshot").inc()
+            synced_seq = await _send_state_sync(websocket, task_id)
+            if synced_seq is None:
+                return
+            # Events broadcast while the snapshot was loaded or sent.
+            events = _replay_after(task_id, synced_seq) or []
+        else:
+            _ws_syncs.labels("replay").inc()
+        # Broadcasts skip this socket until it is caught up; they are picked up here,
+        # and the final check and leaving _ws_syncing happen without yielding.
+        while events:
+            for message in events:
+                await _send_message(websocket, message)
+            events = _replay_after(task_id, events[-1]["seq"]) or []
+    except Exception:
+        logger.debug("Failed to sync WS client for task %s", task_id)
+    finally:
+        _ws_syncing.discard(websocket)
+
+
+async def _load_state_sync(task_id: str) -> tuple[dict | None, int | None, dict | None]:
+    """Public state, the seq it is current to, and the raw snapshot (for its node map)."""
     _ensure_cleanup_worker()
     state_snapshot = _execution_states.get(task_id)
     if state_snapshot is None:
         state_snapshot = await _load_persisted_execution_state(task_id)
         if state_snapshot is not None:
             _execution_states[task_id] = state_snapshot
-    if not state_snapshot:
-        return
-    public_state = _public_execution_state(state_snapshot)
+    public_state = _public_execution_state(state_snapshot) if state_snapshot else None
     if not public_state:
-        return
+        return None, _event_seqs.get(task_id), None
+    seq = state_snapshot.get("seq")
+    if not isinstance(seq, int):
+        # Snapshots persisted before events were numbered: treat as current.
+        seq = _event_seqs.get(task_id)
+    return public_state, seq, state_snapshot
+
+
+async def _send_state_sync(websocket: WebSocket, task_id: str) -> int | None:
+    """Send the full public state; returns the seq it is current to, if known."""
+    public_state, seq, state_snapshot = await _load_state_sync(task_id)
+    if public_state is None:
+        return seq
+    session = _wire_sessions.get(websocket)
+    if session is not None:
+        node_map = state_snapshot.get("_node_map")
+        defs = session.define_nodes(node_map) if isinstance(node_map, dict) else None
+        if defs is not None:
+            await session.send(websocket, defs)
+    await _send_message(websocket, {"type": "state_sync", "seq": seq, "data": public_state})
+    return seq
+
+
+def _stream_events_after(task_id: str, seq: int | None) -> list[dict] | None:
+    """Like _replay_after, for readers that already hold a snapshot current to `seq`."""
+    if task_id not in _event_seqs:
+        # Nothing numbered on this worker yet; the snapshot is all there is.
+        return []
+    if seq is None:
+        return [message for _, message in _replay_buffers.get(task_id, ())]
+    return _replay_after(task_id, seq)
+
+
+async def _wait_for_next_event(task_id: str, timeout: float) -> bool:
+    """Wait until another event is recorded for the task; False on timeout."""
+    if timeout <= 0:
+        return False
+    waiter = asyncio.Event()
+    waiters = _event_waiters.setdefault(task_id, set())
+    waiters.add(waiter)
     try:
-        await websocket.send_json({"type": "state_sync", "data": public_state})
-    except Exception:
-        logger.debug("Failed to send state sync for task %s", task_id)
+        await asyncio.wait_for(waiter.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        waiters.discard(waiter)
+        if not waiters and _event_waiters.get(task_id) is waiters:
+            del _event_waiters[task_id]
+
+
+async def _wait_for_events(task_id: str, seq: int | None, timeout: float) -> list[dict] | None:
+    """Events after `seq`, waiting up to `timeout` for one; None when a fresh snapshot is needed."""
+    events = _stream_events_after(task_id, seq)
+    if events is None or events or not await _wait_for_next_event(task_id, timeout):
+        return events
+    return _stream_events_after(task_id, seq)
 
 
 async def _load_persisted_execution_state(task_id: str) -> dict | None:
@@ -671,7 +1272,12 @@ async def _load_persisted_execution_state(task_id: str) -> dict | None:
         return None
 
     async with SessionLocal() as session:
-        task = await session.get(Task, task_uuid)
+        # Reconnects land here; skip the potentially large workflow_json column unless the node map is not cached.
+        task = (
+            await session.execute(
+                select(Task.status, Task.extra, Task.execution_state, Task.workflow_hash).where(Task.id == task_uuid)
+            )
+        ).first()
         if not task:
             return None
         persisted = _deserialize_execution_state(task.execution_state or "")
@@ -711,8 +1317,17 @@ async def _load_persisted_execution_state(task_id: str) -> dict | None:
         persisted.setdefault("error_message", "")
         persisted.setdefault("event_log", [])
         persisted.setdefault("completed_node_count", 0)
+        persisted.setdefault("percent", 0.0)
+        persisted.setdefault("eta_seconds", None)
+        persisted.setdefault("estimated_finish_at", None)
         persisted.setdefault("updated_at", _now_iso())
-        persisted["_node_map"] = _build_workflow_node_map(task.workflow_json)
+        workflow_meta = get_cached_workflow_metadata(task.workflow_hash)
+        if workflow_meta is None:
+            full_task = await session.get(Task, task_uuid)
+            workflow_source, workflow_hash = await resolve_task_workflow(session, full_task)
+            workflow_meta = build_workflow_metadata(workflow_source, workflow_hash=workflow_hash)
+            cache_workflow_metadata(workflow_meta)
+        persisted["_node_map"] = workflow_meta.node_map
         return persisted
 
 
@@ -730,7 +1345,7 @@ async def _set_task_status(*, task_id: str, status_value: TaskStatus, message: s
         task.comfy_message = message
         state_snapshot = _execution_states.get(task_id)
         if state_snapshot is not None:
-            task.execution_state = _serialize_execution_state(state_snapshot)
+            _store_execution_state(task, state_snapshot)
         await session.commit()
 
 
@@ -738,6 +1353,9 @@ async def _persist_execution_states(task_ids: list[str]) -> None:
     if not task_ids:
         return
 
+    started = time.perf_counter()
+    written_bytes = 0
+    written_states = 0
     async with SessionLocal() as session:
         for task_id in task_ids:
             state_snapshot = _execution_states.get(task_id)
@@ -750,22 +1368,36 @@ async def _persist_execution_states(task_ids: list[str]) -> None:
             task = await session.get(Task, task_uuid)
             if not task:
                 continue
-            task.execution_state = _serialize_execution_state(state_snapshot)
+            _store_execution_state(task, state_snapshot)
+            written_bytes += len(task.execution_state.encode("utf-8"))
+            written_states += 1
         await session.commit()
+    if settings.metrics_enabled:
+        _persist_flush_seconds.observe(time.perf_counter() - started)
+        _persist_flush_bytes.observe(written_bytes)
+        _persist_flush_states.inc(written_states)
 
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def _store_execution_state(task: Task, state_snapshot: dict) -> None:
+    """Write the state blob plus the progress columns that task lists read instead of decoding it."""
+    task.execution_state = _serialize_execution_state(state_snapshot)
+    percent = state_snapshot.get("percent")
+    task.progress_percent = float(percent) if isinstance(percent, (int, float)) else None
+    task.estimated_finish_at = _parse_iso_datetime(state_snapshot.get("estimated_finish_at"))
+
+
 def _serialize_execution_state(state_snapshot: dict) -> str:
     public_state = _public_execution_state(state_snapshot) or {}
-    return json.dumps(public_state, ensure_ascii=False)
+    return json_codec.dumps(public_state)
 
 
 def _deserialize_execution_state(raw: str) -> dict | None:
     try:
-        value = json.loads(raw)
+        value = json_codec.loads(raw)
     except Exception:
         return None
     return value if isinstance(value, dict) else None
@@ -784,6 +1416,7 @@ async def _run_comfyui_listener(
     Background task that connects to ComfyUI WS, receives events,
     and broadcasts enriched messages to the frontend.
     """
+    set_operation_label(f"comfyui listener task_id={task_id}")
     runtime_stop_event = stop_event or asyncio.Event()
     completed_prompts: set[str] = set()
     has_error = False
@@ -814,6 +1447,13 @@ async def _run_comfyui_listener(
             state["current_node_title"] = ""
             state["current_node_class_type"] = ""
             state["error_message"] = last_error_message if has_error else ""
+            if not has_error:
+                state["percent"] = 100.0
+                state["eta_seconds"] = 0.0
+                state["estimated_finish_at"] = _now_iso()
+            else:
+                state["eta_seconds"] = None
+                state["estimated_finish_at"] = None
             state["updated_at"] = _now_iso()
         if has_error:
             _append_event_log(task_id, "执行结束，存在错误", "error")
@@ -830,12 +1470,16 @@ async def _run_comfyui_listener(
         nonlocal has_error, last_error_message
         if runtime_stop_event.is_set():
             return
+        received_at = time.monotonic()
+        estimator = _progress_estimators.get(task_id)
+        recorder = _profile_recorders.get(task_id)
         logger.info(
             "Execution event relayed: task_id=%s type=%s prompt_id=%s node_id=%s",
             task_id,
             event.event_type,
             event.prompt_id,
             event.node_id,
+            extra=RATE_LIMITED,
         )
         message = {
             "type": event.event_type,
@@ -847,6 +1491,8 @@ async def _run_comfyui_listener(
         node_display = _format_node_display(node_id, node_title, node_class_type)
 
         if event.event_type == "execution_start":
+            if recorder is not None:
+                recorder.mark_started(received_at)
             # execution_start is already emitted by backend immediately after submit.
             # Avoid duplicate "执行开始" on frontend for the same prompt.
             if event.prompt_id:
@@ -856,6 +1502,9 @@ async def _run_comfyui_listener(
                     state["prompt_id"] = event.prompt_id
                     state["prompt_ids"] = sorted(prompt_ids)
                     state["completed_node_count"] = 0
+                    if estimator is not None:
+                        estimator.reset()
+                        state.update(estimator.snapshot(received_at))
                     state["updated_at"] = _now_iso()
                     _mark_execution_state_dirty(task_id)
             return
@@ -864,6 +1513,10 @@ async def _run_comfyui_listener(
             message["data"]["node_id"] = node_id
             message["data"]["node_title"] = node_title
             message["data"]["node_class_type"] = node_class_type
+            if estimator is not None:
+                estimator.start_node(node_id, received_at)
+            if recorder is not None:
+                recorder.node_started(node_id, received_at)
             state = _execution_states.get(task_id)
             if state is not None:
                 state["current_node_id"] = node_id or ""
@@ -882,6 +1535,10 @@ async def _run_comfyui_listener(
             message["data"]["node_class_type"] = node_class_type
             message["data"]["value"] = event.progress_value
             message["data"]["max"] = event.progress_max
+            if estimator is not None:
+                estimator.set_node_progress(node_id, float(event.progress_value or 0), float(event.progress_max or 0))
+            if recorder is not None:
+                recorder.node_progress(node_id, received_at)
             state = _execution_states.get(task_id)
             if state is not None:
                 state["progress"] = {
@@ -898,10 +1555,14 @@ async def _run_comfyui_listener(
             message["data"]["node_title"] = node_title
             message["data"]["node_class_type"] = node_class_type
             if node_id:
-                state = _execution_states.get(task_id)
-                if state is not None:
-                    state["completed_node_count"] = int(state.get("completed_node_count") or 0) + 1
-                    state["updated_at"] = _now_iso()
+                # Only output nodes send "executed"; other nodes complete when the next one starts executing.
+                if estimator is not None:
+                    if node_id == estimator.current_node_id:
+                        estimator.finish_current(received_at)
+                    else:
+                        estimator.mark_completed(node_id)
+                if recorder is not None:
+                    recorder.node_finished(node_id, received_at)
                 _append_event_log(task_id, f"节点 {node_display} 执行完毕", "success")
 
         elif event.event_type == "execution_error":
@@ -911,6 +1572,10 @@ async def _run_comfyui_listener(
             message["data"]["exception_message"] = event.extra.get("exception_message")
             has_error = True
             last_error_message = event.extra.get("exception_message") or "ComfyUI execution_error"
+            if estimator is not None:
+                estimator.current_node_id = None
+            if recorder is not None:
+                recorder.close_current(received_at)
             _append_event_log(
                 task_id,
                 f"节点 {node_display} 错误: {last_error_message}",
@@ -947,14 +1612,22 @@ async def _run_comfyui_listener(
                     for info in node_infos
                 ]
                 _append_event_log(task_id, f"缓存节点: {', '.join(labels)}", "info")
-                state = _execution_states.get(task_id)
-                if state is not None:
-                    state["completed_node_count"] = int(state.get("completed_node_count") or 0) + len(node_infos)
-                    state["updated_at"] = _now_iso()
+                if estimator is not None:
+                    for info in node_infos:
+                        estimator.mark_completed(info["node_id"])
+                if recorder is not None:
+                    recorder.nodes_cached([info["node_id"] for info in node_infos])
 
         state = _execution_states.get(task_id)
         if state is not None:
             state["completed_prompt_ids"] = sorted(completed_prompts)
+            if estimator is not None:
+                # Unique node ids: a node reported both cached and executed counts once.
+                state["completed_node_count"] = len(estimator.completed_node_ids)
+                progress_estimate = estimator.snapshot(received_at)
+                state.update(progress_estimate)
+                message["data"]["percent"] = progress_estimate["percent"]
+                message["data"]["eta_seconds"] = progress_estimate["eta_seconds"]
             state["updated_at"] = _now_iso()
             _mark_execution_state_dirty(task_id)
 
@@ -969,6 +1642,7 @@ async def _run_comfyui_listener(
             stop_event=runtime_stop_event,
             prompt_ids=prompt_ids,
             connected_event=connected_event,
+            on_binary=functools.partial(offer_preview_frame, task_id) if settings.preview_streaming_enabled else None,
         )
         # prompt_ids may be populated after early events arrive; re-check once listener returns
         await finalize_if_done()
@@ -1011,3 +1685,12 @@ async def _run_comfyui_listener(
         listener_task = _listener_tasks.get(task_id)
         if listener_task is asyncio.current_task():
             _listener_tasks.pop(task_id, None)
+            _progress_estimators.pop(task_id, None)
+            recorder = _profile_recorders.pop(task_id, None)
+            if recorder is not None and recorder.prompt_id:
+                final_state = _execution_states.get(task_id) or {}
+                try:
+                    await save_execution_profile(recorder, status_value=str(final_state.get("status") or "unknown"))
+                except Exception:
+                    logger.warning("Saving execution profile failed: task_id=%s", task_id, exc_info=True)
+            await get_pubsub_backend().release_lock(_listener_lock_name(task_id))
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.schemas.profile import (
+    ExecutionProfileListResponse,
+    ExecutionProfileRead,
+    ExecutionProfileSummary,
+    NodeClassProfileAggregate,
+    NodeClassProfileAggregateResponse,
+    WorkflowProfileAggregate,
+    WorkflowProfileAggregateResponse,
+)
+from app.services.execution_profile_service import (
+    aggregate_profiles_by_node_class,
+    aggregate_profiles_by_workflow,
+    get_execution_profile_or_404,
+    list_execution_profiles,
+)
+
+router = APIRouter(prefix="/execution-profiles", tags=["execution-profiles"])
+
+
+@router.get("", response_model=ExecutionProfileListResponse)
+async def list_execution_profiles_api(
+    task_id: UUID | None = Query(default=None),
+    workflow_hash: str | None = Query(default=None),
+    base_url: str | None = Query(default=None),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
+    session: AsyncSession = Depends(get_db),
+) -> ExecutionProfileListResponse:
+    items, total = await list_execution_profiles(
+        session,
+        task_id=task_id,
+        workflow_hash=workflow_hash,
+        base_url=base_url,
+        page=page,
+        page_size=page_size,
+    )
+    return ExecutionProfileListResponse(
+        items=[ExecutionProfileSummary.model_validate(item) for item in items],
+        total=total,
+        page=page,
+        page_size=page_size,
+    )
+
+
+@router.get("/aggregate/workflows", response_model=WorkflowProfileAggregateResponse)
+async def aggregate_profiles_by_workflow_api(
+    base_url: str | None = Query(default=None),
+    since: datetime | None = Query(default=None),
+    limit: int = Query(default=50, ge=1, le=500),
+    session: AsyncSession = Depends(get_db),
+) -> WorkflowProfileAggregateResponse:
+    items = await aggregate_profiles_by_workflow(session, base_url=base_url, since=since, limit=limit)
+    return WorkflowProfileAggregateResponse(items=[WorkflowProfileAggregate.model_validate(item) for item in items])
+
+
+@router.get("/aggregate/node-classes", response_model=NodeClassProfileAggregateResponse)
+async def aggregate_profiles_by_node_class_api(
+    workflow_hash: str | None = Query(default=None),
+    base_url: str | None = Query(default=None),
+    since: datetime | None = Query(default=None),
+    max_profiles: int = Query(default=2000, ge=1, le=20000),
+    session: AsyncSession = Depends(get_db),
+) -> NodeClassProfileAggregateResponse:
+    items, profile_count = await aggregate_profiles_by_node_class(
+        session,
+        workflow_hash=workflow_hash,
+        base_url=base_url,
+        since=since,
+        max_profiles=max_profiles,
+    )
+    return NodeClassProfileAggregateResponse(
+        items=[NodeClassProfileAggregate.model_validate(item) for item in items],
+        profile_count=profile_count,
+    )
+
+
+@router.get("/{profile_id}", response_model=ExecutionProfileRead)
+async def get_execution_profile_api(profile_id: UUID, session: AsyncSession = Depends(get_db)) -> ExecutionProfileRead:
+    profile = await get_execution_profile_or_404(session, profile_id)
+    return ExecutionProfileRead.model_validate(profile)
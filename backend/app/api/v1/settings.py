@@ -4,27 +4,36 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
-from app.schemas.settings import ComfyUIPortStatusItem, ComfyUIPortsStatusResponse, ComfyUISettingsPayload
+from app.schemas.settings import (
+    ComfyUIEndpointItem,
+    ComfyUIPortStatusItem,
+    ComfyUIPortsStatusResponse,
+    ComfyUISettingsPayload,
+)
+from app.services.comfyui_health_service import fetch_ports_runtime_status
 from app.services.comfyui_settings_service import (
-    fetch_ports_runtime_status,
-    get_or_create_comfyui_settings,
-    normalize_ports,
-    normalize_server_ip,
+    ComfyUISettingsSnapshot,
+    get_comfyui_settings_snapshot,
     update_comfyui_settings,
 )
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
 
-@router.get("/comfyui", response_model=ComfyUISettingsPayload)
-async def get_comfyui_settings(session: AsyncSession = Depends(get_db)) -> ComfyUISettingsPayload:
-    config = await get_or_create_comfyui_settings(session)
+def _to_settings_payload(config: ComfyUISettingsSnapshot) -> ComfyUISettingsPayload:
     return ComfyUISettingsPayload(
-        server_ip=normalize_server_ip(config.server_ip),
-        ports=normalize_ports([int(item) for item in (config.ports or [])]),
+        server_ip=config.server_ip,
+        ports=list(config.ports),
+        endpoints=[ComfyUIEndpointItem.model_validate(item.to_dict()) for item in config.endpoints],
     )
 
 
+@router.get("/comfyui", response_model=ComfyUISettingsPayload)
+async def get_comfyui_settings(session: AsyncSession = Depends(get_db)) -> ComfyUISettingsPayload:
+    config = await get_comfyui_settings_snapshot(session)
+    return _to_settings_payload(config)
+
+
 @router.put("/comfyui", response_model=ComfyUISettingsPayload)
 async def put_comfyui_settings(
     payload: ComfyUISettingsPayload,
@@ -35,14 +44,12 @@ async def put_comfyui_settings(
             session,
             server_ip=payload.server_ip,
             ports=payload.ports,
+            endpoints=[item.model_dump() for item in payload.endpoints],
         )
     except ValueError as exc:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
 
-    return ComfyUISettingsPayload(
-        server_ip=normalize_server_ip(updated.server_ip),
-        ports=normalize_ports([int(item) for item in (updated.ports or [])]),
-    )
+    return _to_settings_payload(updated)
 
 
 @router.get("/comfyui/ports/status", response_model=ComfyUIPortsStatusResponse)
@@ -53,6 +60,7 @@ async def get_comfyui_port_status(session: AsyncSession = Depends(get_db)) -> Co
         refreshed_at=refreshed_at,
         items=[
             ComfyUIPortStatusItem(
+                server_ip=item.server_ip,
                 port=item.port,
                 base_url=item.base_url,
                 reachable=item.reachable,
@@ -60,6 +68,13 @@ async def get_comfyui_port_status(session: AsyncSession = Depends(get_db)) -> Co
                 running_count=item.running_count,
                 pending_count=item.pending_count,
                 error=item.error,
+                latency_ms=item.latency_ms,
+                avg_latency_ms=item.avg_latency_ms,
+                circuit_state=item.circuit_state,
+                checked_at=item.checked_at,
+                weight=item.weight,
+                max_concurrency=item.max_concurrency,
+                tags=item.tags,
             )
             for item in items
         ],
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import json
+from collections.abc import Iterator
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.session import get_db
 from app.schemas.task import (
     TaskRead,
+    TaskTemplateBulkCreateRequest,
     TaskTemplateCreate,
     TaskTemplateCreateTaskRequest,
     TaskTemplateDeleteResponse,
@@ -18,6 +22,7 @@ from app.schemas.task import (
 )
 from app.services.template_service import (
     create_task_from_template,
+    create_tasks_from_template_bulk,
     create_template,
     delete_template,
     get_template_or_404,
@@ -90,3 +95,24 @@ async def create_task_from_template_api(
     template = await get_template_or_404(session, template_id)
     task = await create_task_from_template(session, template=template, payload=payload)
     return TaskRead.model_validate(task)
+
+
+def _iter_bulk_result_lines(task_ids: list[UUID], *, enqueued: bool) -> Iterator[str]:
+    for index, task_id in enumerate(task_ids):
+        yield json.dumps({"index": index, "task_id": str(task_id)}) + "\n"
+    yield json.dumps({"done": True, "count": len(task_ids), "enqueued": enqueued}) + "\n"
+
+
+@router.post("/{template_id}/bulk-create-tasks", response_class=StreamingResponse)
+async def bulk_create_tasks_from_template_api(
+    template_id: UUID,
+    payload: TaskTemplateBulkCreateRequest,
+    session: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    """Streams one NDJSON line per created task id, then a summary line."""
+    template = await get_template_or_404(session, template_id)
+    task_ids = await create_tasks_from_template_bulk(session, template=template, payload=payload)
+    return StreamingResponse(
+        _iter_bulk_result_lines(task_ids, enqueued=payload.enqueue),
+        media_type="application/x-ndjson",
+    )
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-import json
-
 from fastapi import APIRouter, File, HTTPException, Request, UploadFile, status
 
+from app.core import json_codec
 from app.schemas.upload import UploadImageBase64Request, UploadImageResponse, WorkflowUploadResponse
+from app.services.comfyui_object_info_service import known_class_types_across_endpoints
 from app.services.upload_service import UpstreamImageUploadService, decode_base64_image
+from app.services.workflow_analysis_service import analysis_errors_summary, analyze_workflow, find_unknown_class_types
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
@@ -56,8 +57,8 @@ async def upload_workflow(file: UploadFile = File(...)) -> WorkflowUploadRespons
 
     content = await file.read()
     try:
-        workflow_json = json.loads(content.decode("utf-8"))
-    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        workflow_json = json_codec.loads(content)
+    except (json_codec.JSONDecodeError, UnicodeDecodeError) as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid JSON file: {str(e)}",
@@ -69,10 +70,25 @@ async def upload_workflow(file: UploadFile = File(...)) -> WorkflowUploadRespons
             detail="Workflow JSON must be an object (ComfyUI API format)",
         )
 
-    node_count = len(workflow_json)
+    analysis = analyze_workflow(workflow_json)
+    if not analysis.valid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid workflow: {analysis_errors_summary(analysis)}",
+        )
+    # Endpoints differ in installed nodes, so classes unknown to every cached endpoint are only a warning here;
+    # execute enforces the check against the selected endpoint.
+    known_class_types = known_class_types_across_endpoints()
+    if known_class_types is not None:
+        analysis.unknown_class_types = find_unknown_class_types(analysis.class_types, known_class_types)
+        if analysis.unknown_class_types:
+            analysis.warnings.append(
+                f"Node classes not installed on any known ComfyUI endpoint: {', '.join(analysis.unknown_class_types)}"
+            )
 
     return WorkflowUploadResponse(
         workflow_json=workflow_json,
-        node_count=node_count,
+        node_count=analysis.node_count,
         filename=file.filename,
+        analysis=analysis.to_dict(),
     )
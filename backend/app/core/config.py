@@ -15,14 +15,56 @@ class Settings(BaseSettings):
     upload_api_base_url: str = "http://api.test-hot-product.echooo.link"
     log_level: str = "INFO"
     log_dir: str = "logs"
+    # One JSON object per line instead of the plain text format.
+    log_json: bool = False
+    # Records beyond this many waiting for the background writer are dropped.
+    log_queue_size: int = 10000
+    # Per-event logs (ComfyUI events, relays) allowed per second per message; 0 disables.
+    log_rate_limit_per_second: int = 20
+    # In-process Prometheus-style metrics served at /metrics.
+    metrics_enabled: bool = True
+    # Heartbeat task plus a thread that dumps the loop's stack when a callback blocks it too long.
+    loop_watchdog_enabled: bool = False
+    loop_watchdog_interval_ms: float = 100.0
+    loop_watchdog_threshold_ms: float = 250.0
 
     max_image_size_mb: int = 10
     max_images_per_subtask: int = 10
+    max_tasks_per_bulk_request: int = 1000
 
     cors_origins: str = "http://localhost:5173"
     auto_create_tables: bool = True
+    # "auto" uses PostgreSQL LISTEN/NOTIFY when DATABASE_URL is PostgreSQL, otherwise in-memory.
+    pubsub_backend: str = "auto"
+    # Scheduler leadership lease; the holder renews every ttl/3 seconds.
+    leader_lease_ttl_seconds: float = 30.0
 
     comfyui_api_base_url: str = "http://34.59.208.230:8189"
+    comfyui_settings_cache_ttl_seconds: float = 5.0
+    comfyui_health_interval_seconds: float = 10.0
+    comfyui_health_timeout_seconds: float = 3.0
+    comfyui_health_max_backoff_seconds: float = 120.0
+    comfyui_health_failure_threshold: int = 3
+    comfyui_health_history_size: int = 60
+    comfyui_object_info_ttl_seconds: float = 600.0
+    comfyui_object_info_timeout_seconds: float = 15.0
+    # After a failed /object_info fetch the endpoint counts as unknown for this long before the next attempt.
+    comfyui_object_info_retry_seconds: float = 60.0
+
+    # Recent events per task kept for execution WS clients resuming with ?since=<seq>;
+    # clients further behind get a full state_sync instead.
+    execution_replay_buffer_size: int = 256
+    # Live sampler previews for execution WS clients that connect with ?previews=true.
+    preview_streaming_enabled: bool = False
+    preview_max_fps: float = 2.0
+    # Longest side in pixels after downscaling (needs the "previews" extra, i.e. Pillow); 0 relays ComfyUI's image as is.
+    preview_max_size: int = 256
+    preview_jpeg_quality: int = 70
+
+    workflow_metadata_cache_max_entries: int = 256
+    workflow_metadata_cache_max_bytes: int = 64 * 1024 * 1024
+    # Recent per-node durations kept per (workflow, class_type, endpoint) for ETA quantiles.
+    node_duration_window_size: int = 64
 
     @property
     def max_image_size_bytes(self) -> int:
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+# JSON encoding for hot paths: ComfyUI WS frames, execution state persistence,
+# WebSocket broadcasts, pub/sub envelopes and API responses. Uses orjson, a
+# declared dependency; the standard library fallback only keeps environments
+# where it cannot be installed working (benchmark baselines assume orjson). Both
+# produce compact UTF-8 JSON, and decode errors are json.JSONDecodeError
+# (orjson's subclasses it).
+#
+# Not for content hashes: byte-for-byte output differs between the backends
+# (float formatting), so workflow fingerprints keep using the json module.
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback where orjson cannot be installed
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(value: Any) -> bytes:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS)
+
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value, option=_ORJSON_OPTIONS).decode("utf-8")
+
+    def loads(data: str | bytes | bytearray | memoryview) -> Any:
+        return orjson.loads(data)
+
+else:
+    JSON_BACKEND = "json"
+
+    def dumps(value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+    def dumps_bytes(value: Any) -> bytes:
+        return dumps(value).encode("utf-8")
+
+    def loads(data: str | bytes | bytearray | memoryview) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default API response class; renders through the codec above."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
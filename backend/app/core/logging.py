@@ -1,14 +1,31 @@
 from __future__ import annotations
 
+import atexit
+import json
 import logging
 import os
-from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
 
+from app.core.metrics import counter, gauge
+
 
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 
+# Pass as `extra=` on per-event logs so they are subject to rate limiting.
+RATE_LIMITED = {"rate_limited": True}
+
+_RATE_LIMIT_WINDOW_SECONDS = 1.0
+
+_log_records_dropped = counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+_log_records_suppressed = counter("log_records_suppressed_total", "Rate-limited log records that were not written")
+_log_queue_depth = gauge("log_queue_depth", "Log records waiting for the background writer")
+
+_queue_listener: QueueListener | None = None
+
 
 def _daily_log_namer(default_name: str) -> str:
     directory = os.path.dirname(default_name)
@@ -20,7 +37,133 @@ def _daily_log_namer(default_name: str) -> str:
     return os.path.join(directory, parsed.strftime("%Y_%m_%d.log"))
 
 
-def setup_logging(level: str, log_dir: str) -> None:
+# ──────────────────────────────────────────────
+# Formatting and Filtering
+# ──────────────────────────────────────────────
+
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            payload["suppressed"] = suppressed
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `per_second` records per (logger, message template) for
+    records logged with `extra=RATE_LIMITED`. The first record of the next window
+    reports how many were suppressed.
+    """
+
+    def __init__(self, per_second: int) -> None:
+        super().__init__()
+        self.per_second = per_second
+        self._windows: dict[tuple[str, str], list] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.per_second <= 0 or not getattr(record, "rate_limited", False):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        # [window_started, emitted, suppressed]
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= _RATE_LIMIT_WINDOW_SECONDS:
+            suppressed = window[2] if window is not None else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+                record.msg = f"{record.msg} (suppressed {suppressed} similar)"
+            return True
+        if window[1] < self.per_second:
+            window[1] += 1
+            return True
+        window[2] += 1
+        _log_records_suppressed.inc()
+        return False
+
+
+# ──────────────────────────────────────────────
+# Queue Handler
+# ──────────────────────────────────────────────
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the background writer without ever blocking the caller.
+    When the bounded queue is full the record is dropped and counted; the drop
+    count is reported by the next record that fits.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, leaving formatting to the writer thread.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.dropped:
+            notice = logging.makeLogRecord(
+                {
+                    "name": "app.logging",
+                    "levelno": logging.WARNING,
+                    "levelname": "WARNING",
+                    "msg": f"Log queue full, dropped {self.dropped} records",
+                }
+            )
+            try:
+                self.queue.put_nowait(notice)
+            except queue.Full:
+                pass
+            else:
+                self.dropped = 0
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _log_records_dropped.inc()
+
+
+def stop_logging() -> None:
+    """Drain queued records to the real handlers and stop the writer thread."""
+    global _queue_listener
+    listener = _queue_listener
+    _queue_listener = None
+    if listener is not None:
+        listener.stop()
+
+
+def setup_logging(
+    level: str,
+    log_dir: str,
+    *,
+    json_format: bool = False,
+    queue_size: int = 10000,
+    rate_limit_per_second: int = 20,
+) -> None:
+    global _queue_listener
     root_logger = logging.getLogger()
     if getattr(root_logger, "_flow_task_logging_configured", False):
         return
@@ -33,7 +176,7 @@ def setup_logging(level: str, log_dir: str) -> None:
 
     app_log_path = resolved_log_dir / "app.log"
 
-    formatter = logging.Formatter(LOG_FORMAT)
+    formatter = JsonLogFormatter() if json_format else logging.Formatter(LOG_FORMAT)
 
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
@@ -51,10 +194,20 @@ def setup_logging(level: str, log_dir: str) -> None:
     file_handler.setFormatter(formatter)
     file_handler.setLevel(log_level)
 
+    # Stream and file I/O happen on the listener thread, never on the event loop.
+    log_queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.setLevel(log_level)
+    queue_handler.addFilter(RateLimitFilter(rate_limit_per_second))
+    _log_queue_depth.set_function(log_queue.qsize)
+
+    _queue_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    _queue_listener.start()
+    atexit.register(stop_logging)
+
     root_logger.handlers.clear()
     root_logger.setLevel(log_level)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    root_logger.addHandler(queue_handler)
     root_logger._flow_task_logging_configured = True
 
     for name in ("uvicorn", "uvicorn.error", "uvicorn.access", "fastapi"):
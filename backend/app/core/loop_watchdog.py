@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+
+from app.core.config import settings
+from app.core.metrics import counter, histogram
+
+logger = logging.getLogger("app.loop_watchdog")
+
+_STACK_DEPTH = 25
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_loop_lag_seconds = histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the watchdog heartbeat was due and when it ran",
+    buckets=_LAG_BUCKETS,
+)
+_loop_stalls = counter("event_loop_stalls_total", "Callbacks that held the event loop longer than the threshold")
+_loop_stall_seconds = histogram(
+    "event_loop_stall_seconds",
+    "How long stalled callbacks held the event loop",
+    buckets=_LAG_BUCKETS,
+)
+
+# What the current task is working on, e.g. "GET /api/v1/tasks request_id=ab12cd34".
+_operation_label: contextvars.ContextVar[str] = contextvars.ContextVar("operation_label", default="")
+# Labels captured when each task was created, readable from the watchdog thread.
+_task_labels: weakref.WeakKeyDictionary[asyncio.Task, str] = weakref.WeakKeyDictionary()
+
+_label_users = 0
+
+_heartbeat_task: asyncio.Task | None = None
+_watchdog_thread: threading.Thread | None = None
+_watchdog_stop: threading.Event | None = None
+_last_beat = 0.0
+
+
+def set_operation_label(label: str) -> None:
+    """Name the work the current task (and tasks it spawns) is doing, for stall reports."""
+    _operation_label.set(label)
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None and _label_users:
+        _task_labels[task] = label
+
+
+def get_task_label(task: asyncio.Task | None) -> str:
+    return _task_labels.get(task, "") if task is not None else ""
+
+
+def enable_task_labels(loop: asyncio.AbstractEventLoop) -> None:
+    """Start copying operation labels onto new tasks; paired with disable_task_labels."""
+    global _label_users
+    _label_users += 1
+    if loop.get_task_factory() is None:
+        loop.set_task_factory(_labelling_task_factory)
+
+
+def disable_task_labels(loop: asyncio.AbstractEventLoop) -> None:
+    global _label_users
+    _label_users = max(0, _label_users - 1)
+    if not _label_users and loop.get_task_factory() is _labelling_task_factory:
+        loop.set_task_factory(None)
+
+
+def _labelling_task_factory(loop: asyncio.AbstractEventLoop, coro, **kwargs) -> asyncio.Task:
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    label = context.get(_operation_label, "") if context is not None else _operation_label.get()
+    if label:
+        _task_labels[task] = label
+    return task
+
+
+def _describe_task(task: asyncio.Task | None) -> str:
+    if task is None:
+        return "callback outside any task"
+    coro = task.get_coro()
+    description = f"{task.get_name()} ({getattr(coro, '__qualname__', type(coro).__name__)})"
+    label = get_task_label(task)
+    return f"{description} [{label}]" if label else description
+
+
+# ──────────────────────────────────────────────
+# Heartbeat (event loop side)
+# ──────────────────────────────────────────────
+
+
+async def _heartbeat_loop(interval: float, threshold: float) -> None:
+    global _last_beat
+    while True:
+        due = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        now = time.monotonic()
+        lag = max(0.0, now - due)
+        _loop_lag_seconds.observe(lag)
+        if lag >= threshold:
+            _loop_stall_seconds.observe(lag)
+        _last_beat = now
+
+
+# ──────────────────────────────────────────────
+# Watchdog Thread
+# ──────────────────────────────────────────────
+
+
+def _watch(
+    loop: asyncio.AbstractEventLoop,
+    loop_thread_id: int,
+    interval: float,
+    threshold: float,
+    stop: threading.Event,
+) -> None:
+    reported_beat = 0.0
+    while not stop.wait(min(interval, threshold) / 2):
+        beat = _last_beat
+        blocked_for = time.monotonic() - beat - interval
+        if blocked_for < threshold or beat == reported_beat:
+            continue
+        reported_beat = beat
+        _loop_stalls.inc()
+        frame = sys._current_frames().get(loop_thread_id)
+        stack = "".join(traceback.format_stack(frame, limit=_STACK_DEPTH)) if frame is not None else ""
+        try:
+            task = asyncio.current_task(loop)
+        except RuntimeError:
+            task = None
+        logger.warning(
+            "Event loop blocked for %.0fms (threshold %.0fms) by %s\n%s",
+            blocked_for * 1000,
+            threshold * 1000,
+            _describe_task(task),
+            stack,
+        )
+
+
+def start_loop_watchdog() -> None:
+    global _heartbeat_task, _watchdog_thread, _watchdog_stop, _last_beat
+    if not settings.loop_watchdog_enabled or _watchdog_thread is not None:
+        return
+    loop = asyncio.get_running_loop()
+    interval = max(0.01, settings.loop_watchdog_interval_ms / 1000)
+    threshold = max(0.01, settings.loop_watchdog_threshold_ms / 1000)
+    enable_task_labels(loop)
+    _last_beat = time.monotonic()
+    _heartbeat_task = loop.create_task(_heartbeat_loop(interval, threshold))
+    _watchdog_stop = threading.Event()
+    _watchdog_thread = threading.Thread(
+        target=_watch,
+        args=(loop, threading.get_ident(), interval, threshold, _watchdog_stop),
+        name="loop-watchdog",
+        daemon=True,
+    )
+    _watchdog_thread.start()
+    logger.info("Event loop watchdog started: threshold=%.0fms", threshold * 1000)
+
+
+async def stop_loop_watchdog() -> None:
+    global _heartbeat_task, _watchdog_thread, _watchdog_stop
+    heartbeat = _heartbeat_task
+    stop = _watchdog_stop
+    _heartbeat_task = None
+    _watchdog_thread = None
+    _watchdog_stop = None
+    if stop is not None:
+        stop.set()
+    if heartbeat is None:
+        return
+    disable_task_labels(asyncio.get_running_loop())
+    heartbeat.cancel()
+    try:
+        await heartbeat
+    except asyncio.CancelledError:
+        pass
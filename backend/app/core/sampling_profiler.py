@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from types import FrameType
+
+from app.core.loop_watchdog import disable_task_labels, enable_task_labels, get_task_label
+
+# Time-boxed in-process sampling profiler. Two kinds of samples are collected:
+#   wall  — a thread reads every thread's current stack (sys._current_frames),
+#           showing where CPU/blocking time goes, including the event loop thread;
+#   tasks — a coroutine on the loop walks each pending asyncio task's await
+#           chain, showing where requests and listeners spend time suspended.
+# Samples are aggregated as collapsed stacks ("root;outer;inner count").
+
+MODE_WALL = "wall"
+MODE_TASKS = "tasks"
+MODE_ALL = "all"
+
+_MAX_STACK_DEPTH = 128
+
+_profile_running = False
+
+
+@dataclass
+class ProfileResult:
+    mode: str
+    interval_ms: float
+    duration_seconds: float
+    request_id: str | None
+    sample_count: int = 0
+    stacks: Counter[tuple[str, ...]] = field(default_factory=Counter)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    filename = "/".join(parts[-2:])
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+def _thread_stack(frame: FrameType | None) -> list[str]:
+    names: list[str] = []
+    while frame is not None and len(names) < _MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+def _task_stack(task: asyncio.Task) -> list[str]:
+    """Outer-to-inner frames of a task's await chain (Task.get_stack stops at the outermost)."""
+    names: list[str] = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(names) < _MAX_STACK_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        names.append(_frame_name(frame))
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return names
+
+
+def _matches_request(label: str, request_id: str | None) -> bool:
+    """Labels are space-separated, e.g. "GET /api/v1/tasks request_id=ab12cd34"; the id must match exactly."""
+    return request_id is None or f"request_id={request_id}" in label.split(" ")
+
+
+# ──────────────────────────────────────────────
+# Samplers
+# ──────────────────────────────────────────────
+
+
+def _sample_threads(
+    result: ProfileResult,
+    loop: asyncio.AbstractEventLoop,
+    loop_thread_id: int,
+    deadline: float,
+) -> None:
+    interval = result.interval_ms / 1000
+    own_ident = threading.get_ident()
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        if result.request_id is not None:
+            # Only the loop thread runs request code; sample it while that request's task is running.
+            try:
+                task = asyncio.current_task(loop)
+            except RuntimeError:
+                task = None
+            if task is not None and _matches_request(get_task_label(task), result.request_id):
+                stack = _thread_stack(frames.get(loop_thread_id))
+                result.stacks[("wall", thread_names.get(loop_thread_id, "loop"), *stack)] += 1
+                result.sample_count += 1
+        else:
+            for ident, frame in frames.items():
+                if ident == own_ident:
+                    continue
+                stack = _thread_stack(frame)
+                result.stacks[("wall", thread_names.get(ident, str(ident)), *stack)] += 1
+            result.sample_count += 1
+        time.sleep(interval)
+
+
+async def _sample_tasks(result: ProfileResult, deadline: float) -> None:
+    interval = result.interval_ms / 1000
+    current = asyncio.current_task()
+    while time.monotonic() < deadline:
+        for task in asyncio.all_tasks():
+            if task is current or task.done():
+                continue
+            label = get_task_label(task)
+            if not _matches_request(label, result.request_id):
+                continue
+            stack = _task_stack(task)
+            if stack:
+                result.stacks[("tasks", label or task.get_name(), *stack)] += 1
+        result.sample_count += 1
+        await asyncio.sleep(interval)
+
+
+def profiler_busy() -> bool:
+    return _profile_running
+
+
+async def run_sampling_profile(
+    *,
+    duration_seconds: float,
+    interval_ms: float,
+    mode: str = MODE_ALL,
+    request_id: str | None = None,
+) -> ProfileResult:
+    """Sample for `duration_seconds`; callers check profiler_busy() since only one profile runs at a time."""
+    global _profile_running
+    result = ProfileResult(
+        mode=mode,
+        interval_ms=interval_ms,
+        duration_seconds=duration_seconds,
+        request_id=request_id,
+    )
+    loop = asyncio.get_running_loop()
+    _profile_running = True
+    enable_task_labels(loop)
+    try:
+        deadline = time.monotonic() + duration_seconds
+        samplers = []
+        if mode in (MODE_WALL, MODE_ALL):
+            thread = threading.Thread(
+                target=_sample_threads,
+                args=(result, loop, threading.get_ident(), deadline),
+                name="sampling-profiler",
+                daemon=True,
+            )
+            thread.start()
+            samplers.append(asyncio.to_thread(thread.join))
+        if mode in (MODE_TASKS, MODE_ALL):
+            samplers.append(_sample_tasks(result, deadline))
+        await asyncio.gather(*samplers)
+    finally:
+        disable_task_labels(loop)
+        _profile_running = False
+    return result
+
+
+# ──────────────────────────────────────────────
+# Output Formats
+# ──────────────────────────────────────────────
+
+
+def to_collapsed(result: ProfileResult) -> str:
+    lines = [
+        f"{';'.join(name.replace(';', ':') for name in stack)} {count}"
+        for stack, count in result.stacks.most_common()
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(result: ProfileResult) -> dict:
+    """Speedscope file format: one sampled profile per wall thread / task group."""
+    frames: list[dict] = []
+    frame_index: dict[str, int] = {}
+    profiles: dict[tuple[str, str], dict] = {}
+    for stack, count in result.stacks.items():
+        kind, root, *names = stack
+        profile = profiles.get((kind, root))
+        if profile is None:
+            profile = {
+                "type": "sampled",
+                "name": f"{kind}: {root}",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": 0,
+                "samples": [],
+                "weights": [],
+            }
+            profiles[(kind, root)] = profile
+        indexes = []
+        for name in names:
+            index = frame_index.get(name)
+            if index is None:
+                index = len(frames)
+                frame_index[name] = index
+                frames.append({"name": name})
+            indexes.append(index)
+        weight = count * result.interval_ms
+        profile["samples"].append(indexes)
+        profile["weights"].append(weight)
+        profile["endValue"] += weight
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"{result.mode} profile ({result.duration_seconds:g}s)",
+        "exporter": "task-manager sampling profiler",
+        "shared": {"frames": frames},
+        "profiles": sorted(profiles.values(), key=lambda item: -item["endValue"]),
+    }
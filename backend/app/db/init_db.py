@@ -4,7 +4,18 @@ from sqlalchemy import text
 
 from app.db.base import Base
 from app.db.session import engine
-from app.models import comfyui_setting, generated_image, generated_video, photo, subtask, task, task_template  # noqa: F401
+from app.models import (  # noqa: F401
+    comfyui_setting,
+    execution_profile,
+    generated_image,
+    generated_video,
+    node_duration_stat,
+    photo,
+    service_lease,
+    subtask,
+    task,
+    task_template,
+)
 
 
 async def init_db() -> None:
@@ -17,16 +28,29 @@ async def init_db() -> None:
         await conn.execute(text("ALTER TABLE tasks DROP COLUMN IF EXISTS version"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS workflow_json JSONB"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS workflow_filename TEXT"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS workflow_hash VARCHAR(64)"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS workflow_analysis JSONB"))
+        await conn.execute(text("ALTER TABLE task_templates ADD COLUMN IF NOT EXISTS workflow_analysis JSONB"))
+        await conn.execute(text("ALTER TABLE task_templates ADD COLUMN IF NOT EXISTS workflow_hash VARCHAR(64)"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS execution_state TEXT"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS progress_percent DOUBLE PRECISION"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS estimated_finish_at TIMESTAMPTZ"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_enabled BOOLEAN NOT NULL DEFAULT FALSE"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_at TIMESTAMPTZ"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_time VARCHAR(5)"))
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_port INTEGER"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_server_ip VARCHAR(255)"))
         await conn.execute(
             text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_auto_dispatch BOOLEAN NOT NULL DEFAULT TRUE")
         )
         await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS schedule_last_triggered_at TIMESTAMPTZ"))
         await conn.execute(text("ALTER TABLE task_templates ADD COLUMN IF NOT EXISTS workflow_json JSONB"))
+        await conn.execute(text("ALTER TABLE task_templates ADD COLUMN IF NOT EXISTS parameters JSONB NOT NULL DEFAULT '{}'"))
+        await conn.execute(
+            text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS template_id UUID REFERENCES task_templates(id)")
+        )
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_template_id ON tasks (template_id)"))
+        await conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS parameter_values JSONB NOT NULL DEFAULT '{}'"))
         if dialect == "postgresql":
             await conn.execute(
                 text(
@@ -35,6 +59,8 @@ async def init_db() -> None:
                         key VARCHAR(32) PRIMARY KEY,
                         server_ip VARCHAR(255) NOT NULL,
                         ports JSONB NOT NULL DEFAULT '[]'::jsonb,
+                        endpoints JSONB NOT NULL DEFAULT '[]'::jsonb,
+                        version INTEGER NOT NULL DEFAULT 1,
                         created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
                         updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
                     )
@@ -49,9 +75,14 @@ async def init_db() -> None:
                         key VARCHAR(32) PRIMARY KEY,
                         server_ip VARCHAR(255) NOT NULL,
                         ports JSON NOT NULL DEFAULT '[]',
+                        endpoints JSON NOT NULL DEFAULT '[]',
+                        version INTEGER NOT NULL DEFAULT 1,
                         created_at DATETIME NOT NULL,
                         updated_at DATETIME NOT NULL
                     )
                     """
                 )
             )
+        await conn.execute(text("ALTER TABLE comfyui_settings ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"))
+        endpoints_type = "JSONB NOT NULL DEFAULT '[]'::jsonb" if dialect == "postgresql" else "JSON NOT NULL DEFAULT '[]'"
+        await conn.execute(text(f"ALTER TABLE comfyui_settings ADD COLUMN IF NOT EXISTS endpoints {endpoints_type}"))
@@ -1,15 +1,55 @@
 from __future__ import annotations
 
+import time
 from collections.abc import AsyncGenerator
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.metrics import counter, histogram
 
 engine = create_async_engine(settings.database_url, future=True, pool_pre_ping=True)
 SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
+_db_query_seconds = histogram("db_query_duration_seconds", "Database statement execution time", ("operation",))
+_db_query_errors = counter("db_query_errors_total", "Database statements that raised", ("operation",))
+_db_session_seconds = histogram("db_session_duration_seconds", "Lifetime of request-scoped database sessions")
+_DB_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def _statement_operation(statement: str) -> str:
+    head = statement.lstrip()[:6].upper()
+    for operation in _DB_OPERATIONS:
+        if head.startswith(operation):
+            return operation
+    return "OTHER"
+
+
+if settings.metrics_enabled:
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            _db_query_seconds.labels(_statement_operation(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(exception_context) -> None:
+        if exception_context.connection is not None:
+            exception_context.connection.info.pop("query_started", None)
+        _db_query_errors.labels(_statement_operation(exception_context.statement or "")).inc()
+
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
-        yield session
+    started = time.perf_counter()
+    try:
+        async with SessionLocal() as session:
+            yield session
+    finally:
+        if settings.metrics_enabled:
+            _db_session_seconds.observe(time.perf_counter() - started)
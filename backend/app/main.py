@@ -1,23 +1,60 @@
 from __future__ import annotations
 
 import logging
+import re
 import time
 import uuid
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.requests import Request
+from fastapi.responses import PlainTextResponse
 
+from app.api.v1.execution import register_execution_pubsub_handlers
 from app.api.v1.router import api_router
 from app.core.config import settings
-from app.core.logging import setup_logging
+from app.core.json_codec import FastJSONResponse
+from app.core.logging import setup_logging, stop_logging
+from app.core.loop_watchdog import set_operation_label, start_loop_watchdog, stop_loop_watchdog
+from app.core.metrics import counter, histogram, render_metrics
 from app.db.init_db import init_db
+from app.services.comfyui_health_service import start_health_monitor, stop_health_monitor
+from app.services.comfyui_settings_service import register_settings_pubsub_handlers
+from app.services.node_duration_service import stop_node_duration_flush
+from app.services.preview_service import check_preview_support
+from app.services.pubsub_service import start_pubsub, stop_pubsub
 from app.services.task_scheduler_service import start_task_scheduler, stop_task_scheduler
 
-setup_logging(settings.log_level, settings.log_dir)
+setup_logging(
+    settings.log_level,
+    settings.log_dir,
+    json_format=settings.log_json,
+    queue_size=settings.log_queue_size,
+    rate_limit_per_second=settings.log_rate_limit_per_second,
+)
 logger = logging.getLogger("app")
 
-app = FastAPI(title="Task Manager API", version="0.1.0")
+_http_request_seconds = histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+_http_request_exceptions = counter(
+    "http_request_exceptions_total",
+    "HTTP requests that raised instead of returning a response",
+    ("method", "route"),
+)
+
+_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def _route_template(request: Request) -> str:
+    # Templates, not raw paths, keep the label set bounded.
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+app = FastAPI(title="Task Manager API", version="0.1.0", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,16 +66,22 @@ app.add_middleware(
 
 @app.middleware("http")
 async def request_logging_middleware(request: Request, call_next):
-    request_id = uuid.uuid4().hex[:8]
+    # A caller-chosen id lets the sampling profiler target this one request.
+    request_id = request.headers.get("X-Request-ID", "")
+    if not _REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex[:8]
     start = time.perf_counter()
     path_with_query = request.url.path
     if request.url.query:
         path_with_query = f"{path_with_query}?{request.url.query}"
+    set_operation_label(f"{request.method} {request.url.path} request_id={request_id}")
 
     try:
         response = await call_next(request)
     except Exception:
         duration_ms = (time.perf_counter() - start) * 1000
+        if settings.metrics_enabled:
+            _http_request_exceptions.labels(request.method, _route_template(request)).inc()
         logger.exception(
             "[%s] %s %s -> 500 (%.2fms)",
             request_id,
@@ -49,6 +92,10 @@ async def request_logging_middleware(request: Request, call_next):
         raise
 
     duration_ms = (time.perf_counter() - start) * 1000
+    if settings.metrics_enabled:
+        _http_request_seconds.labels(request.method, _route_template(request), response.status_code).observe(
+            duration_ms / 1000
+        )
     logger.info(
         "[%s] %s %s -> %s (%.2fms)",
         request_id,
@@ -69,12 +116,23 @@ async def startup_event() -> None:
     logger.info("Starting API with env=%s db=%s", settings.app_env, settings.database_url)
     if settings.auto_create_tables:
         await init_db()
+    register_settings_pubsub_handlers()
+    register_execution_pubsub_handlers()
+    await start_pubsub()
+    start_loop_watchdog()
+    start_health_monitor()
     start_task_scheduler()
+    check_preview_support()
 
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     await stop_task_scheduler()
+    await stop_health_monitor()
+    await stop_node_duration_flush()
+    await stop_pubsub()
+    await stop_loop_watchdog()
+    stop_logging()
 
 
 @app.get("/healthz")
@@ -82,4 +140,11 @@ async def healthz() -> dict[str, str]:
     return {"status": "ok"}
 
 
+if settings.metrics_enabled:
+
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 app.include_router(api_router)
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
 from app.models.comfyui_setting import ComfyUISetting
+from app.models.execution_profile import ExecutionProfile
 from app.models.generated_image import SubTaskGeneratedImage
+from app.models.node_duration_stat import NodeDurationStat
 from app.models.photo import SubTaskPhoto
+from app.models.service_lease import ServiceLease
 from app.models.subtask import SubTask
 from app.models.task import Task
 from app.models.task_template import TaskTemplate
 
-__all__ = ["Task", "SubTask", "SubTaskPhoto", "SubTaskGeneratedImage", "TaskTemplate", "ComfyUISetting"]
+__all__ = [
+    "Task",
+    "SubTask",
+    "SubTaskPhoto",
+    "SubTaskGeneratedImage",
+    "TaskTemplate",
+    "ComfyUISetting",
+    "ServiceLease",
+    "NodeDurationStat",
+    "ExecutionProfile",
+]
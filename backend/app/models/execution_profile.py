@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, ForeignKey, Integer, JSON, String, Uuid
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class ExecutionProfile(Base):
+    """
+    Timing profile of one ComfyUI run. The node timeline is stored column-wise in
+    ``timeline`` (parallel arrays, class types dictionary-encoded) so a profile of a
+    few hundred nodes stays a few kilobytes.
+    """
+
+    __tablename__ = "execution_profiles"
+
+    id: Mapped[uuid.UUID] = mapped_column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    task_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid(as_uuid=True), ForeignKey("tasks.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    prompt_id: Mapped[str] = mapped_column(String(64), nullable=False, default="")
+    workflow_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    base_url: Mapped[str] = mapped_column(String(512), nullable=False, default="")
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    submitted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False, index=True)
+    queue_wait_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    wall_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    executed_node_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cached_node_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    timeline: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
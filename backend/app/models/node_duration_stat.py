@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Float, Integer, JSON, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class NodeDurationStat(Base):
+    """Execution time history of one node class within one workflow on one ComfyUI endpoint."""
+
+    __tablename__ = "node_duration_stats"
+
+    workflow_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    class_type: Mapped[str] = mapped_column(String(255), primary_key=True, index=True)
+    base_url: Mapped[str] = mapped_column(String(512), primary_key=True)
+    sample_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    mean_ms: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    p50_ms: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    p90_ms: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    # Most recent durations in milliseconds, oldest first; the quantiles are taken over this window.
+    recent_ms: Mapped[list] = mapped_column(JSON, default=list, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
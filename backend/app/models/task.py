@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, Enum, Integer, JSON, String, Text, Uuid
+from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Integer, JSON, String, Text, Uuid
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -24,11 +24,23 @@ class Task(Base):
     comfy_message: Mapped[str | None] = mapped_column(Text, nullable=True)
     extra: Mapped[dict] = mapped_column(JSON, default=dict)
     execution_state: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Copied out of execution_state whenever it is persisted, so task lists need not decode it.
+    progress_percent: Mapped[float | None] = mapped_column(Float, nullable=True)
+    estimated_finish_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     workflow_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     workflow_filename: Mapped[str | None] = mapped_column(Text, nullable=True)
+    workflow_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    workflow_analysis: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Set when the task runs its template's workflow; workflow_json then stays NULL
+    # and the payload is assembled from the template plus parameter_values.
+    template_id: Mapped[uuid.UUID | None] = mapped_column(
+        Uuid(as_uuid=True), ForeignKey("task_templates.id"), nullable=True, index=True
+    )
+    parameter_values: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
     schedule_enabled: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     schedule_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     schedule_time: Mapped[str | None] = mapped_column(String(5), nullable=True)
+    schedule_server_ip: Mapped[str | None] = mapped_column(String(255), nullable=True)
     schedule_port: Mapped[int | None] = mapped_column(Integer, nullable=True)
     schedule_auto_dispatch: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     schedule_last_triggered_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
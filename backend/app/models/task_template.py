@@ -22,6 +22,11 @@ class TaskTemplate(Base):
     extra: Mapped[dict] = mapped_column(JSON, default=dict)
     subtasks: Mapped[list] = mapped_column(JSON, default=list)
     workflow_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    workflow_analysis: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Fingerprint of workflow_json, rewritten with it; tasks linked to the template share it.
+    workflow_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    # Named overrides, name -> {"node_id", "input_name", "default"?}; see workflow_parameter_service.
+    parameters: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False
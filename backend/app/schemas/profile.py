@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import datetime
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ExecutionProfileSummary(BaseModel):
+    id: UUID
+    task_id: UUID
+    prompt_id: str
+    workflow_hash: str | None = None
+    base_url: str
+    status: str
+    submitted_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime
+    queue_wait_ms: int | None = None
+    wall_ms: int
+    executed_node_count: int
+    cached_node_count: int
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ExecutionProfileRead(ExecutionProfileSummary):
+    # Parallel arrays: node_ids, class_index (into class_types), start_ms, duration_ms,
+    # progress_count, progress_interval_ms; plus cached_node_ids / cached_class_index.
+    timeline: dict = Field(default_factory=dict)
+
+
+class ExecutionProfileListResponse(BaseModel):
+    items: list[ExecutionProfileSummary]
+    total: int
+    page: int
+    page_size: int
+
+
+class WorkflowProfileAggregate(BaseModel):
+    workflow_hash: str | None = None
+    runs: int
+    total_wall_ms: int
+    mean_wall_ms: float
+    max_wall_ms: int
+    mean_queue_wait_ms: float | None = None
+    mean_executed_nodes: float
+    mean_cached_nodes: float
+    last_finished_at: datetime | None = None
+
+
+class WorkflowProfileAggregateResponse(BaseModel):
+    items: list[WorkflowProfileAggregate]
+
+
+class NodeClassProfileAggregate(BaseModel):
+    class_type: str
+    executions: int
+    cached: int
+    total_ms: int
+    share_percent: float
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    max_ms: int
+    progress_events: int
+
+
+class NodeClassProfileAggregateResponse(BaseModel):
+    items: list[NodeClassProfileAggregate]
+    profile_count: int
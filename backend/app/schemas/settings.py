@@ -5,12 +5,24 @@ from datetime import datetime
 from pydantic import BaseModel, Field
 
 
+class ComfyUIEndpointItem(BaseModel):
+    host: str = Field(min_length=1, max_length=255)
+    port: int = Field(ge=1, le=65535)
+    weight: float = Field(default=1.0, gt=0)
+    max_concurrency: int | None = Field(default=None, ge=1)
+    tags: dict[str, str] = Field(default_factory=dict)
+
+
 class ComfyUISettingsPayload(BaseModel):
-    server_ip: str = Field(min_length=1, max_length=255)
+    # server_ip/ports describe the primary host; endpoints is the full multi-host registry
+    # and takes precedence when provided.
+    server_ip: str | None = Field(default=None, max_length=255)
     ports: list[int] = Field(default_factory=list)
+    endpoints: list[ComfyUIEndpointItem] = Field(default_factory=list)
 
 
 class ComfyUIPortStatusItem(BaseModel):
+    server_ip: str = ""
     port: int
     base_url: str
     reachable: bool
@@ -18,6 +30,13 @@ class ComfyUIPortStatusItem(BaseModel):
     running_count: int = 0
     pending_count: int = 0
     error: str | None = None
+    latency_ms: float | None = None
+    avg_latency_ms: float | None = None
+    circuit_state: str = "closed"
+    checked_at: datetime | None = None
+    weight: float = 1.0
+    max_concurrency: int | None = None
+    tags: dict[str, str] = Field(default_factory=dict)
 
 
 class ComfyUIPortsStatusResponse(BaseModel):
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Any
 from uuid import UUID
 
 from pydantic import BaseModel, ConfigDict, Field
@@ -91,6 +92,7 @@ class TaskCreate(BaseModel):
     schedule_enabled: bool = False
     schedule_at: datetime | None = None
     schedule_time: str | None = None
+    schedule_server_ip: str | None = None
     schedule_port: int | None = None
     schedule_auto_dispatch: bool = True
 
@@ -105,8 +107,10 @@ class TaskPatch(BaseModel):
     schedule_enabled: bool | None = None
     schedule_at: datetime | None = None
     schedule_time: str | None = None
+    schedule_server_ip: str | None = None
     schedule_port: int | None = None
     schedule_auto_dispatch: bool | None = None
+    parameter_values: dict[str, Any] | None = None
 
 
 class TaskRead(BaseModel):
@@ -119,9 +123,13 @@ class TaskRead(BaseModel):
     execution_state: str | None = None
     workflow_json: dict | None
     workflow_filename: str | None = None
+    workflow_analysis: dict | None = None
+    template_id: UUID | None = None
+    parameter_values: dict[str, Any] = Field(default_factory=dict)
     schedule_enabled: bool = False
     schedule_at: datetime | None = None
     schedule_time: str | None = None
+    schedule_server_ip: str | None = None
     schedule_port: int | None = None
     schedule_auto_dispatch: bool = True
     schedule_last_triggered_at: datetime | None = None
@@ -140,6 +148,7 @@ class TaskListItem(BaseModel):
     schedule_enabled: bool = False
     schedule_at: datetime | None = None
     schedule_time: str | None = None
+    schedule_server_ip: str | None = None
     schedule_port: int | None = None
     schedule_auto_dispatch: bool = True
     schedule_last_triggered_at: datetime | None = None
@@ -148,6 +157,9 @@ class TaskListItem(BaseModel):
     subtask_count: int
     has_workflow: bool
     workflow_node_count: int = 0
+    progress_percent: float | None = None
+    eta_seconds: float | None = None
+    estimated_finish_at: datetime | None = None
 
 
 class TaskListResponse(BaseModel):
@@ -247,12 +259,20 @@ class TemplateSubTaskBase(BaseModel):
     extra: dict = Field(default_factory=dict)
 
 
+class TemplateParameter(BaseModel):
+    node_id: str = Field(min_length=1)
+    input_name: str = Field(min_length=1)
+    default: Any = None
+    description: str | None = None
+
+
 class TaskTemplateCreate(BaseModel):
     title: str = Field(min_length=1, max_length=200)
     description: str | None = None
     extra: dict = Field(default_factory=dict)
     subtasks: list[TemplateSubTaskBase] = Field(default_factory=list)
     workflow_json: dict | None = None
+    parameters: dict[str, TemplateParameter] = Field(default_factory=dict)
 
 
 class TaskTemplatePatch(BaseModel):
@@ -261,6 +281,7 @@ class TaskTemplatePatch(BaseModel):
     extra: dict | None = None
     subtasks: list[TemplateSubTaskBase] | None = None
     workflow_json: dict | None = None
+    parameters: dict[str, TemplateParameter] | None = None
 
 
 class TaskTemplateRead(BaseModel):
@@ -270,6 +291,8 @@ class TaskTemplateRead(BaseModel):
     extra: dict
     subtasks: list[TemplateSubTaskBase]
     workflow_json: dict | None
+    workflow_analysis: dict | None = None
+    parameters: dict[str, TemplateParameter] = Field(default_factory=dict)
     created_at: datetime
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
@@ -299,3 +322,25 @@ class TaskTemplateCreateTaskRequest(BaseModel):
     title: str | None = Field(default=None, min_length=1, max_length=200)
     description: str | None = None
     extra: dict | None = None
+    parameter_values: dict[str, Any] = Field(default_factory=dict)
+
+
+class TaskTemplateBulkVariation(BaseModel):
+    title: str | None = Field(default=None, min_length=1, max_length=200)
+    description: str | None = None
+    extra: dict | None = None
+    parameter_values: dict[str, Any] = Field(default_factory=dict)
+    subtasks: list[SubTaskCreate] | None = None
+
+
+class TaskTemplateBulkCreateRequest(BaseModel):
+    """
+    One task per element of variations x matrix x subtask_sets; an omitted axis
+    contributes a single empty element. matrix maps parameter names to the
+    values to sweep; later axes override parameter values from earlier ones.
+    """
+
+    variations: list[TaskTemplateBulkVariation] = Field(default_factory=list)
+    matrix: dict[str, list[Any]] = Field(default_factory=dict)
+    subtask_sets: list[list[SubTaskCreate]] = Field(default_factory=list)
+    enqueue: bool = False
@@ -23,3 +23,4 @@ class WorkflowUploadResponse(BaseModel):
     workflow_json: dict
     node_count: int
     filename: str
+    analysis: dict = Field(default_factory=dict)
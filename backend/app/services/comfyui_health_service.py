@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.services.comfyui_object_info_service import prune_object_info, refresh_stale_object_info
+from app.services.comfyui_service import fetch_queue_status
+from app.services.comfyui_settings_service import (
+    ComfyUIEndpointConfig,
+    ComfyUIPortRuntimeStatus,
+    classify_port_level,
+    get_comfyui_settings_snapshot,
+)
+
+logger = logging.getLogger("app.comfyui_health")
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+_MONITOR_TICK_SECONDS = 1.0
+_monitor_task: asyncio.Task | None = None
+_monitor_stop_event: asyncio.Event | None = None
+
+
+# ──────────────────────────────────────────────
+# Data Classes
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class EndpointProbeSample:
+    checked_at: datetime
+    checked_monotonic: float
+    reachable: bool
+    latency_ms: float
+    running_count: int
+    pending_count: int
+    error: str | None = None
+
+
+@dataclass
+class EndpointHealth:
+    """Probe history and circuit breaker state for one ComfyUI endpoint."""
+
+    base_url: str
+    samples: deque[EndpointProbeSample] = field(
+        default_factory=lambda: deque(maxlen=max(1, settings.comfyui_health_history_size))
+    )
+    consecutive_failures: int = 0
+    circuit_open: bool = False
+    next_probe_at: float = 0.0
+
+    @property
+    def last_sample(self) -> EndpointProbeSample | None:
+        return self.samples[-1] if self.samples else None
+
+    @property
+    def circuit_state(self) -> str:
+        if not self.circuit_open:
+            return CIRCUIT_CLOSED
+        # Once the backoff delay has elapsed the next request acts as the trial call.
+        if time.monotonic() >= self.next_probe_at:
+            return CIRCUIT_HALF_OPEN
+        return CIRCUIT_OPEN
+
+    @property
+    def avg_latency_ms(self) -> float | None:
+        latencies = [sample.latency_ms for sample in self.samples if sample.reachable]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+
+# In-memory health registry keyed by endpoint base_url.
+_endpoint_health: dict[str, EndpointHealth] = {}
+
+
+# ──────────────────────────────────────────────
+# Probe Bookkeeping
+# ──────────────────────────────────────────────
+
+
+def _failure_backoff_seconds(consecutive_failures: int) -> float:
+    interval = max(0.1, settings.comfyui_health_interval_seconds)
+    exponent = max(0, consecutive_failures - 1)
+    delay = min(settings.comfyui_health_max_backoff_seconds, interval * (2**exponent))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def record_probe_result(
+    base_url: str,
+    *,
+    running_count: int,
+    pending_count: int,
+    error: str | None,
+    latency_ms: float,
+) -> EndpointHealth:
+    health = _endpoint_health.get(base_url)
+    if health is None:
+        health = EndpointHealth(base_url=base_url)
+        _endpoint_health[base_url] = health
+
+    now_monotonic = time.monotonic()
+    reachable = error is None
+    health.samples.append(
+        EndpointProbeSample(
+            checked_at=datetime.now(timezone.utc),
+            checked_monotonic=now_monotonic,
+            reachable=reachable,
+            latency_ms=latency_ms,
+            running_count=running_count,
+            pending_count=pending_count,
+            error=error,
+        )
+    )
+
+    if reachable:
+        if health.circuit_open:
+            logger.info("ComfyUI endpoint recovered, circuit closed: base_url=%s", base_url)
+        health.consecutive_failures = 0
+        health.circuit_open = False
+        health.next_probe_at = now_monotonic + settings.comfyui_health_interval_seconds
+        return health
+
+    health.consecutive_failures += 1
+    health.next_probe_at = now_monotonic + _failure_backoff_seconds(health.consecutive_failures)
+    if not health.circuit_open and health.consecutive_failures >= settings.comfyui_health_failure_threshold:
+        health.circuit_open = True
+        logger.warning(
+            "ComfyUI endpoint marked unavailable, circuit opened: base_url=%s failures=%s error=%s",
+            base_url,
+            health.consecutive_failures,
+            error,
+        )
+    return health
+
+
+async def probe_endpoint(base_url: str) -> EndpointHealth:
+    start = time.perf_counter()
+    running_count, pending_count, error = await fetch_queue_status(
+        api_base_url=base_url,
+        timeout=settings.comfyui_health_timeout_seconds,
+    )
+    latency_ms = (time.perf_counter() - start) * 1000
+    return record_probe_result(
+        base_url,
+        running_count=running_count,
+        pending_count=pending_count,
+        error=error,
+        latency_ms=latency_ms,
+    )
+
+
+def get_endpoint_health(base_url: str) -> EndpointHealth | None:
+    return _endpoint_health.get(base_url)
+
+
+def is_endpoint_available(base_url: str) -> bool:
+    """Circuit breaker check; unknown endpoints are treated as available."""
+    health = _endpoint_health.get(base_url)
+    if health is None:
+        return True
+    return health.circuit_state != CIRCUIT_OPEN
+
+
+async def get_queue_status(base_url: str) -> tuple[int, int, str | None]:
+    """
+    Queue counts for one endpoint, served from the last probe, failed or not,
+    until the monitor is due to replace it: next_probe_at already spaces probes
+    by the interval (or the failure backoff), plus one tick and the probe timeout
+    of grace. Only endpoints never probed, or ones the monitor has fallen behind
+    on, are probed inline.
+    """
+    health = _endpoint_health.get(base_url)
+    sample = health.last_sample if health is not None else None
+    if sample is not None:
+        grace = _MONITOR_TICK_SECONDS + settings.comfyui_health_timeout_seconds
+        if time.monotonic() < health.next_probe_at + grace:
+            return sample.running_count, sample.pending_count, sample.error
+
+    health = await probe_endpoint(base_url)
+    sample = health.samples[-1]
+    return sample.running_count, sample.pending_count, sample.error
+
+
+def _to_runtime_status(endpoint: ComfyUIEndpointConfig, health: EndpointHealth) -> ComfyUIPortRuntimeStatus:
+    sample = health.last_sample
+    reachable = bool(sample and sample.reachable)
+    running_count = sample.running_count if sample else 0
+    pending_count = sample.pending_count if sample else 0
+    return ComfyUIPortRuntimeStatus(
+        port=endpoint.port,
+        base_url=endpoint.base_url,
+        reachable=reachable,
+        level=classify_port_level(
+            reachable=reachable,
+            running_count=running_count,
+            pending_count=pending_count,
+        ),
+        running_count=running_count,
+        pending_count=pending_count,
+        error=sample.error if sample else None,
+        latency_ms=sample.latency_ms if sample else None,
+        avg_latency_ms=health.avg_latency_ms,
+        circuit_state=health.circuit_state,
+        checked_at=sample.checked_at if sample else None,
+        server_ip=endpoint.host,
+        weight=endpoint.weight,
+        max_concurrency=endpoint.max_concurrency,
+        tags=dict(endpoint.tags),
+    )
+
+
+async def fetch_ports_runtime_status(session: AsyncSession) -> tuple[str, datetime, list[ComfyUIPortRuntimeStatus]]:
+    """
+    Runtime status of every registered endpoint across all hosts, served from the
+    health monitor. Only endpoints that have never been probed are probed inline.
+    """
+    config = await get_comfyui_settings_snapshot(session)
+    endpoints = list(config.endpoints)
+
+    unknown = [
+        endpoint
+        for endpoint in endpoints
+        if endpoint.base_url not in _endpoint_health or _endpoint_health[endpoint.base_url].last_sample is None
+    ]
+    if unknown:
+        await asyncio.gather(*[probe_endpoint(endpoint.base_url) for endpoint in unknown])
+
+    refreshed_at = datetime.now(timezone.utc)
+    results = [_to_runtime_status(endpoint, _endpoint_health[endpoint.base_url]) for endpoint in endpoints]
+    checked = [item.checked_at for item in results if item.checked_at is not None]
+    if checked:
+        refreshed_at = min(checked)
+    return config.server_ip, refreshed_at, results
+
+
+# ──────────────────────────────────────────────
+# Background Monitor
+# ──────────────────────────────────────────────
+
+
+def start_health_monitor() -> None:
+    global _monitor_task, _monitor_stop_event
+    if _monitor_task is not None and not _monitor_task.done():
+        return
+    loop = asyncio.get_running_loop()
+    _monitor_stop_event = asyncio.Event()
+    _monitor_task = loop.create_task(_monitor_loop(_monitor_stop_event))
+    logger.info("ComfyUI health monitor started")
+
+
+async def stop_health_monitor() -> None:
+    global _monitor_task, _monitor_stop_event
+    stop_event = _monitor_stop_event
+    worker = _monitor_task
+    _monitor_stop_event = None
+    _monitor_task = None
+
+    if stop_event is not None:
+        stop_event.set()
+    if worker is None:
+        return
+    worker.cancel()
+    try:
+        await worker
+    except asyncio.CancelledError:
+        pass
+    logger.info("ComfyUI health monitor stopped")
+
+
+async def _configured_base_urls() -> list[str]:
+    async with SessionLocal() as session:
+        config = await get_comfyui_settings_snapshot(session)
+    return [item.base_url for item in config.endpoints]
+
+
+async def _probe_due_endpoints_once() -> None:
+    base_urls = await _configured_base_urls()
+    configured = set(base_urls)
+    for stale_url in [url for url in _endpoint_health if url not in configured]:
+        _endpoint_health.pop(stale_url, None)
+
+    now_monotonic = time.monotonic()
+    due = [
+        url
+        for url in base_urls
+        if url not in _endpoint_health or _endpoint_health[url].next_probe_at <= now_monotonic
+    ]
+    if due:
+        await asyncio.gather(*[probe_endpoint(url) for url in due])
+
+    prune_object_info(configured)
+    refresh_stale_object_info(url for url in base_urls if is_endpoint_available(url))
+
+
+async def _monitor_loop(stop_event: asyncio.Event) -> None:
+    while not stop_event.is_set():
+        try:
+            await _probe_due_endpoints_once()
+        except Exception:
+            logger.exception("ComfyUI health monitor tick failed")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=_MONITOR_TICK_SECONDS)
+        except asyncio.TimeoutError:
+            continue
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import sys
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from app.core import json_codec
+from app.core.config import settings
+from app.services.comfyui_service import fetch_object_info
+
+logger = logging.getLogger("app.comfyui_object_info")
+
+# Combo inputs whose options carry one of these suffixes list model files;
+# other combos (samplers, uploaded input images, ...) are not checked.
+_MODEL_FILE_SUFFIXES = (".safetensors", ".ckpt", ".pt", ".pth", ".bin", ".gguf", ".onnx", ".sft")
+
+
+# ──────────────────────────────────────────────
+# Data Classes
+# ──────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class ObjectInfoSnapshot:
+    """
+    Compact index of one endpoint's /object_info: installed node classes,
+    output node classes and, per (class_type, input_name), the model files a
+    model-loader combo accepts. Strings are interned, so endpoints with the same
+    node packs and models share most of their memory.
+    """
+
+    base_url: str
+    class_types: frozenset[str]
+    output_class_types: frozenset[str]
+    model_options: dict[tuple[str, str], frozenset[str]]
+    content_hash: str
+    etag: str | None
+    fetched_at: datetime
+    checked_monotonic: float
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.checked_monotonic >= settings.comfyui_object_info_ttl_seconds
+
+    @property
+    def model_count(self) -> int:
+        return len(set().union(*self.model_options.values())) if self.model_options else 0
+
+
+@dataclass
+class EndpointCompatibility:
+    base_url: str
+    known: bool
+    missing_class_types: list[str] = field(default_factory=list)
+    missing_models: list[str] = field(default_factory=list)
+
+    @property
+    def compatible(self) -> bool:
+        """False only when a snapshot exists and proves something is missing."""
+        return not self.missing_class_types and not self.missing_models
+
+
+# Keyed by endpoint base_url.
+_snapshots: dict[str, ObjectInfoSnapshot] = {}
+_last_errors: dict[str, str] = {}
+# Monotonic time before which a failed endpoint is not fetched again.
+_retry_after: dict[str, float] = {}
+_refresh_tasks: dict[str, asyncio.Task] = {}
+
+
+# ──────────────────────────────────────────────
+# Indexing
+# ──────────────────────────────────────────────
+
+
+def _iter_input_specs(info: dict) -> Iterable[tuple[str, object]]:
+    inputs = info.get("input")
+    if not isinstance(inputs, dict):
+        return
+    for section in ("required", "optional"):
+        specs = inputs.get(section)
+        if isinstance(specs, dict):
+            yield from specs.items()
+
+
+def _model_combo_options(spec: object) -> frozenset[str] | None:
+    if not isinstance(spec, (list, tuple)) or not spec or not isinstance(spec[0], list):
+        return None
+    options = [str(option) for option in spec[0] if isinstance(option, str)]
+    if not any(option.lower().endswith(_MODEL_FILE_SUFFIXES) for option in options):
+        return None
+    return frozenset(sys.intern(option) for option in options)
+
+
+def build_object_info_snapshot(
+    base_url: str,
+    data: dict,
+    *,
+    content_hash: str,
+    etag: str | None,
+) -> ObjectInfoSnapshot:
+    class_types: set[str] = set()
+    output_class_types: set[str] = set()
+    model_options: dict[tuple[str, str], frozenset[str]] = {}
+    for raw_class_type, info in data.items():
+        class_type = sys.intern(str(raw_class_type))
+        class_types.add(class_type)
+        if not isinstance(info, dict):
+            continue
+        if info.get("output_node"):
+            output_class_types.add(class_type)
+        for input_name, spec in _iter_input_specs(info):
+            options = _model_combo_options(spec)
+            if options is not None:
+                model_options[(class_type, sys.intern(str(input_name)))] = options
+    return ObjectInfoSnapshot(
+        base_url=base_url,
+        class_types=frozenset(class_types),
+        output_class_types=frozenset(output_class_types),
+        model_options=model_options,
+        content_hash=content_hash,
+        etag=etag,
+        fetched_at=datetime.now(timezone.utc),
+        checked_monotonic=time.monotonic(),
+    )
+
+
+# ──────────────────────────────────────────────
+# Refresh
+# ──────────────────────────────────────────────
+
+
+def _record_failure(base_url: str, error: str) -> None:
+    _last_errors[base_url] = error
+    _retry_after[base_url] = time.monotonic() + settings.comfyui_object_info_retry_seconds
+
+
+def _in_retry_backoff(base_url: str) -> bool:
+    retry_after = _retry_after.get(base_url)
+    return retry_after is not None and time.monotonic() < retry_after
+
+
+async def refresh_object_info(base_url: str) -> ObjectInfoSnapshot | None:
+    """
+    Revalidate one endpoint. A 304 (when ComfyUI sends an ETag) or an unchanged
+    body hash only bumps the check time; the JSON is parsed and re-indexed only
+    when the node set actually changed.
+    """
+    current = _snapshots.get(base_url)
+    response = await fetch_object_info(
+        api_base_url=base_url,
+        etag=current.etag if current is not None else None,
+        timeout=settings.comfyui_object_info_timeout_seconds,
+    )
+    if response.error is not None:
+        _record_failure(base_url, response.error)
+        logger.warning("ComfyUI object_info refresh failed: base_url=%s error=%s", base_url, response.error)
+        return current
+    _last_errors.pop(base_url, None)
+    _retry_after.pop(base_url, None)
+
+    content_hash = hashlib.sha256(response.content).hexdigest() if response.content is not None else None
+    if current is not None and (response.not_modified or content_hash == current.content_hash):
+        snapshot = dataclasses.replace(current, checked_monotonic=time.monotonic(), etag=response.etag or current.etag)
+        _snapshots[base_url] = snapshot
+        return snapshot
+    if response.content is None:
+        return current
+
+    try:
+        data = json_codec.loads(response.content)
+    except (json_codec.JSONDecodeError, UnicodeDecodeError):
+        _record_failure(base_url, "ComfyUI returned non-JSON object_info response")
+        return current
+    if not isinstance(data, dict):
+        _record_failure(base_url, "ComfyUI object_info response is not an object")
+        return current
+
+    snapshot = build_object_info_snapshot(base_url, data, content_hash=content_hash or "", etag=response.etag)
+    _snapshots[base_url] = snapshot
+    logger.info(
+        "ComfyUI object_info indexed: base_url=%s class_types=%s model_inputs=%s",
+        base_url,
+        len(snapshot.class_types),
+        len(snapshot.model_options),
+    )
+    return snapshot
+
+
+def schedule_object_info_refresh(base_url: str) -> asyncio.Task:
+    task = _refresh_tasks.get(base_url)
+    if task is None or task.done():
+        task = asyncio.get_running_loop().create_task(refresh_object_info(base_url))
+        _refresh_tasks[base_url] = task
+    return task
+
+
+def refresh_stale_object_info(base_urls: Iterable[str]) -> None:
+    """Called by the health monitor for reachable endpoints; refreshes run in the background."""
+    for base_url in base_urls:
+        snapshot = _snapshots.get(base_url)
+        if (snapshot is None or snapshot.is_stale) and not _in_retry_backoff(base_url):
+            schedule_object_info_refresh(base_url)
+
+
+def prune_object_info(configured_base_urls: Iterable[str]) -> None:
+    configured = set(configured_base_urls)
+    for base_url in [url for url in _snapshots if url not in configured]:
+        _snapshots.pop(base_url, None)
+        _last_errors.pop(base_url, None)
+    for base_url in [url for url in _retry_after if url not in configured]:
+        _last_errors.pop(base_url, None)
+        _retry_after.pop(base_url, None)
+
+
+# ──────────────────────────────────────────────
+# Cache Access
+# ──────────────────────────────────────────────
+
+
+def get_object_info_snapshot(base_url: str) -> ObjectInfoSnapshot | None:
+    return _snapshots.get(base_url)
+
+
+def get_object_info_error(base_url: str) -> str | None:
+    return _last_errors.get(base_url)
+
+
+async def ensure_object_info(base_url: str) -> ObjectInfoSnapshot | None:
+    """
+    Snapshot for an endpoint. Only the very first call per endpoint waits on the
+    network; a stale snapshot is returned immediately and refreshed in the background.
+    After a failed fetch the endpoint stays unknown (None) until its retry time passes.
+    """
+    snapshot = _snapshots.get(base_url)
+    if snapshot is None:
+        if _in_retry_backoff(base_url):
+            return None
+        return await schedule_object_info_refresh(base_url)
+    if snapshot.is_stale and not _in_retry_backoff(base_url):
+        schedule_object_info_refresh(base_url)
+    return snapshot
+
+
+def known_class_types_across_endpoints() -> frozenset[str] | None:
+    """Union of class types over every cached endpoint, or None before any snapshot exists."""
+    if not _snapshots:
+        return None
+    known: set[str] = set()
+    for snapshot in _snapshots.values():
+        known |= snapshot.class_types
+    return frozenset(known)
+
+
+# ──────────────────────────────────────────────
+# Compatibility
+# ──────────────────────────────────────────────
+
+
+def check_workflow_compatibility(base_url: str, workflow_json: dict | None) -> EndpointCompatibility:
+    """
+    Whether an endpoint has every node class and model file the workflow uses.
+    One pass over the nodes against the cached snapshot; never touches the network.
+    Without a snapshot the result is unknown and reported as compatible.
+    """
+    snapshot = _snapshots.get(base_url)
+    result = EndpointCompatibility(base_url=base_url, known=snapshot is not None)
+    if snapshot is None or not isinstance(workflow_json, dict):
+        return result
+
+    missing_class_types: set[str] = set()
+    for node_id, node in workflow_json.items():
+        if not isinstance(node, dict):
+            continue
+        class_type = str(node.get("class_type") or "")
+        if not class_type:
+            # Graph validation reports nodes without a class; they say nothing about the endpoint.
+            continue
+        if class_type not in snapshot.class_types:
+            missing_class_types.add(class_type)
+            continue
+        inputs = node.get("inputs")
+        if not isinstance(inputs, dict):
+            continue
+        for input_name, value in inputs.items():
+            if not isinstance(value, str):
+                continue
+            options = snapshot.model_options.get((class_type, input_name))
+            if options is not None and value not in options:
+                result.missing_models.append(f"node {node_id} {input_name}={value}")
+    result.missing_class_types = sorted(missing_class_types)
+    return result
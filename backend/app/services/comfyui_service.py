@@ -1,17 +1,72 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import json
 import logging
+import re
+import time
 from dataclasses import dataclass, field
-from typing import Awaitable, Callable
+from typing import Awaitable, Callable, TypeVar
 from urllib.parse import urlparse, urlunparse
 
 import httpx
 import websockets
 
+from app.core import json_codec
+from app.core.config import settings
+from app.core.logging import RATE_LIMITED
+from app.core.metrics import counter, histogram
+
 logger = logging.getLogger("app.comfyui")
 
+_comfyui_request_seconds = histogram(
+    "comfyui_request_duration_seconds",
+    "ComfyUI HTTP API latency by operation and endpoint",
+    ("operation", "endpoint"),
+)
+_comfyui_request_errors = counter(
+    "comfyui_request_errors_total",
+    "ComfyUI HTTP API calls that failed, by operation and endpoint",
+    ("operation", "endpoint"),
+)
+_comfyui_ws_frames = counter(
+    "comfyui_ws_frames_total",
+    "ComfyUI WebSocket frames received by listeners, by outcome",
+    ("outcome",),
+)
+_frames_relayed = _comfyui_ws_frames.labels("relayed")
+_frames_skipped_type = _comfyui_ws_frames.labels("skipped_type")
+_frames_skipped_prompt = _comfyui_ws_frames.labels("skipped_prompt")
+_frames_binary = _comfyui_ws_frames.labels("binary")
+_frames_invalid = _comfyui_ws_frames.labels("invalid")
+_ResultT = TypeVar("_ResultT")
+
+
+def _instrumented(operation: str, failed: Callable[[object], bool]):
+    """Time a ComfyUI API call; ``failed`` inspects the result, since these functions report errors by value."""
+
+    def decorator(func: Callable[..., Awaitable[_ResultT]]) -> Callable[..., Awaitable[_ResultT]]:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> _ResultT:
+            if not settings.metrics_enabled:
+                return await func(*args, **kwargs)
+            endpoint = str(kwargs.get("api_base_url") or "")
+            started = time.perf_counter()
+            is_error = True
+            try:
+                result = await func(*args, **kwargs)
+                is_error = failed(result)
+                return result
+            finally:
+                _comfyui_request_seconds.labels(operation, endpoint).observe(time.perf_counter() - started)
+                if is_error:
+                    _comfyui_request_errors.labels(operation, endpoint).inc()
+
+        return wrapper
+
+    return decorator
+
 
 # ──────────────────────────────────────────────
 # Data Classes
@@ -36,11 +91,20 @@ class ComfyEvent:
     extra: dict = field(default_factory=dict)
 
 
+@dataclass
+class ObjectInfoResponse:
+    content: bytes | None = None
+    etag: str | None = None
+    not_modified: bool = False
+    error: str | None = None
+
+
 # ──────────────────────────────────────────────
 # HTTP Client -- Submit prompt to ComfyUI
 # ──────────────────────────────────────────────
 
 
+@_instrumented("submit", lambda result: bool(result.error))
 async def submit_prompt(workflow_json: dict, *, client_id: str, api_base_url: str) -> PromptSubmitResult:
     """
     POST the workflow to ComfyUI /api/prompt.
@@ -105,6 +169,7 @@ async def submit_prompt(workflow_json: dict, *, client_id: str, api_base_url: st
     return PromptSubmitResult(prompt_id=prompt_id)
 
 
+@_instrumented("interrupt", lambda error: error is not None)
 async def interrupt_execution(*, api_base_url: str, prompt_id: str | None = None) -> str | None:
     """
     Best-effort interrupt for current ComfyUI execution.
@@ -138,6 +203,56 @@ async def interrupt_execution(*, api_base_url: str, prompt_id: str | None = None
 # ──────────────────────────────────────────────
 
 
+# ComfyUI text frames are json.dumps({"type": ..., "data": {...}}), so the type is
+# always the first key. Frames are peeked with bounded substring scans and only
+# decoded when they can matter; anything the peek cannot decide is decoded.
+_RELAYED_MESSAGE_TYPES = frozenset(
+    {"execution_start", "executing", "progress", "executed", "execution_error", "execution_cached"}
+)
+# Types whose data has no nested objects ahead of prompt_id, so the first
+# "prompt_id" key in the frame is the real one ("executed" carries node output first).
+_FLAT_DATA_MESSAGE_TYPES = frozenset(
+    {"execution_start", "executing", "progress", "execution_error", "execution_cached"}
+)
+_PEEK_CHARS = 512
+_MAX_TYPE_CHARS = 64
+_MAX_PROMPT_ID_CHARS = 128
+_MESSAGE_TYPE_PATTERN = re.compile(r'\s*\{\s*"type"\s*:\s*"([^"\\]{1,64})"')
+_PROMPT_ID_PATTERN = re.compile(r'"prompt_id"\s*:\s*"([^"\\]{1,128})"')
+
+
+def _peek_comfy_frame(raw: str) -> tuple[str | None, str | None]:
+    """
+    Read the message type and prompt_id from the start of a text frame without decoding it.
+
+    The type is None when the frame does not start with a "type" key; the prompt_id is
+    None when it is not within the first _PEEK_CHARS characters or cannot be trusted.
+    """
+    # Fast path for json.dumps' default separators, which ComfyUI uses.
+    if raw.startswith('{"type": "'):
+        type_end = raw.find('"', 10, 10 + _MAX_TYPE_CHARS + 1)
+        if type_end <= 10 or raw[type_end - 1] == "\\":
+            return None, None
+        msg_type = raw[10:type_end]
+    else:
+        match = _MESSAGE_TYPE_PATTERN.match(raw, 0, _PEEK_CHARS)
+        if match is None:
+            return None, None
+        msg_type, type_end = match.group(1), match.end()
+    if msg_type not in _FLAT_DATA_MESSAGE_TYPES:
+        return msg_type, None
+
+    key_start = raw.find('"prompt_id": "', type_end, _PEEK_CHARS)
+    if key_start >= 0:
+        id_start = key_start + 14
+        id_end = raw.find('"', id_start, id_start + _MAX_PROMPT_ID_CHARS + 1)
+        if id_end > id_start and raw[id_end - 1] != "\\":
+            return msg_type, raw[id_start:id_end]
+        return msg_type, None
+    match = _PROMPT_ID_PATTERN.search(raw, type_end, _PEEK_CHARS)
+    return msg_type, match.group(1) if match else None
+
+
 async def listen_comfyui_ws(
     client_id: str,
     *,
@@ -146,6 +261,7 @@ async def listen_comfyui_ws(
     stop_event: asyncio.Event,
     prompt_ids: set[str] | None = None,
     connected_event: asyncio.Event | None = None,
+    on_binary: Callable[[bytes], None] | None = None,
 ) -> None:
     """
     Connect to ComfyUI WebSocket and relay events.
@@ -155,6 +271,7 @@ async def listen_comfyui_ws(
         on_event: Async callback invoked for each relevant event.
         stop_event: Set this to gracefully terminate the listener.
         prompt_ids: If provided, only emit events for these prompt IDs.
+        on_binary: Called with each binary frame (previews); they are dropped without it.
     """
     ws_url = f"{ws_base_url.rstrip('/')}/ws?clientId={client_id}"
     logger.info("Connecting to ComfyUI WS: %s", ws_url)
@@ -173,18 +290,42 @@ async def listen_comfyui_ws(
                     logger.warning("ComfyUI WS connection closed")
                     break
 
+                if not isinstance(raw, str):
+                    # Binary frames are previews (4-byte big-endian event code, then the
+                    # payload) and are never JSON.
+                    _frames_binary.inc()
+                    if on_binary is not None:
+                        on_binary(raw)
+                    continue
+
+                msg_type, peeked_prompt_id = _peek_comfy_frame(raw)
+                if msg_type is not None and msg_type not in _RELAYED_MESSAGE_TYPES:
+                    # status, crystools.monitor and other broadcasts nobody relays
+                    _frames_skipped_type.inc()
+                    continue
+                if prompt_ids and peeked_prompt_id and peeked_prompt_id not in prompt_ids:
+                    _frames_skipped_prompt.inc()
+                    continue
+
                 try:
-                    msg = json.loads(raw)
-                except json.JSONDecodeError:
+                    msg = json_codec.loads(raw)
+                except json_codec.JSONDecodeError:
+                    _frames_invalid.inc()
+                    continue
+                if not isinstance(msg, dict):
+                    _frames_invalid.inc()
                     continue
 
                 event = _parse_comfy_message(msg)
-                if event is None:
+                if event is None or event.event_type not in _RELAYED_MESSAGE_TYPES:
+                    _frames_skipped_type.inc()
                     continue
 
                 # Filter to relevant prompt IDs if specified
                 if prompt_ids and event.prompt_id and event.prompt_id not in prompt_ids:
+                    _frames_skipped_prompt.inc()
                     continue
+                _frames_relayed.inc()
 
                 if event.event_type in {
                     "execution_start",
@@ -198,6 +339,7 @@ async def listen_comfyui_ws(
                         event.event_type,
                         event.prompt_id,
                         event.node_id,
+                        extra=RATE_LIMITED,
                     )
 
                 try:
@@ -215,10 +357,11 @@ def build_ws_base_url(api_base_url: str) -> str:
     return urlunparse((scheme, parsed.netloc, "", "", "", "")).rstrip("/")
 
 
-async def fetch_queue_status(*, api_base_url: str) -> tuple[int, int, str | None]:
+@_instrumented("queue_status", lambda result: result[2] is not None)
+async def fetch_queue_status(*, api_base_url: str, timeout: float = 5.0) -> tuple[int, int, str | None]:
     queue_url = f"{api_base_url.rstrip('/')}/queue"
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
+        async with httpx.AsyncClient(timeout=timeout) as client:
             response = await client.get(queue_url)
     except httpx.HTTPError as exc:
         return 0, 0, f"HTTP request error: {exc}"
@@ -238,6 +381,29 @@ async def fetch_queue_status(*, api_base_url: str) -> tuple[int, int, str | None
     return running_count, pending_count, None
 
 
+@_instrumented("object_info", lambda result: result.error is not None)
+async def fetch_object_info(
+    *,
+    api_base_url: str,
+    etag: str | None = None,
+    timeout: float = 15.0,
+) -> ObjectInfoResponse:
+    """GET /object_info as raw bytes so callers can skip parsing when the body is unchanged."""
+    object_info_url = f"{api_base_url.rstrip('/')}/object_info"
+    headers = {"If-None-Match": etag} if etag else None
+    try:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(object_info_url, headers=headers)
+    except httpx.HTTPError as exc:
+        return ObjectInfoResponse(error=f"HTTP request error: {exc}")
+
+    if response.status_code == 304:
+        return ObjectInfoResponse(etag=etag, not_modified=True)
+    if response.status_code != 200:
+        return ObjectInfoResponse(error=f"ComfyUI returned HTTP {response.status_code}")
+    return ObjectInfoResponse(content=response.content, etag=response.headers.get("etag"))
+
+
 def _extract_prompt_ids_from_queue_entries(entries: list) -> set[str]:
     prompt_ids: set[str] = set()
     for entry in entries:
@@ -251,6 +417,7 @@ def _extract_prompt_ids_from_queue_entries(entries: list) -> set[str]:
     return prompt_ids
 
 
+@_instrumented("queue_prompt_ids", lambda result: result[2] is not None)
 async def fetch_queue_prompt_ids(*, api_base_url: str) -> tuple[set[str], set[str], str | None]:
     queue_url = f"{api_base_url.rstrip('/')}/queue"
     try:
@@ -274,6 +441,7 @@ async def fetch_queue_prompt_ids(*, api_base_url: str) -> tuple[set[str], set[st
     return running_ids, pending_ids, None
 
 
+@_instrumented("queue_delete", lambda error: error is not None)
 async def delete_prompt_from_queue(*, api_base_url: str, prompt_id: str) -> str | None:
     queue_url = f"{api_base_url.rstrip('/')}/queue"
     normalized_prompt_id = str(prompt_id or "").strip()
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-import asyncio
-from dataclasses import dataclass
-from datetime import datetime, timezone
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from urllib.parse import urlparse
 
 from sqlalchemy import select
@@ -10,9 +10,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.models.comfyui_setting import ComfyUISetting
-from app.services.comfyui_service import fetch_queue_status
+from app.services.pubsub_service import WORKER_ID, get_pubsub_backend
 
 DEFAULT_SETTINGS_KEY = "default"
+_SETTINGS_CHANGED_CHANNEL = "comfyui_settings"
 
 
 @dataclass
@@ -25,6 +26,48 @@ class ComfyUIEndpoint:
         return f"http://{self.server_ip}:{self.port}"
 
 
+@dataclass(frozen=True)
+class ComfyUIEndpointConfig:
+    """One registered ComfyUI node: host/port plus capacity metadata used by dispatch."""
+
+    host: str
+    port: int
+    weight: float = 1.0
+    max_concurrency: int | None = None
+    tags: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def to_endpoint(self) -> ComfyUIEndpoint:
+        return ComfyUIEndpoint(server_ip=self.host, port=self.port)
+
+    def to_dict(self) -> dict:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "weight": self.weight,
+            "max_concurrency": self.max_concurrency,
+            "tags": dict(self.tags),
+        }
+
+
+@dataclass(frozen=True)
+class ComfyUISettingsSnapshot:
+    # server_ip/ports describe the primary host and are kept for older clients.
+    server_ip: str
+    ports: tuple[int, ...]
+    version: int
+    endpoints: tuple[ComfyUIEndpointConfig, ...] = ()
+
+    def find_endpoint(self, host: str, port: int) -> ComfyUIEndpointConfig | None:
+        for item in self.endpoints:
+            if item.host == host and item.port == port:
+                return item
+        return None
+
+
 @dataclass
 class ComfyUIPortRuntimeStatus:
     port: int
@@ -34,6 +77,22 @@ class ComfyUIPortRuntimeStatus:
     running_count: int
     pending_count: int
     error: str | None = None
+    latency_ms: float | None = None
+    avg_latency_ms: float | None = None
+    circuit_state: str = "closed"
+    checked_at: datetime | None = None
+    server_ip: str = ""
+    weight: float = 1.0
+    max_concurrency: int | None = None
+    tags: dict[str, str] = field(default_factory=dict)
+
+
+# Normalized settings are cached per process. Within the revalidate window the
+# cache is served without touching the database; afterwards only the version
+# column is read. Other workers are also told over pub/sub to drop their cache,
+# so the version check is only the fallback when a notification is missed.
+_settings_cache: ComfyUISettingsSnapshot | None = None
+_settings_cache_checked_at = 0.0
 
 
 def normalize_server_ip(raw_server_ip: str) -> str:
@@ -66,6 +125,58 @@ def normalize_ports(raw_ports: list[int]) -> list[int]:
     return ports
 
 
+def normalize_endpoint_config(raw: dict) -> ComfyUIEndpointConfig:
+    host = normalize_server_ip(str(raw.get("host") or raw.get("server_ip") or ""))
+    port = int(raw.get("port") or 0)
+    if port < 1 or port > 65535:
+        raise ValueError(f"Invalid port: {port}")
+    weight = float(raw.get("weight") if raw.get("weight") is not None else 1.0)
+    if weight <= 0:
+        raise ValueError(f"Invalid weight for {host}:{port}: must be positive")
+    raw_max_concurrency = raw.get("max_concurrency")
+    max_concurrency = int(raw_max_concurrency) if raw_max_concurrency is not None else None
+    if max_concurrency is not None and max_concurrency < 1:
+        raise ValueError(f"Invalid max_concurrency for {host}:{port}: must be at least 1")
+    raw_tags = raw.get("tags") or {}
+    if not isinstance(raw_tags, dict):
+        raise ValueError(f"Invalid tags for {host}:{port}: must be an object")
+    tags = {str(key): str(value) for key, value in raw_tags.items()}
+    return ComfyUIEndpointConfig(host=host, port=port, weight=weight, max_concurrency=max_concurrency, tags=tags)
+
+
+def normalize_endpoints(raw_endpoints: list[dict]) -> list[ComfyUIEndpointConfig]:
+    endpoints: dict[tuple[str, int], ComfyUIEndpointConfig] = {}
+    for raw in raw_endpoints:
+        item = normalize_endpoint_config(raw)
+        endpoints[(item.host, item.port)] = item
+    if not endpoints:
+        raise ValueError("At least one endpoint is required")
+    # The first host in the payload stays the primary host; ports are ordered per host.
+    host_order: list[str] = []
+    for host, _ in endpoints:
+        if host not in host_order:
+            host_order.append(host)
+    return sorted(endpoints.values(), key=lambda item: (host_order.index(item.host), item.port))
+
+
+def _endpoints_from_host_ports(
+    server_ip: str,
+    ports: list[int],
+    previous: list[ComfyUIEndpointConfig] | None = None,
+) -> list[ComfyUIEndpointConfig]:
+    """Build the registry for the legacy single-host form, keeping metadata of unchanged entries."""
+    previous_by_key = {(item.host, item.port): item for item in previous or []}
+    return [
+        previous_by_key.get((server_ip, port)) or ComfyUIEndpointConfig(host=server_ip, port=port)
+        for port in ports
+    ]
+
+
+def _primary_host_ports(endpoints: list[ComfyUIEndpointConfig]) -> tuple[str, list[int]]:
+    primary_host = endpoints[0].host
+    return primary_host, [item.port for item in endpoints if item.host == primary_host]
+
+
 def _parse_default_endpoint_from_env() -> ComfyUIEndpoint:
     parsed = urlparse(settings.comfyui_api_base_url)
     host = parsed.hostname or ""
@@ -74,47 +185,148 @@ def _parse_default_endpoint_from_env() -> ComfyUIEndpoint:
     return ComfyUIEndpoint(server_ip=host, port=port)
 
 
+def _normalize_stored_endpoints(config: ComfyUISetting) -> list[ComfyUIEndpointConfig]:
+    raw_endpoints = config.endpoints if isinstance(config.endpoints, list) else []
+    if raw_endpoints:
+        try:
+            return normalize_endpoints(raw_endpoints)
+        except (TypeError, ValueError):
+            pass
+    try:
+        server_ip = normalize_server_ip(config.server_ip)
+        ports = normalize_ports([int(item) for item in (config.ports or [])])
+    except (TypeError, ValueError):
+        default_endpoint = _parse_default_endpoint_from_env()
+        server_ip = default_endpoint.server_ip
+        ports = [default_endpoint.port]
+    return _endpoints_from_host_ports(server_ip, ports)
+
+
+def _apply_endpoints(config: ComfyUISetting, endpoints: list[ComfyUIEndpointConfig]) -> None:
+    config.server_ip, config.ports = _primary_host_ports(endpoints)
+    config.endpoints = [item.to_dict() for item in endpoints]
+
+
 async def get_or_create_comfyui_settings(session: AsyncSession) -> ComfyUISetting:
     existing = await session.scalar(select(ComfyUISetting).where(ComfyUISetting.key == DEFAULT_SETTINGS_KEY))
     if existing:
-        try:
-            normalized_server_ip = normalize_server_ip(existing.server_ip)
-            normalized_ports = normalize_ports([int(item) for item in (existing.ports or [])])
-        except ValueError:
-            default_endpoint = _parse_default_endpoint_from_env()
-            normalized_server_ip = default_endpoint.server_ip
-            normalized_ports = [default_endpoint.port]
-        if existing.server_ip != normalized_server_ip or list(existing.ports or []) != normalized_ports:
-            existing.server_ip = normalized_server_ip
-            existing.ports = normalized_ports
+        normalized_endpoints = _normalize_stored_endpoints(existing)
+        normalized_server_ip, normalized_ports = _primary_host_ports(normalized_endpoints)
+        if (
+            existing.server_ip != normalized_server_ip
+            or list(existing.ports or []) != normalized_ports
+            or list(existing.endpoints or []) != [item.to_dict() for item in normalized_endpoints]
+        ):
+            _apply_endpoints(existing, normalized_endpoints)
+            existing.version = int(existing.version or 0) + 1
             await session.commit()
             await session.refresh(existing)
         return existing
 
     default_endpoint = _parse_default_endpoint_from_env()
-    created = ComfyUISetting(
-        key=DEFAULT_SETTINGS_KEY,
-        server_ip=default_endpoint.server_ip,
-        ports=[default_endpoint.port],
-    )
+    created = ComfyUISetting(key=DEFAULT_SETTINGS_KEY, version=1)
+    _apply_endpoints(created, _endpoints_from_host_ports(default_endpoint.server_ip, [default_endpoint.port]))
     session.add(created)
     await session.commit()
     await session.refresh(created)
     return created
 
 
+def _snapshot_from_config(config: ComfyUISetting) -> ComfyUISettingsSnapshot:
+    endpoints = _normalize_stored_endpoints(config)
+    server_ip, ports = _primary_host_ports(endpoints)
+    return ComfyUISettingsSnapshot(
+        server_ip=server_ip,
+        ports=tuple(ports),
+        version=int(config.version or 0),
+        endpoints=tuple(endpoints),
+    )
+
+
+def _store_settings_cache(snapshot: ComfyUISettingsSnapshot) -> None:
+    global _settings_cache, _settings_cache_checked_at
+    _settings_cache = snapshot
+    _settings_cache_checked_at = time.monotonic()
+
+
+def invalidate_comfyui_settings_cache() -> None:
+    global _settings_cache, _settings_cache_checked_at
+    _settings_cache = None
+    _settings_cache_checked_at = 0.0
+
+
+async def get_comfyui_settings_snapshot(session: AsyncSession) -> ComfyUISettingsSnapshot:
+    """
+    Return the normalized ComfyUI settings, served from the in-process cache.
+
+    A fresh cache costs no query; a stale cache costs one ``SELECT version``
+    and is reloaded only when another worker has bumped the version.
+    """
+    global _settings_cache_checked_at
+    cached = _settings_cache
+    if cached is not None:
+        if time.monotonic() - _settings_cache_checked_at < settings.comfyui_settings_cache_ttl_seconds:
+            return cached
+        current_version = await session.scalar(
+            select(ComfyUISetting.version).where(ComfyUISetting.key == DEFAULT_SETTINGS_KEY)
+        )
+        if current_version is not None and int(current_version) == cached.version:
+            _settings_cache_checked_at = time.monotonic()
+            return cached
+
+    config = await get_or_create_comfyui_settings(session)
+    snapshot = _snapshot_from_config(config)
+    _store_settings_cache(snapshot)
+    return snapshot
+
+
 async def update_comfyui_settings(
     session: AsyncSession,
     *,
-    server_ip: str,
-    ports: list[int],
-) -> ComfyUISetting:
-    config = await get_or_create_comfyui_settings(session)
-    config.server_ip = normalize_server_ip(server_ip)
-    config.ports = normalize_ports(ports)
+    server_ip: str | None = None,
+    ports: list[int] | None = None,
+    endpoints: list[dict] | None = None,
+) -> ComfyUISettingsSnapshot:
+    """
+    Replace the endpoint registry.
+
+    ``endpoints`` takes precedence; otherwise the legacy single-host form
+    (``server_ip`` + ``ports``) replaces the primary host's entries only.
+    """
+    if endpoints:
+        normalized_endpoints = normalize_endpoints(endpoints)
+        config = await get_or_create_comfyui_settings(session)
+    else:
+        normalized_server_ip = normalize_server_ip(server_ip or "")
+        normalized_ports = normalize_ports(ports or [])
+        config = await get_or_create_comfyui_settings(session)
+        previous = _normalize_stored_endpoints(config)
+        previous_primary_host = previous[0].host if previous else ""
+        # The legacy form only edits the primary host; other registered hosts are kept.
+        normalized_endpoints = _endpoints_from_host_ports(normalized_server_ip, normalized_ports, previous=previous)
+        normalized_endpoints.extend(
+            item for item in previous if item.host not in {previous_primary_host, normalized_server_ip}
+        )
+    _apply_endpoints(config, normalized_endpoints)
+    config.version = int(config.version or 0) + 1
     await session.commit()
     await session.refresh(config)
-    return config
+    snapshot = _snapshot_from_config(config)
+    _store_settings_cache(snapshot)
+    await get_pubsub_backend().publish(_SETTINGS_CHANGED_CHANNEL, {"version": snapshot.version})
+    return snapshot
+
+
+async def _on_remote_settings_changed(message: dict) -> None:
+    if message.get("origin") == WORKER_ID:
+        return
+    cached = _settings_cache
+    if cached is None or int(message.get("version") or 0) != cached.version:
+        invalidate_comfyui_settings_cache()
+
+
+def register_settings_pubsub_handlers() -> None:
+    get_pubsub_backend().subscribe(_SETTINGS_CHANGED_CHANNEL, _on_remote_settings_changed)
 
 
 def classify_port_level(*, reachable: bool, running_count: int, pending_count: int) -> str:
@@ -129,52 +341,21 @@ def classify_port_level(*, reachable: bool, running_count: int, pending_count: i
     return "idle"
 
 
-async def fetch_ports_runtime_status(session: AsyncSession) -> tuple[str, datetime, list[ComfyUIPortRuntimeStatus]]:
-    config = await get_or_create_comfyui_settings(session)
-    server_ip = normalize_server_ip(config.server_ip)
-    ports = normalize_ports([int(item) for item in (config.ports or [])])
-    refreshed_at = datetime.now(timezone.utc)
-
-    async def _fetch_one(port: int) -> ComfyUIPortRuntimeStatus:
-        base_url = f"http://{server_ip}:{port}"
-        running_count, pending_count, error = await fetch_queue_status(api_base_url=base_url)
-        reachable = error is None
-        level = classify_port_level(
-            reachable=reachable,
-            running_count=running_count,
-            pending_count=pending_count,
-        )
-        return ComfyUIPortRuntimeStatus(
-            port=port,
-            base_url=base_url,
-            reachable=reachable,
-            level=level,
-            running_count=running_count,
-            pending_count=pending_count,
-            error=error,
-        )
-
-    results = await asyncio.gather(*[_fetch_one(port) for port in ports])
-    return server_ip, refreshed_at, list(results)
-
-
 async def ensure_allowed_endpoint(
     session: AsyncSession,
     *,
     server_ip: str,
     port: int,
 ) -> ComfyUIEndpoint:
-    config = await get_or_create_comfyui_settings(session)
+    config = await get_comfyui_settings_snapshot(session)
     normalized_server_ip = normalize_server_ip(server_ip)
-    allowed_server_ip = normalize_server_ip(config.server_ip)
-    allowed_ports = normalize_ports([int(item) for item in (config.ports or [])])
 
-    if normalized_server_ip != allowed_server_ip:
-        raise ValueError("Selected server_ip is not allowed by current settings")
-    if int(port) not in allowed_ports:
-        raise ValueError("Selected port is not allowed by current settings")
     if int(port) < 1 or int(port) > 65535:
         raise ValueError("Invalid port")
+    if not any(item.host == normalized_server_ip for item in config.endpoints):
+        raise ValueError("Selected server_ip is not allowed by current settings")
+    if config.find_endpoint(normalized_server_ip, int(port)) is None:
+        raise ValueError("Selected port is not allowed by current settings")
 
     return ComfyUIEndpoint(server_ip=normalized_server_ip, port=int(port))
 
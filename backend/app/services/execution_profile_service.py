@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app.db.session import SessionLocal
+from app.models.execution_profile import ExecutionProfile
+
+logger = logging.getLogger("app.execution_profile")
+
+TIMELINE_VERSION = 1
+
+
+# ──────────────────────────────────────────────
+# Recording
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class ExecutionProfileRecorder:
+    """
+    Collects the timeline of one run directly into parallel arrays, so saving is
+    a single row insert. Times are monotonic; offsets are stored in ms relative to
+    execution_start (or submit, when ComfyUI never reported a start).
+    """
+
+    task_id: UUID
+    workflow_hash: str | None
+    base_url: str
+    node_class_types: dict[str, str]
+    prompt_id: str = ""
+    submitted_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    submitted_monotonic: float = field(default_factory=time.monotonic)
+    started_at: datetime | None = None
+    started_monotonic: float | None = None
+    class_types: list[str] = field(default_factory=list)
+    node_ids: list[str] = field(default_factory=list)
+    class_index: list[int] = field(default_factory=list)
+    start_monotonic: list[float] = field(default_factory=list)
+    duration_ms: list[int] = field(default_factory=list)
+    progress_count: list[int] = field(default_factory=list)
+    progress_interval_ms: list[float] = field(default_factory=list)
+    cached_node_ids: list[str] = field(default_factory=list)
+    cached_class_index: list[int] = field(default_factory=list)
+    _class_lookup: dict[str, int] = field(default_factory=dict)
+    _current: int | None = None
+    _last_progress: float | None = None
+
+    def _class_slot(self, node_id: str) -> int:
+        class_type = self.node_class_types.get(node_id, "")
+        slot = self._class_lookup.get(class_type)
+        if slot is None:
+            slot = len(self.class_types)
+            self.class_types.append(class_type)
+            self._class_lookup[class_type] = slot
+        return slot
+
+    def mark_submitted(self, now: float | None = None) -> None:
+        self.submitted_monotonic = time.monotonic() if now is None else now
+        self.submitted_at = datetime.now(timezone.utc)
+
+    def mark_started(self, now: float | None = None) -> None:
+        if self.started_monotonic is not None:
+            return
+        self.started_monotonic = time.monotonic() if now is None else now
+        self.started_at = datetime.now(timezone.utc)
+
+    def node_started(self, node_id: str | None, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        if node_id is not None and self._current is not None and self.node_ids[self._current] == node_id:
+            return
+        self.close_current(now)
+        if node_id is None:
+            return
+        self._current = len(self.node_ids)
+        self._last_progress = None
+        self.node_ids.append(node_id)
+        self.class_index.append(self._class_slot(node_id))
+        self.start_monotonic.append(now)
+        self.duration_ms.append(0)
+        self.progress_count.append(0)
+        self.progress_interval_ms.append(0.0)
+
+    def node_progress(self, node_id: str | None, now: float | None = None) -> None:
+        if self._current is None or node_id != self.node_ids[self._current]:
+            return
+        now = time.monotonic() if now is None else now
+        index = self._current
+        count = self.progress_count[index]
+        if self._last_progress is not None and count > 0:
+            # Running mean of the gap between consecutive progress events.
+            interval = (now - self._last_progress) * 1000
+            self.progress_interval_ms[index] += (interval - self.progress_interval_ms[index]) / count
+        self.progress_count[index] = count + 1
+        self._last_progress = now
+
+    def node_finished(self, node_id: str | None, now: float | None = None) -> None:
+        if self._current is not None and node_id == self.node_ids[self._current]:
+            self.close_current(now)
+
+    def nodes_cached(self, node_ids: list[str]) -> None:
+        for node_id in node_ids:
+            self.cached_node_ids.append(node_id)
+            self.cached_class_index.append(self._class_slot(node_id))
+
+    def close_current(self, now: float | None = None) -> None:
+        if self._current is None:
+            return
+        now = time.monotonic() if now is None else now
+        self.duration_ms[self._current] = int(round((now - self.start_monotonic[self._current]) * 1000))
+        self._current = None
+        self._last_progress = None
+
+    def build_profile(self, *, status_value: str, now: float | None = None) -> ExecutionProfile:
+        now = time.monotonic() if now is None else now
+        self.close_current(now)
+        origin = self.started_monotonic if self.started_monotonic is not None else self.submitted_monotonic
+        queue_wait_ms = (
+            int(round((self.started_monotonic - self.submitted_monotonic) * 1000))
+            if self.started_monotonic is not None
+            else None
+        )
+        return ExecutionProfile(
+            task_id=self.task_id,
+            prompt_id=self.prompt_id,
+            workflow_hash=self.workflow_hash,
+            base_url=self.base_url,
+            status=status_value,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=datetime.now(timezone.utc),
+            queue_wait_ms=queue_wait_ms,
+            wall_ms=int(round((now - self.submitted_monotonic) * 1000)),
+            executed_node_count=len(self.node_ids),
+            cached_node_count=len(self.cached_node_ids),
+            timeline={
+                "version": TIMELINE_VERSION,
+                "class_types": self.class_types,
+                "node_ids": self.node_ids,
+                "class_index": self.class_index,
+                "start_ms": [int(round((start - origin) * 1000)) for start in self.start_monotonic],
+                "duration_ms": self.duration_ms,
+                "progress_count": self.progress_count,
+                "progress_interval_ms": [round(value, 1) for value in self.progress_interval_ms],
+                "cached_node_ids": self.cached_node_ids,
+                "cached_class_index": self.cached_class_index,
+            },
+        )
+
+
+async def save_execution_profile(recorder: ExecutionProfileRecorder, *, status_value: str) -> None:
+    profile = recorder.build_profile(status_value=status_value)
+    async with SessionLocal() as session:
+        session.add(profile)
+        await session.commit()
+    logger.info(
+        "Execution profile saved: task_id=%s status=%s wall_ms=%s queue_wait_ms=%s executed=%s cached=%s",
+        recorder.task_id,
+        status_value,
+        profile.wall_ms,
+        profile.queue_wait_ms,
+        profile.executed_node_count,
+        profile.cached_node_count,
+    )
+
+
+# ──────────────────────────────────────────────
+# Queries
+# ──────────────────────────────────────────────
+
+
+def _profile_filters(
+    *,
+    task_id: UUID | None = None,
+    workflow_hash: str | None = None,
+    base_url: str | None = None,
+    since: datetime | None = None,
+) -> list:
+    filters = []
+    if task_id is not None:
+        filters.append(ExecutionProfile.task_id == task_id)
+    if workflow_hash:
+        filters.append(ExecutionProfile.workflow_hash == workflow_hash)
+    if base_url:
+        filters.append(ExecutionProfile.base_url == base_url)
+    if since is not None:
+        filters.append(ExecutionProfile.finished_at >= since)
+    return filters
+
+
+async def list_execution_profiles(
+    session: AsyncSession,
+    *,
+    task_id: UUID | None,
+    workflow_hash: str | None,
+    base_url: str | None,
+    page: int,
+    page_size: int,
+) -> tuple[list[ExecutionProfile], int]:
+    filters = _profile_filters(task_id=task_id, workflow_hash=workflow_hash, base_url=base_url)
+    # Summary columns only; timelines are fetched per profile.
+    stmt = (
+        select(ExecutionProfile)
+        .where(*filters)
+        .order_by(ExecutionProfile.finished_at.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    items = list((await session.scalars(stmt.options(defer(ExecutionProfile.timeline)))).all())
+    total = int(await session.scalar(select(func.count(ExecutionProfile.id)).where(*filters)) or 0)
+    return items, total
+
+
+async def get_execution_profile_or_404(session: AsyncSession, profile_id: UUID) -> ExecutionProfile:
+    profile = await session.get(ExecutionProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Execution profile not found")
+    return profile
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+async def aggregate_profiles_by_workflow(
+    session: AsyncSession,
+    *,
+    base_url: str | None,
+    since: datetime | None,
+    limit: int,
+) -> list[dict]:
+    """Per-workflow run counts and timings, computed in the database."""
+    filters = _profile_filters(base_url=base_url, since=since)
+    stmt = (
+        select(
+            ExecutionProfile.workflow_hash,
+            func.count(ExecutionProfile.id).label("runs"),
+            func.sum(ExecutionProfile.wall_ms).label("total_wall_ms"),
+            func.avg(ExecutionProfile.wall_ms).label("mean_wall_ms"),
+            func.max(ExecutionProfile.wall_ms).label("max_wall_ms"),
+            func.avg(ExecutionProfile.queue_wait_ms).label("mean_queue_wait_ms"),
+            func.avg(ExecutionProfile.executed_node_count).label("mean_executed_nodes"),
+            func.avg(ExecutionProfile.cached_node_count).label("mean_cached_nodes"),
+            func.max(ExecutionProfile.finished_at).label("last_finished_at"),
+        )
+        .where(*filters)
+        .group_by(ExecutionProfile.workflow_hash)
+        .order_by(func.sum(ExecutionProfile.wall_ms).desc())
+        .limit(limit)
+    )
+    rows = (await session.execute(stmt)).all()
+    return [
+        {
+            "workflow_hash": row.workflow_hash,
+            "runs": int(row.runs or 0),
+            "total_wall_ms": int(row.total_wall_ms or 0),
+            "mean_wall_ms": float(row.mean_wall_ms or 0.0),
+            "max_wall_ms": int(row.max_wall_ms or 0),
+            "mean_queue_wait_ms": float(row.mean_queue_wait_ms) if row.mean_queue_wait_ms is not None else None,
+            "mean_executed_nodes": float(row.mean_executed_nodes or 0.0),
+            "mean_cached_nodes": float(row.mean_cached_nodes or 0.0),
+            "last_finished_at": row.last_finished_at,
+        }
+        for row in rows
+    ]
+
+
+async def aggregate_profiles_by_node_class(
+    session: AsyncSession,
+    *,
+    workflow_hash: str | None,
+    base_url: str | None,
+    since: datetime | None,
+    max_profiles: int,
+) -> tuple[list[dict], int]:
+    """
+    Per node class time across the most recent profiles. Only the timeline column
+    is loaded, and the columnar arrays are summed without building per-node objects.
+    """
+    filters = _profile_filters(workflow_hash=workflow_hash, base_url=base_url, since=since)
+    stmt = (
+        select(ExecutionProfile.timeline)
+        .where(*filters)
+        .order_by(ExecutionProfile.finished_at.desc())
+        .limit(max_profiles)
+    )
+    timelines = (await session.scalars(stmt)).all()
+
+    durations: dict[str, list[int]] = defaultdict(list)
+    cached_counts: dict[str, int] = defaultdict(int)
+    progress_counts: dict[str, int] = defaultdict(int)
+    for timeline in timelines:
+        if not isinstance(timeline, dict):
+            continue
+        class_types = timeline.get("class_types") or []
+        for slot, duration, progress in zip(
+            timeline.get("class_index") or [],
+            timeline.get("duration_ms") or [],
+            timeline.get("progress_count") or [],
+        ):
+            class_type = class_types[slot] if 0 <= slot < len(class_types) else ""
+            durations[class_type].append(int(duration))
+            progress_counts[class_type] += int(progress)
+        for slot in timeline.get("cached_class_index") or []:
+            class_type = class_types[slot] if 0 <= slot < len(class_types) else ""
+            cached_counts[class_type] += 1
+
+    total_ms = sum(sum(values) for values in durations.values()) or 1
+    items = []
+    for class_type in set(durations) | set(cached_counts):
+        values = sorted(durations.get(class_type, []))
+        class_total = sum(values)
+        items.append(
+            {
+                "class_type": class_type,
+                "executions": len(values),
+                "cached": cached_counts.get(class_type, 0),
+                "total_ms": class_total,
+                "share_percent": round(class_total / total_ms * 100, 2),
+                "mean_ms": class_total / len(values) if values else 0.0,
+                "p50_ms": _percentile(values, 0.5),
+                "p90_ms": _percentile(values, 0.9),
+                "max_ms": values[-1] if values else 0,
+                "progress_events": progress_counts.get(class_type, 0),
+            }
+        )
+    items.sort(key=lambda item: item["total_ms"], reverse=True)
+    return items, len(timelines)
+
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
+
+from app.core import json_codec
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - the "msgpack" extra; without it only the compact JSON protocol is offered
+    msgpack = None
+
+# Wire protocols for /execution/ws/{task_id}, negotiated through the WebSocket
+# subprotocol header. A client that offers none keeps the verbose JSON messages.
+#
+# The compact protocols carry the same messages, minus what repeats. Before any
+# message that uses a new node or prompt, the session sends
+#     {"type": "defs", "nodes": {node_id: [title, class_type]}, "prompts": {index: prompt_id}}
+# after which:
+#   - a message's "prompt_id" is the prompt's integer index;
+#   - data carries node_id without node_title / node_class_type / node_infos;
+#   - state_sync omits the node title fields and sends event_log entries as
+#     [time, message, type].
+# The msgpack protocol sends them as binary MessagePack frames, which start at
+# 0x80 or above and so never collide with preview frames (first byte 0x00).
+# Client-to-server messages (ping) stay JSON text in every protocol.
+COMPACT_JSON_SUBPROTOCOL = "execution.compact.json.v1"
+COMPACT_MSGPACK_SUBPROTOCOL = "execution.compact.msgpack.v1"
+
+_NODE_DETAIL_KEYS = frozenset({"node_title", "node_class_type", "node_infos"})
+_STATE_NODE_DETAIL_KEYS = frozenset({"current_node_title", "current_node_class_type"})
+
+
+def supported_subprotocols() -> tuple[str, ...]:
+    if msgpack is None:
+        return (COMPACT_JSON_SUBPROTOCOL,)
+    return (COMPACT_MSGPACK_SUBPROTOCOL, COMPACT_JSON_SUBPROTOCOL)
+
+
+def negotiate_subprotocol(offered: list[str]) -> str | None:
+    """First offered subprotocol this server speaks; the client lists them by preference."""
+    supported = supported_subprotocols()
+    for subprotocol in offered:
+        if subprotocol in supported:
+            return subprotocol
+    return None
+
+
+@dataclass
+class CompactWireSession:
+    """Per-connection encoder; remembers which nodes and prompts the client already knows."""
+
+    subprotocol: str
+    known_nodes: set[str] = field(default_factory=set)
+    prompt_indexes: dict[str, int] = field(default_factory=dict)
+
+    def define_nodes(self, node_map: dict) -> dict | None:
+        """A defs message for a workflow's whole node table, sent once when the session starts."""
+        nodes: dict[str, list[str]] = {}
+        for node_id, info in node_map.items():
+            if isinstance(info, dict):
+                self._learn_node(str(node_id), info.get("title"), info.get("class_type"), nodes)
+        return {"type": "defs", "nodes": nodes, "prompts": {}} if nodes else None
+
+    def encode(self, message: dict) -> list[str | bytes]:
+        nodes: dict[str, list[str]] = {}
+        prompts: dict[str, str] = {}
+        compact = {key: value for key, value in message.items() if key != "data"}
+        if message.get("prompt_id"):
+            compact["prompt_id"] = self._prompt_index(str(message["prompt_id"]), prompts)
+        data = message.get("data")
+        if isinstance(data, dict):
+            if message.get("type") == "state_sync":
+                compact["data"] = self._compact_state(data, nodes, prompts)
+            else:
+                compact["data"] = self._compact_data(data, nodes)
+        elif "data" in message:
+            compact["data"] = data
+
+        frames: list[str | bytes] = []
+        if nodes or prompts:
+            frames.append(self._dump({"type": "defs", "nodes": nodes, "prompts": prompts}))
+        frames.append(self._dump(compact))
+        return frames
+
+    async def send(self, websocket: WebSocket, message: dict) -> None:
+        for frame in self.encode(message):
+            if isinstance(frame, bytes):
+                await websocket.send_bytes(frame)
+            else:
+                await websocket.send_text(frame)
+
+    def _dump(self, value: dict) -> str | bytes:
+        if self.subprotocol == COMPACT_MSGPACK_SUBPROTOCOL:
+            return msgpack.packb(value, use_bin_type=True)
+        return json_codec.dumps(value)
+
+    def _learn_node(self, node_id: str, title: object, class_type: object, nodes: dict[str, list[str]]) -> None:
+        if node_id and node_id not in self.known_nodes:
+            self.known_nodes.add(node_id)
+            nodes[node_id] = [str(title or ""), str(class_type or "")]
+
+    def _prompt_index(self, prompt_id: str, prompts: dict[str, str]) -> int:
+        index = self.prompt_indexes.get(prompt_id)
+        if index is None:
+            index = len(self.prompt_indexes)
+            self.prompt_indexes[prompt_id] = index
+            prompts[str(index)] = prompt_id
+        return index
+
+    def _compact_data(self, data: dict, nodes: dict[str, list[str]]) -> dict:
+        node_id = data.get("node_id")
+        if node_id and ("node_title" in data or "node_class_type" in data):
+            self._learn_node(str(node_id), data.get("node_title"), data.get("node_class_type"), nodes)
+        for info in data.get("node_infos") or ():
+            if isinstance(info, dict) and info.get("node_id"):
+                self._learn_node(str(info["node_id"]), info.get("node_title"), info.get("node_class_type"), nodes)
+        return {key: value for key, value in data.items() if key not in _NODE_DETAIL_KEYS}
+
+    def _compact_state(self, state: dict, nodes: dict[str, list[str]], prompts: dict[str, str]) -> dict:
+        compact = {key: value for key, value in state.items() if key not in _STATE_NODE_DETAIL_KEYS}
+        if state.get("current_node_id"):
+            self._learn_node(
+                str(state["current_node_id"]),
+                state.get("current_node_title"),
+                state.get("current_node_class_type"),
+                nodes,
+            )
+        progress = state.get("progress")
+        if isinstance(progress, dict):
+            compact["progress"] = self._compact_data(progress, nodes)
+        event_log = state.get("event_log")
+        if isinstance(event_log, list):
+            compact["event_log"] = [
+                [entry.get("time"), entry.get("message"), entry.get("type")]
+                for entry in event_log
+                if isinstance(entry, dict)
+            ]
+        # Prompt ids stay readable here; indexing them lets later events use the short form.
+        for prompt_id in [state.get("prompt_id"), *(state.get("prompt_ids") or ())]:
+            if prompt_id:
+                self._prompt_index(str(prompt_id), prompts)
+        return compact
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.service_lease import ServiceLease
+from app.services.pubsub_service import WORKER_ID
+
+logger = logging.getLogger("app.leader")
+
+
+# ──────────────────────────────────────────────
+# Lease Row Operations
+# ──────────────────────────────────────────────
+
+
+async def try_acquire_lease(name: str, *, holder: str, ttl_seconds: float) -> bool:
+    """
+    Take or renew the lease row for ``name``.
+
+    Succeeds when the row is free, already held by ``holder``, or expired. The
+    conditional UPDATE makes the take-over atomic, so two replicas racing for
+    an expired lease cannot both win.
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    async with SessionLocal() as session:
+        result = await session.execute(
+            update(ServiceLease)
+            .where(
+                ServiceLease.name == name,
+                or_(ServiceLease.holder == holder, ServiceLease.expires_at < now),
+            )
+            .values(holder=holder, expires_at=expires_at, renewed_at=now)
+            .returning(ServiceLease.holder)
+            .execution_options(synchronize_session=False)
+        )
+        if result.first() is not None:
+            await session.commit()
+            return True
+
+        session.add(ServiceLease(name=name, holder=holder, expires_at=expires_at, acquired_at=now, renewed_at=now))
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Another replica holds a live lease.
+            await session.rollback()
+            return False
+        return True
+
+
+async def release_lease(name: str, *, holder: str) -> None:
+    async with SessionLocal() as session:
+        await session.execute(
+            delete(ServiceLease)
+            .where(ServiceLease.name == name, ServiceLease.holder == holder)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+# ──────────────────────────────────────────────
+# Background Lease Keeper
+# ──────────────────────────────────────────────
+
+
+class LeaseKeeper:
+    """
+    Keeps trying to hold one named lease and renews it every ttl/3 seconds.
+
+    ``is_leader`` also checks a local deadline slightly inside the TTL, so a
+    replica whose heartbeats stall stops acting before another can take over.
+    """
+
+    def __init__(self, name: str, *, ttl_seconds: float | None = None) -> None:
+        self.name = name
+        self.holder = WORKER_ID
+        self.ttl_seconds = max(3.0, float(ttl_seconds or settings.leader_lease_ttl_seconds))
+        self._held_until = 0.0
+        self._task: asyncio.Task | None = None
+        self._stop_event: asyncio.Event | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._held_until
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(self._stop_event))
+
+    async def stop(self) -> None:
+        stop_event = self._stop_event
+        worker = self._task
+        self._stop_event = None
+        self._task = None
+        if stop_event is not None:
+            stop_event.set()
+        if worker is not None:
+            worker.cancel()
+            try:
+                await worker
+            except asyncio.CancelledError:
+                pass
+        if self._held_until:
+            self._held_until = 0.0
+            try:
+                await release_lease(self.name, holder=self.holder)
+            except Exception:
+                logger.warning("Releasing lease failed: name=%s", self.name, exc_info=True)
+
+    async def _renew_once(self) -> None:
+        was_leader = self.is_leader
+        started = time.monotonic()
+        try:
+            acquired = await try_acquire_lease(self.name, holder=self.holder, ttl_seconds=self.ttl_seconds)
+        except Exception:
+            logger.warning("Lease heartbeat failed: name=%s", self.name, exc_info=True)
+            return
+        if acquired:
+            # Measured from before the round trip and shortened by a third, leaving margin for clock skew.
+            self._held_until = started + self.ttl_seconds * 2 / 3
+            if not was_leader:
+                logger.info("Lease acquired: name=%s holder=%s", self.name, self.holder)
+        else:
+            self._held_until = 0.0
+            if was_leader:
+                logger.warning("Lease lost: name=%s holder=%s", self.name, self.holder)
+
+    async def _run(self, stop_event: asyncio.Event) -> None:
+        interval = self.ttl_seconds / 3
+        while not stop_event.is_set():
+            await self._renew_once()
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                continue
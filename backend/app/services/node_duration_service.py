@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from collections.abc import Collection, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.node_duration_stat import NodeDurationStat
+
+logger = logging.getLogger("app.node_duration")
+
+_FLUSH_INTERVAL_SECONDS = 5.0
+_HISTORY_LOAD_LIMIT = 5000
+
+# (workflow_hash, class_type, base_url)
+StatKey = tuple[str, str, str]
+
+
+# ──────────────────────────────────────────────
+# Data Classes
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class NodeDurationStats:
+    """Running count/mean plus a sliding window of recent samples for quantiles."""
+
+    sample_count: int = 0
+    mean_ms: float = 0.0
+    recent_ms: deque[float] = field(default_factory=lambda: deque(maxlen=settings.node_duration_window_size))
+    p50_ms: float = 0.0
+    p90_ms: float = 0.0
+    # Samples recorded on this worker and not yet merged into the database row.
+    pending_ms: list[float] = field(default_factory=list)
+
+    def add(self, duration_ms: float) -> None:
+        self.sample_count += 1
+        self.mean_ms += (duration_ms - self.mean_ms) / self.sample_count
+        self.recent_ms.append(duration_ms)
+        self.pending_ms.append(duration_ms)
+        self._refresh_quantiles()
+
+    def _refresh_quantiles(self) -> None:
+        self.p50_ms = _quantile(self.recent_ms, 0.5)
+        self.p90_ms = _quantile(self.recent_ms, 0.9)
+
+
+def _quantile(samples: Iterable[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+_stats: dict[StatKey, NodeDurationStats] = {}
+# Secondary index for the fallbacks in estimate_node_duration_ms.
+_keys_by_class_type: dict[str, set[StatKey]] = {}
+_dirty_keys: set[StatKey] = set()
+_flush_worker_task: asyncio.Task | None = None
+
+
+def _stats_for(key: StatKey) -> NodeDurationStats:
+    stats = _stats.get(key)
+    if stats is None:
+        stats = NodeDurationStats()
+        _stats[key] = stats
+        _keys_by_class_type.setdefault(key[1], set()).add(key)
+    return stats
+
+
+# ──────────────────────────────────────────────
+# Recording
+# ──────────────────────────────────────────────
+
+
+def record_node_duration(workflow_hash: str, class_type: str, base_url: str, duration_ms: float) -> None:
+    if not workflow_hash or not class_type or duration_ms < 0:
+        return
+    _stats_for((workflow_hash, class_type, base_url)).add(float(duration_ms))
+    _dirty_keys.add((workflow_hash, class_type, base_url))
+    _ensure_flush_worker()
+
+
+def _ensure_flush_worker() -> None:
+    global _flush_worker_task
+    if _flush_worker_task is not None and not _flush_worker_task.done():
+        return
+    loop = asyncio.get_running_loop()
+    _flush_worker_task = loop.create_task(_flush_worker_loop())
+
+
+async def stop_node_duration_flush() -> None:
+    """Cancel the flush worker; its final flush writes any samples still pending."""
+    global _flush_worker_task
+    worker = _flush_worker_task
+    _flush_worker_task = None
+    if worker is None:
+        return
+    worker.cancel()
+    try:
+        await worker
+    except asyncio.CancelledError:
+        pass
+
+
+async def _flush_worker_loop() -> None:
+    try:
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL_SECONDS)
+            await flush_node_durations()
+    except asyncio.CancelledError:
+        # Best-effort final flush when worker is cancelled.
+        await flush_node_durations()
+        raise
+    except Exception:
+        logger.exception("Node duration flush worker crashed")
+
+
+async def flush_node_durations() -> None:
+    """
+    Merge pending samples into their rows. Each row is locked, read and rewritten
+    rather than overwritten, so replicas recording the same key do not lose samples.
+    If the flush fails, for instance when another replica inserted the same new key
+    first, the samples stay pending for the next flush.
+    """
+    # A fixed lock order keeps replicas flushing overlapping keys from deadlocking.
+    keys = sorted(_dirty_keys)
+    if not keys:
+        return
+    _dirty_keys.difference_update(keys)
+    window_size = settings.node_duration_window_size
+    taken: dict[StatKey, list[float]] = {}
+    rows: list[NodeDurationStat] = []
+    try:
+        async with SessionLocal() as session:
+            for key in keys:
+                stats = _stats.get(key)
+                if stats is None or not stats.pending_ms:
+                    continue
+                pending = stats.pending_ms
+                stats.pending_ms = []
+                taken[key] = pending
+                row = await session.get(NodeDurationStat, key, with_for_update=True)
+                if row is None:
+                    row = NodeDurationStat(workflow_hash=key[0], class_type=key[1], base_url=key[2])
+                    session.add(row)
+                    previous_count, previous_mean, previous_recent = 0, 0.0, []
+                else:
+                    previous_count, previous_mean, previous_recent = row.sample_count, row.mean_ms, list(row.recent_ms or [])
+                count = previous_count + len(pending)
+                recent = (previous_recent + pending)[-window_size:]
+                row.sample_count = count
+                row.mean_ms = (previous_mean * previous_count + sum(pending)) / count
+                row.recent_ms = recent
+                row.p50_ms = _quantile(recent, 0.5)
+                row.p90_ms = _quantile(recent, 0.9)
+                row.updated_at = datetime.now(timezone.utc)
+                rows.append(row)
+            await session.commit()
+    except BaseException as exc:
+        for key, pending in taken.items():
+            stats = _stats_for(key)
+            stats.pending_ms[:0] = pending
+            _dirty_keys.add(key)
+        if not isinstance(exc, Exception):
+            raise
+        logger.warning("Node duration flush failed, samples kept for the next flush", exc_info=True)
+        return
+    for row in rows:
+        _apply_row(row)
+
+
+def _apply_row(row: NodeDurationStat) -> None:
+    stats = _stats_for((row.workflow_hash, row.class_type, row.base_url))
+    stats.sample_count = int(row.sample_count or 0)
+    stats.mean_ms = float(row.mean_ms or 0.0)
+    stats.recent_ms = deque(
+        [float(value) for value in (row.recent_ms or [])][-settings.node_duration_window_size :],
+        maxlen=settings.node_duration_window_size,
+    )
+    for value in stats.pending_ms:
+        stats.recent_ms.append(value)
+    stats._refresh_quantiles()
+
+
+async def load_node_duration_history(class_types: Collection[str]) -> None:
+    """Warm the in-memory stats for the classes a workflow uses; one indexed query per execute."""
+    if not class_types:
+        return
+    async with SessionLocal() as session:
+        rows = (
+            await session.scalars(
+                select(NodeDurationStat)
+                .where(NodeDurationStat.class_type.in_(list(class_types)))
+                .order_by(NodeDurationStat.updated_at.desc())
+                .limit(_HISTORY_LOAD_LIMIT)
+            )
+        ).all()
+    for row in rows:
+        _apply_row(row)
+
+
+# ──────────────────────────────────────────────
+# Estimation
+# ──────────────────────────────────────────────
+
+
+def estimate_node_duration_ms(workflow_hash: str | None, class_type: str, base_url: str) -> float | None:
+    """
+    Median duration for a node, from the most specific history available:
+    same workflow on the same endpoint, same workflow anywhere, the class on
+    this endpoint, then the class anywhere.
+    """
+    exact = _stats.get((workflow_hash or "", class_type, base_url))
+    if exact is not None and exact.sample_count:
+        return exact.p50_ms
+    keys = _keys_by_class_type.get(class_type)
+    if not keys:
+        return None
+    for matches in (
+        lambda key: key[0] == workflow_hash,
+        lambda key: key[2] == base_url,
+        lambda key: True,
+    ):
+        medians = [_stats[key].p50_ms for key in keys if matches(key) and _stats[key].sample_count]
+        if medians:
+            return statistics.median(medians)
+    return None
+
+
+@dataclass
+class ExecutionProgressEstimator:
+    """
+    Tracks one execution: which nodes finished and how much of the expected
+    total time they account for. Every update is O(1) so it can run on each
+    progress event.
+    """
+
+    workflow_hash: str
+    base_url: str
+    expected_ms: dict[str, float]
+    class_types: dict[str, str]
+    has_history: bool
+    total_ms: float
+    done_ms: float = 0.0
+    completed_node_ids: set[str] = field(default_factory=set)
+    current_node_id: str | None = None
+    current_started: float = 0.0
+    current_fraction: float | None = None
+
+    @classmethod
+    def build(
+        cls,
+        node_map: dict[str, dict[str, str]],
+        *,
+        workflow_hash: str | None,
+        base_url: str,
+        node_ids: Iterable[str] | None = None,
+    ) -> ExecutionProgressEstimator:
+        ordered_ids = [str(node_id) for node_id in (node_ids or node_map)]
+        class_types = {node_id: str((node_map.get(node_id) or {}).get("class_type") or "") for node_id in ordered_ids}
+        estimates = {
+            node_id: estimate_node_duration_ms(workflow_hash, class_type, base_url)
+            for node_id, class_type in class_types.items()
+        }
+        known = [value for value in estimates.values() if value is not None]
+        # Nodes without history weigh as much as a typical node of this workflow.
+        fallback = statistics.median(known) if known else 1.0
+        expected_ms = {node_id: (value if value is not None else fallback) for node_id, value in estimates.items()}
+        return cls(
+            workflow_hash=workflow_hash or "",
+            base_url=base_url,
+            expected_ms=expected_ms,
+            class_types=class_types,
+            has_history=bool(known),
+            total_ms=sum(expected_ms.values()),
+        )
+
+    def reset(self) -> None:
+        self.done_ms = 0.0
+        self.completed_node_ids.clear()
+        self.current_node_id = None
+        self.current_fraction = None
+
+    def mark_completed(self, node_id: str) -> bool:
+        if node_id in self.completed_node_ids:
+            return False
+        self.completed_node_ids.add(node_id)
+        self.done_ms += self.expected_ms.get(node_id, 0.0)
+        return True
+
+    def finish_current(self, now: float | None = None, *, record: bool = True) -> None:
+        """Complete the executing node and record how long it took (skipped for failed nodes)."""
+        node_id = self.current_node_id
+        self.current_node_id = None
+        self.current_fraction = None
+        if node_id is None or not self.mark_completed(node_id) or not record:
+            return
+        now = time.monotonic() if now is None else now
+        record_node_duration(
+            self.workflow_hash,
+            self.class_types.get(node_id, ""),
+            self.base_url,
+            (now - self.current_started) * 1000,
+        )
+
+    def start_node(self, node_id: str | None, now: float | None = None) -> None:
+        """ComfyUI reports only the next executing node, so this also finishes the previous one."""
+        now = time.monotonic() if now is None else now
+        if node_id is not None and node_id == self.current_node_id:
+            return
+        self.finish_current(now)
+        self.current_node_id = node_id
+        self.current_started = now
+
+    def set_node_progress(self, node_id: str | None, value: float, maximum: float) -> None:
+        if node_id is not None and node_id == self.current_node_id and maximum > 0:
+            self.current_fraction = min(1.0, max(0.0, value / maximum))
+
+    def snapshot(self, now: float | None = None) -> dict:
+        now = time.monotonic() if now is None else now
+        current_expected = 0.0
+        current_done_ms = 0.0
+        current_remaining_ms = 0.0
+        if self.current_node_id is not None and self.current_node_id not in self.completed_node_ids:
+            current_expected = self.expected_ms.get(self.current_node_id, 0.0)
+            elapsed_ms = (now - self.current_started) * 1000
+            if self.current_fraction is not None:
+                current_done_ms = current_expected * self.current_fraction
+                current_remaining_ms = current_expected - current_done_ms
+            elif self.has_history:
+                current_done_ms = min(current_expected, elapsed_ms)
+                current_remaining_ms = current_expected - current_done_ms
+            else:
+                current_remaining_ms = current_expected
+        percent = (self.done_ms + current_done_ms) / self.total_ms * 100 if self.total_ms > 0 else 0.0
+        result: dict = {
+            # 100 is published only once the execution has completed.
+            "percent": round(min(99.9, max(0.0, percent)), 1),
+            "eta_seconds": None,
+            "estimated_finish_at": None,
+        }
+        if self.has_history:
+            remaining_ms = max(0.0, self.total_ms - self.done_ms - current_expected + current_remaining_ms)
+            result["eta_seconds"] = round(remaining_ms / 1000, 1)
+            result["estimated_finish_at"] = (
+                datetime.now(timezone.utc) + timedelta(milliseconds=remaining_ms)
+            ).isoformat()
+        return result
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import time
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
+
+from app.core import json_codec
+from app.core.config import settings
+from app.core.metrics import counter
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - the "previews" extra; previews are then relayed as ComfyUI encoded them
+    Image = None
+
+logger = logging.getLogger("app.preview")
+
+# Live sampler previews for execution WS clients that opt in. ComfyUI sends them as
+# binary frames on the listener's socket; only the newest frame per task is kept,
+# and a per-task sender forwards it at most preview_max_fps times per second.
+# Tasks without preview subscribers drop frames before looking at them.
+
+# ComfyUI binary frames: 4-byte big-endian event type, then the payload.
+COMFY_PREVIEW_IMAGE = 1  # 4-byte image format (1 = JPEG, 2 = PNG), then the image
+COMFY_PREVIEW_IMAGE_WITH_METADATA = 4  # 4-byte metadata length, JSON metadata, then the image
+
+# Frames sent to clients use ComfyUI's PREVIEW_IMAGE layout, so browser code that
+# already decodes ComfyUI previews works unchanged.
+PREVIEW_FRAME_TYPE = COMFY_PREVIEW_IMAGE
+_FORMAT_CODES = {"jpeg": 1, "png": 2}
+_FORMATS_BY_CODE = {code: name for name, code in _FORMAT_CODES.items()}
+_FORMATS_BY_MIME = {"image/jpeg": "jpeg", "image/png": "png"}
+
+_previews_received = counter(
+    "preview_frames_received_total",
+    "ComfyUI preview frames offered for tasks with preview subscribers",
+)
+_previews_dropped = counter(
+    "preview_frames_dropped_total",
+    "ComfyUI preview frames not forwarded, by reason",
+    ("reason",),
+)
+_previews_sent = counter(
+    "preview_frames_sent_total",
+    "Preview frames forwarded to subscribed execution WS clients",
+)
+_dropped_no_subscribers = _previews_dropped.labels("no_subscribers")
+_dropped_unsupported = _previews_dropped.labels("unsupported")
+_dropped_superseded = _previews_dropped.labels("superseded")
+
+
+@dataclass
+class _Preview:
+    image_format: str
+    frame: bytes
+    image_offset: int
+
+
+@dataclass
+class _PreviewChannel:
+    subscribers: set[WebSocket] = field(default_factory=set)
+    latest: _Preview | None = None
+    last_sent: float = 0.0
+    sender: asyncio.Task | None = None
+
+
+_channels: dict[str, _PreviewChannel] = {}
+
+
+def parse_comfy_preview_frame(frame: bytes) -> _Preview | None:
+    if len(frame) < 8:
+        return None
+    event_type = int.from_bytes(frame[:4], "big")
+    if event_type == COMFY_PREVIEW_IMAGE:
+        image_format = _FORMATS_BY_CODE.get(int.from_bytes(frame[4:8], "big"))
+        return _Preview(image_format, frame, 8) if image_format else None
+    if event_type == COMFY_PREVIEW_IMAGE_WITH_METADATA:
+        metadata_end = 8 + int.from_bytes(frame[4:8], "big")
+        try:
+            metadata = json_codec.loads(memoryview(frame)[8:metadata_end])
+        except (json_codec.JSONDecodeError, UnicodeDecodeError):
+            return None
+        mime = metadata.get("image_type") if isinstance(metadata, dict) else None
+        image_format = _FORMATS_BY_MIME.get(mime)
+        return _Preview(image_format, frame, metadata_end) if image_format else None
+    return None
+
+
+def check_preview_support() -> None:
+    """Startup check: without Pillow, previews still stream but are never resized."""
+    if settings.preview_streaming_enabled and Image is None and settings.preview_max_size > 0:
+        logger.warning(
+            "Preview streaming is enabled but Pillow is not installed; PREVIEW_MAX_SIZE and "
+            "PREVIEW_JPEG_QUALITY are ignored. Install the 'previews' extra to downscale previews."
+        )
+
+
+def subscribe_previews(task_id: str, websocket: WebSocket) -> None:
+    _channels.setdefault(task_id, _PreviewChannel()).subscribers.add(websocket)
+
+
+def unsubscribe_previews(task_id: str, websocket: WebSocket) -> None:
+    channel = _channels.get(task_id)
+    if channel is None:
+        return
+    channel.subscribers.discard(websocket)
+    if not channel.subscribers:
+        del _channels[task_id]
+        if channel.sender is not None:
+            channel.sender.cancel()
+
+
+def offer_preview_frame(task_id: str, frame: bytes) -> None:
+    """Listener hook for binary ComfyUI frames; keeps the newest preview and wakes the sender."""
+    channel = _channels.get(task_id)
+    if channel is None:
+        _dropped_no_subscribers.inc()
+        return
+    preview = parse_comfy_preview_frame(frame)
+    if preview is None:
+        _dropped_unsupported.inc()
+        return
+    _previews_received.inc()
+    if channel.latest is not None:
+        _dropped_superseded.inc()
+    channel.latest = preview
+    if channel.sender is None or channel.sender.done():
+        channel.sender = asyncio.create_task(_send_latest(task_id, channel))
+
+
+async def _send_latest(task_id: str, channel: _PreviewChannel) -> None:
+    interval = 1 / settings.preview_max_fps if settings.preview_max_fps > 0 else 0.0
+    while channel.latest is not None and channel.subscribers:
+        wait = channel.last_sent + interval - time.monotonic()
+        if wait > 0:
+            # Frames arriving meanwhile replace channel.latest; only the newest is sent.
+            await asyncio.sleep(wait)
+        preview, channel.latest = channel.latest, None
+        try:
+            payload = await _client_frame(preview)
+        except Exception:
+            logger.warning("Failed to re-encode preview for task %s", task_id, exc_info=True)
+            continue
+        channel.last_sent = time.monotonic()
+        for websocket in list(channel.subscribers):
+            try:
+                await websocket.send_bytes(payload)
+            except Exception:
+                channel.subscribers.discard(websocket)
+        _previews_sent.inc()
+
+
+async def _client_frame(preview: _Preview) -> bytes:
+    if Image is None or settings.preview_max_size <= 0:
+        if preview.frame[:4] == PREVIEW_FRAME_TYPE.to_bytes(4, "big"):
+            return preview.frame
+        return _frame_bytes(preview.image_format, memoryview(preview.frame)[preview.image_offset :])
+    image_format, image = await asyncio.to_thread(
+        _downscale,
+        memoryview(preview.frame)[preview.image_offset :],
+        preview.image_format,
+    )
+    return _frame_bytes(image_format, image)
+
+
+def _frame_bytes(image_format: str, image: bytes | memoryview) -> bytes:
+    return PREVIEW_FRAME_TYPE.to_bytes(4, "big") + _FORMAT_CODES[image_format].to_bytes(4, "big") + bytes(image)
+
+
+def _downscale(image: memoryview, image_format: str) -> tuple[str, bytes | memoryview]:
+    """Fit the preview into preview_max_size pixels and re-encode it as JPEG."""
+    max_size = settings.preview_max_size
+    with Image.open(io.BytesIO(image)) as source:
+        if image_format == "jpeg" and max(source.size) <= max_size:
+            return image_format, image
+        source.thumbnail((max_size, max_size))
+        output = io.BytesIO()
+        source.convert("RGB").save(output, format="JPEG", quality=settings.preview_jpeg_quality)
+    return "jpeg", output.getvalue()
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import uuid
+from collections.abc import Awaitable, Callable
+
+from app.core import json_codec
+from app.core.config import settings
+
+logger = logging.getLogger("app.pubsub")
+
+MessageHandler = Callable[[dict], Awaitable[None]]
+LockLostHandler = Callable[[str], None]
+
+# Identifies this process in published envelopes so a worker can skip its own messages.
+WORKER_ID = uuid.uuid4().hex[:12]
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+_PG_NOTIFY_MAX_PAYLOAD_BYTES = 7900
+_PG_RECONNECT_DELAY_SECONDS = 2.0
+_CHANNEL_PREFIX = "flow_task_"
+
+
+# ──────────────────────────────────────────────
+# Backend Interface
+# ──────────────────────────────────────────────
+
+
+class PubSubBackend:
+    """
+    Cross-worker fan-out plus named exclusive locks.
+
+    Handlers receive the published dict; every message carries an ``origin``
+    key set to the publishing worker's WORKER_ID.
+    """
+
+    name = "base"
+
+    async def start(self) -> None:
+        return None
+
+    async def stop(self) -> None:
+        return None
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        raise NotImplementedError
+
+    async def publish(self, channel: str, message: dict) -> bool:
+        raise NotImplementedError
+
+    def payload_fits(self, message: dict) -> bool:
+        """Whether publish() can carry this message; backends without a size limit always can."""
+        return True
+
+    async def try_acquire_lock(self, name: str) -> bool:
+        raise NotImplementedError
+
+    async def release_lock(self, name: str) -> None:
+        raise NotImplementedError
+
+    def on_lock_lost(self, handler: LockLostHandler) -> None:
+        """Register a callback for held locks that were lost and could not be reclaimed; no-op where locks cannot be lost."""
+        return None
+
+
+async def _dispatch(handlers: list[MessageHandler], message: dict) -> None:
+    for handler in list(handlers):
+        try:
+            await handler(message)
+        except Exception:
+            logger.exception("Pub/sub handler failed")
+
+
+# ──────────────────────────────────────────────
+# In-Memory Backend
+# ──────────────────────────────────────────────
+
+
+class InMemoryPubSubBackend(PubSubBackend):
+    """Single-process backend: publish loops back to local handlers. Used for SQLite and tests."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[MessageHandler]] = {}
+        self._held_locks: set[str] = set()
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    async def publish(self, channel: str, message: dict) -> bool:
+        envelope = {**message, "origin": message.get("origin") or WORKER_ID}
+        await _dispatch(self._handlers.get(channel, []), envelope)
+        return True
+
+    async def try_acquire_lock(self, name: str) -> bool:
+        self._held_locks.add(name)
+        return True
+
+    async def release_lock(self, name: str) -> None:
+        self._held_locks.discard(name)
+
+
+# ──────────────────────────────────────────────
+# PostgreSQL Backend (LISTEN/NOTIFY + advisory locks)
+# ──────────────────────────────────────────────
+
+
+def _asyncpg_dsn(database_url: str) -> str:
+    scheme, _, rest = database_url.partition("://")
+    return f"{scheme.split('+', 1)[0]}://{rest}"
+
+
+def _advisory_lock_key(name: str) -> int:
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+class PostgresPubSubBackend(PubSubBackend):
+    """
+    LISTEN/NOTIFY fan-out with session-level advisory locks.
+
+    Uses two dedicated asyncpg connections outside the SQLAlchemy pool: one
+    that only LISTENs, and one for NOTIFY and lock calls. Advisory locks live
+    as long as the control connection, so a crashed worker frees its locks.
+    """
+
+    name = "postgres"
+
+    def __init__(self, database_url: str) -> None:
+        self._dsn = _asyncpg_dsn(database_url)
+        self._handlers: dict[str, list[MessageHandler]] = {}
+        self._listen_conn = None
+        self._control_conn = None
+        self._control_lock = asyncio.Lock()
+        self._held_locks: set[str] = set()
+        # Locks held when the control connection dropped, reclaimed after reconnecting.
+        self._lost_locks: set[str] = set()
+        self._lock_lost_handlers: list[LockLostHandler] = []
+        self._reconnect_task: asyncio.Task | None = None
+        self._stopped = False
+
+    @staticmethod
+    def _pg_channel(channel: str) -> str:
+        return f"{_CHANNEL_PREFIX}{channel}"
+
+    async def start(self) -> None:
+        self._stopped = False
+        await self._connect()
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        for conn in (self._listen_conn, self._control_conn):
+            if conn is None:
+                continue
+            try:
+                await conn.close()
+            except Exception:
+                logger.debug("Closing pub/sub connection failed", exc_info=True)
+        self._listen_conn = None
+        self._control_conn = None
+        self._held_locks.clear()
+        self._lost_locks.clear()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self._listen_conn = await asyncpg.connect(self._dsn)
+        self._control_conn = await asyncpg.connect(self._dsn)
+        self._listen_conn.add_termination_listener(self._on_connection_lost)
+        self._control_conn.add_termination_listener(self._on_connection_lost)
+        for channel in list(self._handlers):
+            await self._listen_conn.add_listener(self._pg_channel(channel), self._on_notification)
+        logger.info("Pub/sub connected: backend=postgres worker_id=%s", WORKER_ID)
+
+    def _on_connection_lost(self, _conn) -> None:
+        if self._stopped:
+            return
+        if self._held_locks:
+            logger.warning("Pub/sub connection lost, advisory locks released: %s", sorted(self._held_locks))
+        self._lost_locks |= self._held_locks
+        self._held_locks.clear()
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self) -> None:
+        while not self._stopped:
+            for conn in (self._listen_conn, self._control_conn):
+                if conn is not None and not conn.is_closed():
+                    try:
+                        await conn.close()
+                    except Exception:
+                        pass
+            try:
+                await self._connect()
+            except Exception:
+                logger.warning("Pub/sub reconnect failed, retrying", exc_info=True)
+                await asyncio.sleep(_PG_RECONNECT_DELAY_SECONDS)
+                continue
+            await self._reclaim_lost_locks()
+            return
+
+    async def _reclaim_lost_locks(self) -> None:
+        """Take back the locks lost with the old connection; owners of any taken meanwhile are told to stop."""
+        lost, self._lost_locks = self._lost_locks, set()
+        for name in sorted(lost):
+            try:
+                reclaimed = await self.try_acquire_lock(name)
+            except Exception:
+                logger.warning("Reclaiming advisory lock failed: name=%s", name, exc_info=True)
+                reclaimed = False
+            if reclaimed:
+                continue
+            logger.error("Advisory lock lost to another worker: name=%s", name)
+            for handler in list(self._lock_lost_handlers):
+                try:
+                    handler(name)
+                except Exception:
+                    logger.exception("Lock-lost handler failed: name=%s", name)
+
+    def _on_notification(self, _conn, pg_channel: str, _pid: int, payload: str) -> None:
+        channel = pg_channel[len(_CHANNEL_PREFIX):]
+        handlers = self._handlers.get(channel)
+        if not handlers:
+            return
+        try:
+            message = json_codec.loads(payload)
+        except json_codec.JSONDecodeError:
+            logger.warning("Dropping malformed pub/sub payload on channel %s", channel)
+            return
+        if isinstance(message, dict):
+            asyncio.get_running_loop().create_task(_dispatch(handlers, message))
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        first_handler = channel not in self._handlers
+        self._handlers.setdefault(channel, []).append(handler)
+        if first_handler and self._listen_conn is not None and not self._listen_conn.is_closed():
+            asyncio.get_running_loop().create_task(
+                self._listen_conn.add_listener(self._pg_channel(channel), self._on_notification)
+            )
+
+    @staticmethod
+    def _encode(message: dict) -> str:
+        return json_codec.dumps({**message, "origin": message.get("origin") or WORKER_ID})
+
+    def payload_fits(self, message: dict) -> bool:
+        return len(self._encode(message).encode("utf-8")) <= _PG_NOTIFY_MAX_PAYLOAD_BYTES
+
+    async def publish(self, channel: str, message: dict) -> bool:
+        payload = self._encode(message)
+        if len(payload.encode("utf-8")) > _PG_NOTIFY_MAX_PAYLOAD_BYTES:
+            # Callers that may exceed the limit check payload_fits() first and publish a smaller message.
+            logger.warning("Pub/sub payload too large for NOTIFY, not fanned out: channel=%s", channel)
+            return False
+        conn = self._control_conn
+        if conn is None or conn.is_closed():
+            return False
+        async with self._control_lock:
+            try:
+                await conn.execute("SELECT pg_notify($1, $2)", self._pg_channel(channel), payload)
+            except Exception:
+                logger.warning("Pub/sub publish failed: channel=%s", channel, exc_info=True)
+                return False
+        return True
+
+    async def try_acquire_lock(self, name: str) -> bool:
+        if name in self._held_locks:
+            return True
+        conn = self._control_conn
+        if conn is None or conn.is_closed():
+            return False
+        async with self._control_lock:
+            acquired = bool(await conn.fetchval("SELECT pg_try_advisory_lock($1)", _advisory_lock_key(name)))
+        if acquired:
+            self._held_locks.add(name)
+        return acquired
+
+    async def release_lock(self, name: str) -> None:
+        self._lost_locks.discard(name)
+        if name not in self._held_locks:
+            return
+        self._held_locks.discard(name)
+        conn = self._control_conn
+        if conn is None or conn.is_closed():
+            return
+        async with self._control_lock:
+            await conn.execute("SELECT pg_advisory_unlock($1)", _advisory_lock_key(name))
+
+    def on_lock_lost(self, handler: LockLostHandler) -> None:
+        self._lock_lost_handlers.append(handler)
+
+
+# ──────────────────────────────────────────────
+# Backend Selection
+# ──────────────────────────────────────────────
+
+
+_backend: PubSubBackend | None = None
+
+
+def _create_backend() -> PubSubBackend:
+    choice = settings.pubsub_backend.strip().lower()
+    if choice == "auto":
+        choice = "postgres" if settings.database_url.startswith("postgresql") else "memory"
+    if choice == "postgres":
+        return PostgresPubSubBackend(settings.database_url)
+    if choice == "memory":
+        return InMemoryPubSubBackend()
+    raise ValueError(f"Unknown PUBSUB_BACKEND: {settings.pubsub_backend}")
+
+
+def get_pubsub_backend() -> PubSubBackend:
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+def set_pubsub_backend(backend: PubSubBackend) -> None:
+    """Swap the process-wide backend, e.g. to an InMemoryPubSubBackend in tests."""
+    global _backend
+    _backend = backend
+
+
+async def start_pubsub() -> None:
+    backend = get_pubsub_backend()
+    try:
+        await backend.start()
+    except Exception:
+        if settings.database_url.startswith("postgresql"):
+            # Workers sharing this database rely on its advisory locks; the in-memory
+            # backend grants every lock locally, so two workers could own one task.
+            logger.exception("Pub/sub backend %s failed to start, refusing to run without shared locks", backend.name)
+            raise
+        logger.exception("Pub/sub backend %s failed to start, falling back to in-memory", backend.name)
+        fallback = InMemoryPubSubBackend()
+        for channel, handlers in getattr(backend, "_handlers", {}).items():
+            for handler in handlers:
+                fallback.subscribe(channel, handler)
+        set_pubsub_backend(fallback)
+
+
+async def stop_pubsub() -> None:
+    if _backend is not None:
+        await _backend.stop()
@@ -10,15 +10,20 @@ from fastapi import HTTPException
 from sqlalchemy import select
 
 from app.api.v1.execution import ExecuteTaskRequest, execute_task
+from app.core.config import settings
+from app.core.metrics import histogram
 from app.db.session import SessionLocal
 from app.models.enums import TaskStatus
 from app.models.task import Task
+from app.services.comfyui_health_service import fetch_ports_runtime_status, is_endpoint_available
+from app.services.comfyui_object_info_service import check_workflow_compatibility
 from app.services.comfyui_settings_service import (
+    ComfyUIPortRuntimeStatus,
     ensure_allowed_endpoint,
-    fetch_ports_runtime_status,
-    get_or_create_comfyui_settings,
-    normalize_server_ip,
+    get_comfyui_settings_snapshot,
 )
+from app.services.leader_service import LeaseKeeper
+from app.services.template_service import resolve_task_workflow
 
 logger = logging.getLogger("app.scheduler")
 
@@ -26,6 +31,13 @@ _SCHEDULE_POLL_INTERVAL_SECONDS = 15.0
 _scheduler_task: asyncio.Task | None = None
 _scheduler_stop_event: asyncio.Event | None = None
 _inflight_task_ids: set[str] = set()
+# Every replica runs the loop, but only the holder of this lease fires schedules.
+_scheduler_lease = LeaseKeeper("task_scheduler")
+_dispatch_lag_seconds = histogram(
+    "scheduler_dispatch_lag_seconds",
+    "Delay between a schedule's due time and its dispatch",
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0),
+)
 
 
 @dataclass
@@ -40,6 +52,7 @@ def start_task_scheduler() -> None:
         return
     loop = asyncio.get_running_loop()
     _scheduler_stop_event = asyncio.Event()
+    _scheduler_lease.start()
     _scheduler_task = loop.create_task(_scheduler_loop(_scheduler_stop_event))
     logger.info("Task scheduler started")
 
@@ -60,6 +73,7 @@ async def stop_task_scheduler() -> None:
         await worker
     except asyncio.CancelledError:
         pass
+    await _scheduler_lease.stop()
     logger.info("Task scheduler stopped")
 
 
@@ -80,16 +94,23 @@ async def _scheduler_loop(stop_event: asyncio.Event) -> None:
 
 
 async def _run_schedule_once() -> None:
+    if not _scheduler_lease.is_leader:
+        return
     now_local = datetime.now().astimezone()
-    due_task_ids = await _collect_due_task_ids(now_local)
-    if not due_task_ids:
+    due_tasks = await _collect_due_tasks(now_local)
+    if not due_tasks:
         return
 
-    for task_id in due_task_ids:
+    for task_id, due_at in due_tasks:
+        if not _scheduler_lease.is_leader:
+            logger.warning("Scheduler lease lost mid-tick, leaving remaining tasks to the new leader")
+            return
         task_id_str = str(task_id)
         if task_id_str in _inflight_task_ids:
             continue
         _inflight_task_ids.add(task_id_str)
+        if settings.metrics_enabled:
+            _dispatch_lag_seconds.observe(max(0.0, (datetime.now(timezone.utc) - due_at).total_seconds()))
         try:
             await _trigger_scheduled_task(task_id)
         finally:
@@ -128,7 +149,7 @@ def _is_due_today(*, schedule_time: str | None, last_triggered_at: datetime | No
 def _is_due_once(*, schedule_at: datetime | None, last_triggered_at: datetime | None, now_utc: datetime) -> bool:
     if schedule_at is None:
         return False
-    target = schedule_at.replace(tzinfo=timezone.utc) if schedule_at.tzinfo is None else schedule_at.astimezone(timezone.utc)
+    target = _due_at(schedule_at)
     if now_utc < target:
         return False
     if last_triggered_at is None:
@@ -141,7 +162,12 @@ def _is_due_once(*, schedule_at: datetime | None, last_triggered_at: datetime |
     return last < target
 
 
-async def _collect_due_task_ids(now_local: datetime) -> list[UUID]:
+def _due_at(schedule_at: datetime) -> datetime:
+    return schedule_at.replace(tzinfo=timezone.utc) if schedule_at.tzinfo is None else schedule_at.astimezone(timezone.utc)
+
+
+async def _collect_due_tasks(now_local: datetime) -> list[tuple[UUID, datetime]]:
+    """Due task ids with the time each became due, for dispatch lag."""
     now_utc = now_local.astimezone(timezone.utc)
     async with SessionLocal() as session:
         stmt = select(
@@ -153,7 +179,7 @@ async def _collect_due_task_ids(now_local: datetime) -> list[UUID]:
         ).where(Task.schedule_enabled.is_(True))
         rows = (await session.execute(stmt)).all()
 
-    due: list[UUID] = []
+    due: list[tuple[UUID, datetime]] = []
     for row in rows:
         if row.status == TaskStatus.running:
             continue
@@ -162,7 +188,7 @@ async def _collect_due_task_ids(now_local: datetime) -> list[UUID]:
             last_triggered_at=row.schedule_last_triggered_at,
             now_utc=now_utc,
         ):
-            due.append(row.id)
+            due.append((row.id, _due_at(row.schedule_at)))
             continue
         if not _is_due_today(
             schedule_time=row.schedule_time,
@@ -170,33 +196,49 @@ async def _collect_due_task_ids(now_local: datetime) -> list[UUID]:
             now_local=now_local,
         ):
             continue
-        due.append(row.id)
+        # Daily schedules fire within their HH:MM minute, so the minute start is the due time.
+        due.append((row.id, now_local.replace(second=0, microsecond=0).astimezone(timezone.utc)))
     return due
 
 
-async def _select_auto_endpoint() -> ScheduledEndpoint | None:
+def _dispatch_score(item: ComfyUIPortRuntimeStatus) -> tuple:
+    # Load per unit of weight: a node with weight 2 takes twice the work of a weight 1 node.
+    load = (int(item.running_count) + int(item.pending_count) + 1) / max(float(item.weight), 1e-6)
+    latency = item.avg_latency_ms if item.avg_latency_ms is not None else float("inf")
+    return load, int(item.pending_count), latency, item.server_ip, int(item.port)
+
+
+def _has_capacity(item: ComfyUIPortRuntimeStatus) -> bool:
+    if item.max_concurrency is None:
+        return True
+    return int(item.running_count) + int(item.pending_count) < int(item.max_concurrency)
+
+
+async def _select_auto_endpoint(workflow_json: dict | None = None) -> ScheduledEndpoint | None:
     async with SessionLocal() as session:
-        server_ip, _, status_items = await fetch_ports_runtime_status(session)
+        _, _, status_items = await fetch_ports_runtime_status(session)
 
-    reachable = [item for item in status_items if item.reachable]
+    reachable = [item for item in status_items if item.reachable and is_endpoint_available(item.base_url)]
+    # Skip nodes whose cached /object_info proves a class or model is missing; unknown nodes stay eligible.
+    reachable = [item for item in reachable if check_workflow_compatibility(item.base_url, workflow_json).compatible]
     if not reachable:
         return None
-    reachable.sort(key=lambda item: (int(item.pending_count), int(item.running_count), int(item.port)))
-    selected = reachable[0]
-    return ScheduledEndpoint(server_ip=server_ip, port=int(selected.port))
+    # Prefer nodes below their max_concurrency; when every node is saturated, queue on the least loaded one.
+    candidates = [item for item in reachable if _has_capacity(item)] or reachable
+    selected = min(candidates, key=_dispatch_score)
+    return ScheduledEndpoint(server_ip=selected.server_ip, port=int(selected.port))
 
 
-async def _select_manual_endpoint(schedule_port: int | None) -> ScheduledEndpoint | None:
+async def _select_manual_endpoint(schedule_server_ip: str | None, schedule_port: int | None) -> ScheduledEndpoint | None:
     if schedule_port is None:
         return None
 
     async with SessionLocal() as session:
-        config = await get_or_create_comfyui_settings(session)
-        server_ip = normalize_server_ip(config.server_ip)
+        config = await get_comfyui_settings_snapshot(session)
         try:
             endpoint = await ensure_allowed_endpoint(
                 session,
-                server_ip=server_ip,
+                server_ip=schedule_server_ip or config.server_ip,
                 port=int(schedule_port),
             )
         except ValueError:
@@ -216,7 +258,9 @@ async def _mark_triggered(task_id: UUID) -> None:
 
 async def _trigger_scheduled_task(task_id: UUID) -> None:
     schedule_auto_dispatch = False
+    schedule_server_ip: str | None = None
     schedule_port: int | None = None
+    workflow_json: dict | None = None
     async with SessionLocal() as session:
         task = await session.get(Task, task_id)
         if not task or not task.schedule_enabled:
@@ -224,20 +268,24 @@ async def _trigger_scheduled_task(task_id: UUID) -> None:
         if task.status == TaskStatus.running:
             return
         schedule_auto_dispatch = bool(task.schedule_auto_dispatch)
+        schedule_server_ip = task.schedule_server_ip
         schedule_port = int(task.schedule_port) if task.schedule_port is not None else None
+        if schedule_auto_dispatch:
+            workflow_json, _ = await resolve_task_workflow(session, task)
 
     if schedule_auto_dispatch:
-        endpoint = await _select_auto_endpoint()
+        endpoint = await _select_auto_endpoint(workflow_json)
         if endpoint is None:
-            logger.warning("Scheduled trigger skipped: no reachable port task_id=%s", task_id)
+            logger.warning("Scheduled trigger skipped: no reachable compatible port task_id=%s", task_id)
             await _mark_triggered(task_id)
             return
     else:
-        endpoint = await _select_manual_endpoint(schedule_port)
+        endpoint = await _select_manual_endpoint(schedule_server_ip, schedule_port)
         if endpoint is None:
             logger.warning(
-                "Scheduled trigger skipped: invalid manual schedule port task_id=%s port=%s",
+                "Scheduled trigger skipped: invalid manual schedule endpoint task_id=%s server_ip=%s port=%s",
                 task_id,
+                schedule_server_ip,
                 schedule_port,
             )
             await _mark_triggered(task_id)
@@ -1,11 +1,10 @@
 from __future__ import annotations
 
-import copy
 from datetime import datetime, timezone
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import Select, delete, func, literal_column, select
+from sqlalchemy import Select, delete, func, literal_column, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -16,8 +15,13 @@ from app.models.generated_video import SubTaskGeneratedVideo
 from app.models.photo import SubTaskPhoto
 from app.models.subtask import SubTask
 from app.models.task import Task
+from app.models.task_template import TaskTemplate
 from app.schemas.task import CallbackGeneratedImageItem, CallbackGeneratedVideoItem, SubTaskCreate, SubTaskUpdate, TaskCreate, TaskPatch
+from app.services.comfyui_settings_service import normalize_server_ip
 from app.services.status import aggregate_parent_status, can_transition, ensure_transition
+from app.services.workflow_analysis_service import analyze_for_storage
+from app.services.workflow_metadata_service import compute_workflow_hash, find_task_info_node_ids
+from app.services.workflow_parameter_service import normalize_parameter_values
 
 
 def _normalize_schedule_fields(
@@ -25,11 +29,12 @@ def _normalize_schedule_fields(
     schedule_enabled: bool,
     schedule_at: datetime | None,
     schedule_time: str | None,
+    schedule_server_ip: str | None,
     schedule_port: int | None,
     schedule_auto_dispatch: bool,
-) -> tuple[bool, datetime | None, str | None, int | None, bool]:
+) -> tuple[bool, datetime | None, str | None, str | None, int | None, bool]:
     if not schedule_enabled:
-        return False, None, None, None, False
+        return False, None, None, None, None, False
 
     normalized_schedule_at: datetime | None = None
     if schedule_at is not None:
@@ -55,7 +60,7 @@ def _normalize_schedule_fields(
             ) from exc
 
     if schedule_auto_dispatch:
-        return True, normalized_schedule_at, normalized_time, None, True
+        return True, normalized_schedule_at, normalized_time, None, None, True
 
     if schedule_port is None:
         raise HTTPException(
@@ -68,13 +73,34 @@ def _normalize_schedule_fields(
             detail="schedule_port must be between 1 and 65535",
         )
 
-    return True, normalized_schedule_at, normalized_time, int(schedule_port), False
+    # An empty server_ip means "the primary host" and is resolved at trigger time.
+    normalized_server_ip: str | None = None
+    if str(schedule_server_ip or "").strip():
+        try:
+            normalized_server_ip = normalize_server_ip(str(schedule_server_ip))
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"schedule_server_ip is invalid: {exc}",
+            ) from exc
+
+    return True, normalized_schedule_at, normalized_time, normalized_server_ip, int(schedule_port), False
 
 
-def bind_task_id_to_workflow(workflow_json: dict | None, task_id: UUID) -> tuple[dict | None, bool, int]:
+def bind_task_id_to_workflow(
+    workflow_json: dict | None,
+    task_id: UUID,
+    *,
+    task_info_node_ids: tuple[str, ...] | None = None,
+) -> tuple[dict | None, bool, int]:
     """
     Inject task_id into every GetTaskInfoNode in workflow JSON.
 
+    The input is never mutated. When every node is already bound the same dict
+    is returned; otherwise the result is a shallow copy in which only the
+    rebound nodes (and their inputs) are new objects. Pass the node ids from
+    WorkflowMetadata.task_info_node_ids to skip scanning the workflow.
+
     Returns:
         (workflow_after_bind, changed, matched_node_count)
     """
@@ -83,26 +109,32 @@ def bind_task_id_to_workflow(workflow_json: dict | None, task_id: UUID) -> tuple
     if not isinstance(workflow_json, dict):
         return workflow_json, False, 0
 
-    updated = copy.deepcopy(workflow_json)
-    changed = False
-    matched_node_count = 0
+    if task_info_node_ids is None:
+        task_info_node_ids = find_task_info_node_ids(workflow_json)
     task_id_str = str(task_id)
 
-    for node in updated.values():
+    matched_node_count = 0
+    stale_node_ids = []
+    for node_id in task_info_node_ids:
+        node = workflow_json.get(node_id)
         if not isinstance(node, dict):
             continue
-        if str(node.get("class_type") or "") != "GetTaskInfoNode":
-            continue
         matched_node_count += 1
         inputs = node.get("inputs")
-        if not isinstance(inputs, dict):
-            inputs = {}
-            node["inputs"] = inputs
-        if str(inputs.get("task_id") or "") != task_id_str:
-            inputs["task_id"] = task_id_str
-            changed = True
+        if not isinstance(inputs, dict) or str(inputs.get("task_id") or "") != task_id_str:
+            stale_node_ids.append(node_id)
+    if not stale_node_ids:
+        return workflow_json, False, matched_node_count
+
+    updated = dict(workflow_json)
+    for node_id in stale_node_ids:
+        node = workflow_json[node_id]
+        inputs = node.get("inputs")
+        bound_inputs = dict(inputs) if isinstance(inputs, dict) else {}
+        bound_inputs["task_id"] = task_id_str
+        updated[node_id] = {**node, "inputs": bound_inputs}
 
-    return updated, changed, matched_node_count
+    return updated, True, matched_node_count
 
 
 def _task_detail_query(task_id: UUID) -> Select[tuple[Task]]:
@@ -117,7 +149,7 @@ def _task_detail_query(task_id: UUID) -> Select[tuple[Task]]:
     )
 
 
-def _ensure_photo_count(photo_count: int) -> None:
+def ensure_photo_count(photo_count: int) -> None:
     if photo_count > settings.max_images_per_subtask:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -156,7 +188,7 @@ async def _sync_parent_status(session: AsyncSession, task_id: UUID) -> TaskStatu
 
 
 def _build_subtask_model(task_id: UUID, item: SubTaskCreate) -> SubTask:
-    _ensure_photo_count(len(item.photos))
+    ensure_photo_count(len(item.photos))
     return SubTask(
         task_id=task_id,
         platform=item.platform,
@@ -196,10 +228,18 @@ async def _insert_subtasks(
 
 
 async def create_task(session: AsyncSession, payload: TaskCreate) -> Task:
-    schedule_enabled, schedule_at, schedule_time, schedule_port, schedule_auto_dispatch = _normalize_schedule_fields(
+    (
+        schedule_enabled,
+        schedule_at,
+        schedule_time,
+        schedule_server_ip,
+        schedule_port,
+        schedule_auto_dispatch,
+    ) = _normalize_schedule_fields(
         schedule_enabled=payload.schedule_enabled,
         schedule_at=payload.schedule_at,
         schedule_time=payload.schedule_time,
+        schedule_server_ip=payload.schedule_server_ip,
         schedule_port=payload.schedule_port,
         schedule_auto_dispatch=payload.schedule_auto_dispatch,
     )
@@ -213,12 +253,15 @@ async def create_task(session: AsyncSession, payload: TaskCreate) -> Task:
         schedule_enabled=schedule_enabled,
         schedule_at=schedule_at,
         schedule_time=schedule_time,
+        schedule_server_ip=schedule_server_ip,
         schedule_port=schedule_port,
         schedule_auto_dispatch=schedule_auto_dispatch,
     )
     session.add(task)
     await session.flush()
     task.workflow_json, _, _ = bind_task_id_to_workflow(task.workflow_json, task.id)
+    task.workflow_hash = compute_workflow_hash(task.workflow_json)
+    task.workflow_analysis = analyze_for_storage(task.workflow_json)
 
     await _insert_subtasks(session, task_id=task.id, payload_subtasks=payload.subtasks)
     await _sync_parent_status(session, task.id)
@@ -227,6 +270,22 @@ async def create_task(session: AsyncSession, payload: TaskCreate) -> Task:
     return await get_task_or_404(session, task.id)
 
 
+def _execution_progress_summary(
+    status_value: TaskStatus | None,
+    progress_percent: float | None,
+    estimated_finish_at: datetime | None,
+) -> dict:
+    """Percent and ETA from the persisted progress columns; the ETA is recomputed against now."""
+    summary: dict = {"progress_percent": progress_percent, "eta_seconds": None, "estimated_finish_at": None}
+    if status_value != TaskStatus.running or estimated_finish_at is None:
+        return summary
+    if estimated_finish_at.tzinfo is None:
+        estimated_finish_at = estimated_finish_at.replace(tzinfo=timezone.utc)
+    summary["estimated_finish_at"] = estimated_finish_at
+    summary["eta_seconds"] = round(max(0.0, (estimated_finish_at - datetime.now(timezone.utc)).total_seconds()), 1)
+    return summary
+
+
 async def list_tasks(
     session: AsyncSession,
     *,
@@ -248,19 +307,25 @@ async def list_tasks(
         Task.description,
         Task.status,
         Task.execution_state,
+        Task.progress_percent,
+        Task.estimated_finish_at,
         Task.schedule_enabled,
         Task.schedule_at,
         Task.schedule_time,
+        Task.schedule_server_ip,
         Task.schedule_port,
         Task.schedule_auto_dispatch,
         Task.schedule_last_triggered_at,
         Task.created_at,
         Task.updated_at,
         count_subtasks.label("subtask_count"),
-        Task.workflow_json.isnot(None).label("has_workflow"),
+        or_(Task.workflow_json.isnot(None), Task.template_id.isnot(None)).label("has_workflow"),
         literal_column(
             "CASE WHEN tasks.workflow_json IS NOT NULL"
             " THEN (SELECT count(*) FROM jsonb_object_keys(tasks.workflow_json))"
+            " WHEN tasks.template_id IS NOT NULL"
+            " THEN (SELECT count(*) FROM task_templates, jsonb_object_keys(task_templates.workflow_json)"
+            " WHERE task_templates.id = tasks.template_id)"
             " ELSE 0 END"
         ).label("workflow_node_count"),
     )
@@ -288,6 +353,7 @@ async def list_tasks(
             "schedule_enabled": bool(row.schedule_enabled),
             "schedule_at": row.schedule_at,
             "schedule_time": row.schedule_time,
+            "schedule_server_ip": row.schedule_server_ip,
             "schedule_port": row.schedule_port,
             "schedule_auto_dispatch": bool(row.schedule_auto_dispatch),
             "schedule_last_triggered_at": row.schedule_last_triggered_at,
@@ -296,6 +362,7 @@ async def list_tasks(
             "subtask_count": int(row.subtask_count or 0),
             "has_workflow": bool(row.has_workflow),
             "workflow_node_count": int(row.workflow_node_count or 0),
+            **_execution_progress_summary(row.status, row.progress_percent, row.estimated_finish_at),
         }
         for row in rows
     ]
@@ -331,15 +398,32 @@ async def patch_task(session: AsyncSession, task: Task, payload: TaskPatch) -> T
     if payload.workflow_json is not None:
         bound_workflow_json, _, _ = bind_task_id_to_workflow(payload.workflow_json, task.id)
         task.workflow_json = bound_workflow_json
+        task.workflow_hash = compute_workflow_hash(bound_workflow_json)
+        task.workflow_analysis = analyze_for_storage(bound_workflow_json)
         changed = True
     if payload.workflow_filename is not None:
         task.workflow_filename = payload.workflow_filename
         changed = True
+    if payload.parameter_values is not None:
+        if task.template_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="parameter_values can only be set on tasks created from a parameterized template",
+            )
+        template_parameters = await session.scalar(
+            select(TaskTemplate.parameters).where(TaskTemplate.id == task.template_id)
+        )
+        try:
+            task.parameter_values = normalize_parameter_values(payload.parameter_values, template_parameters)
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+        changed = True
 
     if (
         payload.schedule_enabled is not None
         or payload.schedule_at is not None
         or payload.schedule_time is not None
+        or payload.schedule_server_ip is not None
         or payload.schedule_port is not None
         or payload.schedule_auto_dispatch is not None
     ):
@@ -351,6 +435,9 @@ async def patch_task(session: AsyncSession, task: Task, payload: TaskPatch) -> T
         )
         next_schedule_at = payload.schedule_at if payload.schedule_at is not None else task.schedule_at
         next_schedule_time = payload.schedule_time if payload.schedule_time is not None else task.schedule_time
+        next_schedule_server_ip = (
+            payload.schedule_server_ip if payload.schedule_server_ip is not None else task.schedule_server_ip
+        )
         next_schedule_port = payload.schedule_port if payload.schedule_port is not None else task.schedule_port
         next_schedule_auto_dispatch = (
             payload.schedule_auto_dispatch
@@ -358,16 +445,25 @@ async def patch_task(session: AsyncSession, task: Task, payload: TaskPatch) -> T
             else bool(task.schedule_auto_dispatch)
         )
 
-        schedule_enabled, schedule_at, schedule_time, schedule_port, schedule_auto_dispatch = _normalize_schedule_fields(
+        (
+            schedule_enabled,
+            schedule_at,
+            schedule_time,
+            schedule_server_ip,
+            schedule_port,
+            schedule_auto_dispatch,
+        ) = _normalize_schedule_fields(
             schedule_enabled=bool(next_schedule_enabled),
             schedule_at=next_schedule_at,
             schedule_time=next_schedule_time,
+            schedule_server_ip=next_schedule_server_ip,
             schedule_port=next_schedule_port,
             schedule_auto_dispatch=bool(next_schedule_auto_dispatch),
         )
         task.schedule_enabled = schedule_enabled
         task.schedule_at = schedule_at
         task.schedule_time = schedule_time
+        task.schedule_server_ip = schedule_server_ip
         task.schedule_port = schedule_port
         task.schedule_auto_dispatch = schedule_auto_dispatch
         if not schedule_enabled:
@@ -415,7 +511,7 @@ async def patch_subtask(session: AsyncSession, subtask: SubTask, payload: SubTas
         subtask.extra = payload.extra
 
     if payload.photos is not None:
-        _ensure_photo_count(len(payload.photos))
+        ensure_photo_count(len(payload.photos))
         await session.execute(delete(SubTaskPhoto).where(SubTaskPhoto.subtask_id == subtask.id))
         if payload.photos:
             session.add_all(
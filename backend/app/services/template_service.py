@@ -1,19 +1,37 @@
 from __future__ import annotations
 
-from datetime import datetime
+import itertools
+import uuid
+from datetime import datetime, timezone
 from uuid import UUID
 
 from fastapi import HTTPException, status
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
 from app.models.enums import TaskStatus
+from app.models.photo import SubTaskPhoto
 from app.models.subtask import SubTask
 from app.models.task import Task
 from app.models.task_template import TaskTemplate
-from app.schemas.task import TaskTemplateCreate, TaskTemplateCreateTaskRequest, TaskTemplatePatch
+from app.schemas.task import (
+    SubTaskCreate,
+    TaskTemplateBulkCreateRequest,
+    TaskTemplateBulkVariation,
+    TaskTemplateCreate,
+    TaskTemplateCreateTaskRequest,
+    TaskTemplatePatch,
+)
 from app.services.status import aggregate_parent_status
-from app.services.task_service import bind_task_id_to_workflow, get_task_or_404
+from app.services.task_service import bind_task_id_to_workflow, ensure_photo_count, get_task_or_404
+from app.services.workflow_analysis_service import analyze_for_storage
+from app.services.workflow_metadata_service import compute_workflow_hash, find_task_info_node_ids
+from app.services.workflow_parameter_service import (
+    apply_parameter_values,
+    normalize_parameter_values,
+    normalize_template_parameters,
+)
 
 
 def _parse_publish_at(value: object) -> datetime | None:
@@ -32,6 +50,13 @@ def _parse_publish_at(value: object) -> datetime | None:
         return None
 
 
+def _normalize_parameters_or_400(raw: dict | None, workflow_json: dict | None) -> dict[str, dict]:
+    try:
+        return normalize_template_parameters(raw, workflow_json)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+
 async def get_template_or_404(session: AsyncSession, template_id: UUID) -> TaskTemplate:
     template = await session.scalar(select(TaskTemplate).where(TaskTemplate.id == template_id))
     if not template:
@@ -77,12 +102,16 @@ async def list_templates(
 
 
 async def create_template(session: AsyncSession, payload: TaskTemplateCreate) -> TaskTemplate:
+    raw_parameters = {name: item.model_dump(mode="json") for name, item in payload.parameters.items()}
     template = TaskTemplate(
         title=payload.title,
         description=payload.description,
         extra=payload.extra,
         subtasks=[item.model_dump(mode="json") for item in payload.subtasks],
         workflow_json=payload.workflow_json,
+        workflow_analysis=analyze_for_storage(payload.workflow_json),
+        workflow_hash=compute_workflow_hash(payload.workflow_json),
+        parameters=_normalize_parameters_or_400(raw_parameters, payload.workflow_json),
     )
     session.add(template)
     await session.commit()
@@ -105,6 +134,22 @@ async def patch_template(
         template.subtasks = [item.model_dump(mode="json") for item in payload.subtasks]
     if payload.workflow_json is not None:
         template.workflow_json = payload.workflow_json
+        template.workflow_analysis = analyze_for_storage(payload.workflow_json)
+        template.workflow_hash = compute_workflow_hash(payload.workflow_json)
+    if payload.parameters is not None or payload.workflow_json is not None:
+        raw_parameters = (
+            {name: item.model_dump(mode="json") for name, item in payload.parameters.items()}
+            if payload.parameters is not None
+            else template.parameters
+        )
+        template.parameters = _normalize_parameters_or_400(raw_parameters, template.workflow_json)
+    if payload.workflow_json is not None:
+        # Linked tasks run the template graph, so their stored fingerprint follows it.
+        await session.execute(
+            update(Task)
+            .where(Task.template_id == template.id, Task.workflow_json.is_(None))
+            .values(workflow_hash=template.workflow_hash)
+        )
 
     await session.commit()
     return await get_template_or_404(session, template.id)
@@ -114,6 +159,12 @@ async def delete_template(session: AsyncSession, template_id: UUID) -> None:
     exists = await session.scalar(select(TaskTemplate.id).where(TaskTemplate.id == template_id))
     if not exists:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task template not found")
+    linked_count = int(await session.scalar(select(func.count(Task.id)).where(Task.template_id == template_id)) or 0)
+    if linked_count:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Task template is used by {linked_count} parameterized tasks",
+        )
     await session.execute(delete(TaskTemplate).where(TaskTemplate.id == template_id))
     await session.commit()
 
@@ -124,16 +175,31 @@ async def create_task_from_template(
     template: TaskTemplate,
     payload: TaskTemplateCreateTaskRequest,
 ) -> Task:
+    try:
+        parameter_values = normalize_parameter_values(payload.parameter_values, template.parameters)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
     task = Task(
         title=payload.title if payload.title is not None else template.title,
         description=payload.description if payload.description is not None else template.description,
         status=TaskStatus.pending,
         extra=payload.extra if payload.extra is not None else (template.extra or {}),
-        workflow_json=template.workflow_json,
     )
-    session.add(task)
-    await session.flush()
-    task.workflow_json, _, _ = bind_task_id_to_workflow(task.workflow_json, task.id)
+    if template.parameters:
+        # Parameterized templates are referenced, not copied: the task keeps only its values.
+        task.template_id = template.id
+        task.parameter_values = parameter_values
+        task.workflow_hash = _template_workflow_hash(template)
+        session.add(task)
+        await session.flush()
+    else:
+        task.workflow_json = template.workflow_json
+        task.workflow_analysis = template.workflow_analysis or analyze_for_storage(template.workflow_json)
+        session.add(task)
+        await session.flush()
+        task.workflow_json, _, _ = bind_task_id_to_workflow(task.workflow_json, task.id)
+        task.workflow_hash = compute_workflow_hash(task.workflow_json)
 
     for item in template.subtasks or []:
         subtask = SubTask(
@@ -154,3 +220,205 @@ async def create_task_from_template(
 
     await session.commit()
     return await get_task_or_404(session, task.id)
+
+
+def _template_workflow_hash(template: TaskTemplate) -> str | None:
+    # Templates saved before workflow_hash existed have NULL until their next edit.
+    return template.workflow_hash or compute_workflow_hash(template.workflow_json)
+
+
+def _expand_bulk_request(payload: TaskTemplateBulkCreateRequest) -> list[tuple[TaskTemplateBulkVariation, dict, list[SubTaskCreate] | None]]:
+    variations = payload.variations or [TaskTemplateBulkVariation()]
+    matrix_names = list(payload.matrix)
+    empty_axes = [name for name in matrix_names if not payload.matrix[name]]
+    if empty_axes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Matrix axes have no values: {', '.join(empty_axes)}",
+        )
+    combos = [
+        dict(zip(matrix_names, values))
+        for values in itertools.product(*(payload.matrix[name] for name in matrix_names))
+    ]
+    subtask_sets: list[list[SubTaskCreate] | None] = list(payload.subtask_sets) or [None]
+
+    total = len(variations) * len(combos) * len(subtask_sets)
+    if total == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bulk request expands to no tasks")
+    if total > settings.max_tasks_per_bulk_request:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bulk request expands to {total} tasks, at most {settings.max_tasks_per_bulk_request} allowed",
+        )
+    return [
+        (variation, combo, subtask_set)
+        for variation, combo, subtask_set in itertools.product(variations, combos, subtask_sets)
+    ]
+
+
+def _template_subtask_rows(template: TaskTemplate) -> list[tuple[dict, list[dict]]]:
+    return [
+        (
+            {
+                "platform": item.get("platform") or "",
+                "account_name": item.get("account_name") or "",
+                "account_no": item.get("account_no") or "",
+                "publish_at": _parse_publish_at(item.get("publish_at")),
+                "extra": item.get("extra") or {},
+            },
+            [],
+        )
+        for item in template.subtasks or []
+    ]
+
+
+def _payload_subtask_rows(subtasks: list[SubTaskCreate]) -> list[tuple[dict, list[dict]]]:
+    rows = []
+    for item in subtasks:
+        ensure_photo_count(len(item.photos))
+        rows.append(
+            (
+                {
+                    "platform": item.platform,
+                    "account_name": item.account_name,
+                    "account_no": item.account_no,
+                    "publish_at": item.publish_at,
+                    "extra": item.extra,
+                },
+                [photo.model_dump() for photo in item.photos],
+            )
+        )
+    return rows
+
+
+async def create_tasks_from_template_bulk(
+    session: AsyncSession,
+    *,
+    template: TaskTemplate,
+    payload: TaskTemplateBulkCreateRequest,
+) -> list[UUID]:
+    """
+    Create every task described by the request in one transaction.
+
+    Ids are generated client-side so tasks, subtasks and photos go out as three
+    multi-row INSERTs regardless of how many tasks the matrix expands to.
+    With enqueue, tasks are scheduled for now and the scheduler leader
+    dispatches them on its next ticks.
+    """
+    expanded = _expand_bulk_request(payload)
+    linked = bool(template.parameters)
+    template_hash = _template_workflow_hash(template)
+    task_info_node_ids = find_task_info_node_ids(template.workflow_json)
+    workflow_analysis = None if linked else (template.workflow_analysis or analyze_for_storage(template.workflow_json))
+    default_subtask_rows = _template_subtask_rows(template)
+    subtask_rows_cache: dict[int, list[tuple[dict, list[dict]]]] = {}
+    now = datetime.now(timezone.utc)
+
+    task_rows: list[dict] = []
+    subtask_rows: list[dict] = []
+    photo_rows: list[dict] = []
+    for index, (variation, combo, subtask_set) in enumerate(expanded, start=1):
+        try:
+            parameter_values = normalize_parameter_values(
+                {**variation.parameter_values, **combo},
+                template.parameters,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+
+        task_id = uuid.uuid4()
+        if variation.title is not None:
+            title = variation.title
+        else:
+            title = template.title if len(expanded) == 1 else f"{template.title} #{index}"
+        task_row = {
+            "id": task_id,
+            "title": title[:200],
+            "description": variation.description if variation.description is not None else template.description,
+            "extra": variation.extra if variation.extra is not None else (template.extra or {}),
+            "status": TaskStatus.pending,
+            "workflow_hash": template_hash,
+            "schedule_enabled": payload.enqueue,
+            "schedule_at": now if payload.enqueue else None,
+            "schedule_auto_dispatch": True,
+        }
+        if linked:
+            task_row["template_id"] = template.id
+            task_row["parameter_values"] = parameter_values
+        else:
+            task_row["workflow_json"], _, _ = bind_task_id_to_workflow(
+                template.workflow_json,
+                task_id,
+                task_info_node_ids=task_info_node_ids,
+            )
+            task_row["parameter_values"] = {}
+            task_row["workflow_analysis"] = workflow_analysis
+        task_rows.append(task_row)
+
+        source = subtask_set if subtask_set is not None else variation.subtasks
+        if source is None:
+            rows = default_subtask_rows
+        else:
+            rows = subtask_rows_cache.get(id(source))
+            if rows is None:
+                rows = subtask_rows_cache[id(source)] = _payload_subtask_rows(source)
+        for subtask_fields, photos in rows:
+            subtask_id = uuid.uuid4()
+            subtask_rows.append(
+                {
+                    **subtask_fields,
+                    "id": subtask_id,
+                    "task_id": task_id,
+                    "status": TaskStatus.pending,
+                    "result": {},
+                }
+            )
+            photo_rows.extend({**photo, "id": uuid.uuid4(), "subtask_id": subtask_id} for photo in photos)
+
+    # New subtasks are all pending, so the aggregated parent status is pending too.
+    await session.execute(insert(Task), task_rows)
+    if subtask_rows:
+        await session.execute(insert(SubTask), subtask_rows)
+    if photo_rows:
+        await session.execute(insert(SubTaskPhoto), photo_rows)
+    await session.commit()
+    return [row["id"] for row in task_rows]
+
+
+async def resolve_task_workflow(session: AsyncSession, task: Task) -> tuple[dict | None, str | None]:
+    """
+    The workflow a task runs and its fingerprint.
+
+    Tasks with their own workflow_json run it as stored. Tasks linked to a
+    parameterized template get the template workflow with their parameter
+    values applied; the fingerprint is the template's stored one, since
+    parameters only change input values and not the graph.
+    """
+    if task.workflow_json is not None or task.template_id is None:
+        return task.workflow_json, task.workflow_hash
+
+    row = (
+        await session.execute(
+            select(TaskTemplate.workflow_json, TaskTemplate.parameters, TaskTemplate.workflow_hash).where(
+                TaskTemplate.id == task.template_id
+            )
+        )
+    ).first()
+    if row is None:
+        return None, None
+    assembled = apply_parameter_values(row.workflow_json, row.parameters, task.parameter_values)
+    return assembled, row.workflow_hash or compute_workflow_hash(row.workflow_json)
+
+
+async def resolve_task_workflow_analysis(session: AsyncSession, task: Task) -> dict | None:
+    """
+    The stored analysis of the graph a task runs, if any.
+
+    Linked tasks share their template's analysis: like the fingerprint, it
+    stays valid because parameter values never change the graph.
+    """
+    if task.workflow_json is not None or task.template_id is None:
+        return task.workflow_analysis
+    return (
+        await session.execute(select(TaskTemplate.workflow_analysis).where(TaskTemplate.id == task.template_id))
+    ).scalar_one_or_none()
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Collection
+from dataclasses import asdict, dataclass, field
+
+# Class types that write results even when another node consumes them; used
+# to find outputs when no /object_info snapshot is available.
+_KNOWN_OUTPUT_CLASS_TYPES = frozenset(
+    {
+        "SaveImage",
+        "PreviewImage",
+        "SaveAnimatedWEBP",
+        "SaveAnimatedPNG",
+        "SaveVideo",
+        "VHS_VideoCombine",
+    }
+)
+
+ANALYSIS_VERSION = 1
+
+
+# ──────────────────────────────────────────────
+# Data Classes
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class WorkflowAnalysis:
+    """Result of the static pass over an API-format workflow graph."""
+
+    version: int = ANALYSIS_VERSION
+    valid: bool = True
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    node_count: int = 0
+    link_count: int = 0
+    output_node_ids: list[str] = field(default_factory=list)
+    topological_order: list[str] = field(default_factory=list)
+    node_depths: dict[str, int] = field(default_factory=dict)
+    max_depth: int = 0
+    class_types: list[str] = field(default_factory=list)
+    unknown_class_types: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _is_link(value: object) -> bool:
+    # API format encodes an edge as [source_node_id, output_index].
+    return (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], (str, int))
+        and not isinstance(value[0], bool)
+        and isinstance(value[1], int)
+        and not isinstance(value[1], bool)
+    )
+
+
+# ──────────────────────────────────────────────
+# Analysis
+# ──────────────────────────────────────────────
+
+
+def analyze_workflow(
+    workflow_json: dict | None,
+    *,
+    known_class_types: Collection[str] | None = None,
+    output_class_types: Collection[str] | None = None,
+) -> WorkflowAnalysis:
+    """
+    Resolve links, detect cycles, find outputs and compute a topological order
+    with per-node depth (longest path from a source) in one O(nodes + links) pass.
+
+    When known_class_types is given (from an /object_info snapshot), class
+    types outside it are errors; otherwise the class check is skipped.
+    """
+    analysis = WorkflowAnalysis()
+    if not isinstance(workflow_json, dict):
+        analysis.valid = False
+        analysis.errors.append("Workflow JSON must be an object (ComfyUI API format)")
+        return analysis
+    if not workflow_json:
+        analysis.valid = False
+        analysis.errors.append("Workflow has no nodes")
+        return analysis
+
+    node_ids = [str(node_id) for node_id in workflow_json]
+    node_id_set = set(node_ids)
+    analysis.node_count = len(node_ids)
+    # Insertion-ordered dicts used as sets keep the topological order deterministic.
+    upstream: dict[str, dict[str, None]] = {node_id: {} for node_id in node_ids}
+    downstream: dict[str, dict[str, None]] = {node_id: {} for node_id in node_ids}
+    class_type_by_node: dict[str, str] = {}
+
+    for raw_node_id, node in workflow_json.items():
+        node_id = str(raw_node_id)
+        if not isinstance(node, dict):
+            analysis.errors.append(f"Node {node_id}: expected an object")
+            continue
+        class_type = str(node.get("class_type") or "").strip()
+        if not class_type:
+            analysis.errors.append(f"Node {node_id}: missing class_type")
+        class_type_by_node[node_id] = class_type
+
+        inputs = node.get("inputs")
+        if inputs is None:
+            continue
+        if not isinstance(inputs, dict):
+            analysis.errors.append(f"Node {node_id}: inputs must be an object")
+            continue
+        for input_name, value in inputs.items():
+            if not _is_link(value):
+                continue
+            source_id = str(value[0])
+            if source_id not in node_id_set:
+                analysis.errors.append(f"Node {node_id}: input {input_name} links to missing node {source_id}")
+                continue
+            analysis.link_count += 1
+            upstream[node_id][source_id] = None
+            downstream[source_id][node_id] = None
+
+    # Kahn's algorithm; depth is the longest path from any source.
+    in_degree = {node_id: len(upstream[node_id]) for node_id in node_ids}
+    depths = {node_id: 0 for node_id in node_ids}
+    ready = deque(node_id for node_id in node_ids if in_degree[node_id] == 0)
+    order: list[str] = []
+    while ready:
+        node_id = ready.popleft()
+        order.append(node_id)
+        for target in downstream[node_id]:
+            depths[target] = max(depths[target], depths[node_id] + 1)
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                ready.append(target)
+
+    if len(order) < len(node_ids):
+        cyclic = sorted(node_id for node_id in node_ids if in_degree[node_id] > 0)
+        # Includes nodes downstream of the cycle, which can never become ready either.
+        analysis.errors.append(f"Workflow contains a cycle; unresolvable nodes: {', '.join(cyclic[:20])}")
+    else:
+        analysis.topological_order = order
+        analysis.node_depths = depths
+        analysis.max_depth = max(depths.values(), default=0)
+
+    output_types = frozenset(output_class_types) if output_class_types is not None else _KNOWN_OUTPUT_CLASS_TYPES
+    analysis.output_node_ids = [
+        node_id
+        for node_id in node_ids
+        if class_type_by_node.get(node_id) in output_types
+        or (output_class_types is None and not downstream[node_id] and node_id in class_type_by_node)
+    ]
+    if not analysis.output_node_ids:
+        analysis.warnings.append("Workflow has no output nodes")
+
+    analysis.class_types = sorted({class_type for class_type in class_type_by_node.values() if class_type})
+    if known_class_types is not None:
+        known = known_class_types if isinstance(known_class_types, (set, frozenset)) else set(known_class_types)
+        analysis.unknown_class_types = [class_type for class_type in analysis.class_types if class_type not in known]
+        if analysis.unknown_class_types:
+            analysis.errors.append(
+                f"Node classes not installed on ComfyUI: {', '.join(analysis.unknown_class_types)}"
+            )
+
+    analysis.valid = not analysis.errors
+    return analysis
+
+
+def find_unknown_class_types(class_types: Collection[str], known_class_types: Collection[str]) -> list[str]:
+    """Class check against an /object_info snapshot using the class list of a stored analysis, without re-walking the graph."""
+    return [class_type for class_type in class_types if class_type not in known_class_types]
+
+
+def analysis_errors_summary(analysis: WorkflowAnalysis | dict, *, limit: int = 5) -> str:
+    errors = analysis.errors if isinstance(analysis, WorkflowAnalysis) else list(analysis.get("errors") or [])
+    summary = "; ".join(errors[:limit])
+    if len(errors) > limit:
+        summary += f"; and {len(errors) - limit} more"
+    return summary
+
+
+def analyze_for_storage(workflow_json: dict | None) -> dict | None:
+    """Structural analysis persisted next to a workflow; class availability is checked per endpoint at execute."""
+    if workflow_json is None:
+        return None
+    return analyze_workflow(workflow_json).to_dict()
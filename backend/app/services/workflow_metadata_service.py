@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.metrics import gauge
+
+logger = logging.getLogger("app.workflow_metadata")
+
+TASK_INFO_NODE_CLASS = "GetTaskInfoNode"
+
+
+# ──────────────────────────────────────────────
+# Data Classes
+# ──────────────────────────────────────────────
+
+
+@dataclass(frozen=True)
+class WorkflowMetadata:
+    """
+    Derived, read-only view of a workflow. Instances are shared through the
+    cache, so callers must not mutate node_map or class_type_counts.
+    """
+
+    workflow_hash: str
+    node_map: dict[str, dict[str, str]]
+    node_count: int
+    class_type_counts: dict[str, int]
+    task_info_node_ids: tuple[str, ...]
+    approx_bytes: int
+
+
+# ──────────────────────────────────────────────
+# Fingerprint
+# ──────────────────────────────────────────────
+
+
+def _without_bound_task_id(workflow_json: dict) -> dict:
+    """Drop the per-task id that bind_task_id_to_workflow injects, so tasks sharing a workflow share a hash."""
+    normalized = dict(workflow_json)
+    for node_id, node in workflow_json.items():
+        if not isinstance(node, dict) or str(node.get("class_type") or "") != TASK_INFO_NODE_CLASS:
+            continue
+        inputs = node.get("inputs")
+        if isinstance(inputs, dict) and "task_id" in inputs:
+            normalized[node_id] = {**node, "inputs": {k: v for k, v in inputs.items() if k != "task_id"}}
+    return normalized
+
+
+def find_task_info_node_ids(workflow_json: dict | None) -> tuple[str, ...]:
+    if not isinstance(workflow_json, dict):
+        return ()
+    return tuple(
+        node_id
+        for node_id, node in workflow_json.items()
+        if isinstance(node, dict) and str(node.get("class_type") or "") == TASK_INFO_NODE_CLASS
+    )
+
+
+def compute_workflow_hash(workflow_json: dict | None) -> str | None:
+    """Stable sha256 fingerprint of a workflow; key order and the bound task_id do not affect it."""
+    if not isinstance(workflow_json, dict):
+        return None
+    canonical = json.dumps(
+        _without_bound_task_id(workflow_json),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# ──────────────────────────────────────────────
+# Derivation
+# ──────────────────────────────────────────────
+
+
+def build_workflow_metadata(workflow_json: dict | None, *, workflow_hash: str | None = None) -> WorkflowMetadata:
+    node_map: dict[str, dict[str, str]] = {}
+    class_type_counts: Counter[str] = Counter()
+    task_info_node_ids: list[str] = []
+    approx_bytes = 0
+    if isinstance(workflow_json, dict):
+        for raw_node_id, raw_node in workflow_json.items():
+            node_id = str(raw_node_id)
+            if not isinstance(raw_node, dict):
+                node_map[node_id] = {"title": "", "class_type": ""}
+                approx_bytes += len(node_id)
+                continue
+            meta = raw_node.get("_meta") or {}
+            title = str((meta.get("title", "") if isinstance(meta, dict) else "") or "")
+            class_type = str(raw_node.get("class_type", "") or "")
+            node_map[node_id] = {"title": title, "class_type": class_type}
+            class_type_counts[class_type] += 1
+            if class_type == TASK_INFO_NODE_CLASS:
+                task_info_node_ids.append(raw_node_id)
+            approx_bytes += len(node_id) + len(title) + len(class_type)
+    # Rough per-node overhead of the two small dicts and their keys.
+    approx_bytes += len(node_map) * 400
+    return WorkflowMetadata(
+        workflow_hash=workflow_hash or compute_workflow_hash(workflow_json) or "",
+        node_map=node_map,
+        node_count=len(node_map),
+        class_type_counts=dict(class_type_counts),
+        task_info_node_ids=tuple(task_info_node_ids),
+        approx_bytes=approx_bytes,
+    )
+
+
+# ──────────────────────────────────────────────
+# LRU Cache
+# ──────────────────────────────────────────────
+
+
+# Bounded by both entry count and approximate size; accessed from the event loop
+# and from threadpool routes, hence the lock.
+_cache: OrderedDict[str, WorkflowMetadata] = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_hits = 0
+_misses = 0
+_evictions = 0
+
+gauge("workflow_metadata_cache_entries", "Workflows in the metadata cache").set_function(lambda: len(_cache))
+gauge("workflow_metadata_cache_bytes", "Approximate size of the workflow metadata cache").set_function(
+    lambda: _cache_bytes
+)
+gauge("workflow_metadata_cache_hits", "Workflow metadata cache hits since start").set_function(lambda: _hits)
+gauge("workflow_metadata_cache_misses", "Workflow metadata cache misses since start").set_function(lambda: _misses)
+gauge("workflow_metadata_cache_evictions", "Workflow metadata cache evictions since start").set_function(
+    lambda: _evictions
+)
+
+
+def cache_workflow_metadata(metadata: WorkflowMetadata) -> None:
+    global _cache_bytes, _evictions
+    if not metadata.workflow_hash or metadata.approx_bytes > settings.workflow_metadata_cache_max_bytes:
+        return
+    with _cache_lock:
+        previous = _cache.pop(metadata.workflow_hash, None)
+        if previous is not None:
+            _cache_bytes -= previous.approx_bytes
+        _cache[metadata.workflow_hash] = metadata
+        _cache_bytes += metadata.approx_bytes
+        while _cache and (
+            len(_cache) > settings.workflow_metadata_cache_max_entries
+            or _cache_bytes > settings.workflow_metadata_cache_max_bytes
+        ):
+            evicted_hash, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.approx_bytes
+            _evictions += 1
+            logger.debug("Workflow metadata evicted: hash=%s nodes=%s", evicted_hash[:12], evicted.node_count)
+
+
+def get_cached_workflow_metadata(workflow_hash: str | None) -> WorkflowMetadata | None:
+    """Lookup by stored fingerprint only; lets callers skip loading the workflow JSON on a hit."""
+    global _hits, _misses
+    if not workflow_hash:
+        return None
+    with _cache_lock:
+        metadata = _cache.get(workflow_hash)
+        if metadata is None:
+            _misses += 1
+            return None
+        _cache.move_to_end(workflow_hash)
+        _hits += 1
+        return metadata
+
+
+def get_workflow_metadata(workflow_json: dict | None, *, workflow_hash: str | None = None) -> WorkflowMetadata:
+    """
+    Metadata for a workflow, walking the graph only on a cache miss.
+    Pass the stored workflow_hash when known to skip hashing as well.
+    """
+    if not isinstance(workflow_json, dict):
+        return build_workflow_metadata(None, workflow_hash="")
+    resolved_hash = workflow_hash or compute_workflow_hash(workflow_json)
+    cached = get_cached_workflow_metadata(resolved_hash)
+    if cached is not None:
+        return cached
+    metadata = build_workflow_metadata(workflow_json, workflow_hash=resolved_hash)
+    cache_workflow_metadata(metadata)
+    return metadata
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from typing import Any
+
+# A template parameter maps a name to one workflow input:
+#   {"seed": {"node_id": "3", "input_name": "seed", "default": 42}}
+# Tasks created from a parameterized template store only {"seed": 7}; the
+# submit payload is assembled from the template workflow at execute time.
+
+
+def _ensure_scalar_value(name: str, value: Any) -> None:
+    # In the API format a list input is a link, [source_node_id, output_index], not a value.
+    if isinstance(value, (list, tuple)):
+        raise ValueError(f"parameter {name}: list values are not allowed, ComfyUI would read them as node links")
+
+
+def normalize_template_parameters(raw: dict | None, workflow_json: dict | None) -> dict[str, dict]:
+    """Validate a template's parameter declarations against its workflow. Raises ValueError."""
+    if not raw:
+        return {}
+    if not isinstance(raw, dict):
+        raise ValueError("parameters must be an object keyed by parameter name")
+
+    normalized: dict[str, dict] = {}
+    for raw_name, raw_spec in raw.items():
+        name = str(raw_name or "").strip()
+        if not name:
+            raise ValueError("parameter name must not be empty")
+        if not isinstance(raw_spec, dict):
+            raise ValueError(f"parameter {name}: expected an object with node_id and input_name")
+        node_id = str(raw_spec.get("node_id") or "").strip()
+        input_name = str(raw_spec.get("input_name") or "").strip()
+        if not node_id or not input_name:
+            raise ValueError(f"parameter {name}: node_id and input_name are required")
+        if isinstance(workflow_json, dict):
+            node = workflow_json.get(node_id)
+            if not isinstance(node, dict):
+                raise ValueError(f"parameter {name}: node {node_id} does not exist in workflow")
+        spec: dict[str, Any] = {"node_id": node_id, "input_name": input_name}
+        if "default" in raw_spec and raw_spec["default"] is not None:
+            _ensure_scalar_value(name, raw_spec["default"])
+            spec["default"] = raw_spec["default"]
+        description = str(raw_spec.get("description") or "").strip()
+        if description:
+            spec["description"] = description
+        normalized[name] = spec
+    return normalized
+
+
+def normalize_parameter_values(values: dict | None, parameters: dict[str, dict] | None) -> dict[str, Any]:
+    """Reject values for parameters the template does not declare. Raises ValueError."""
+    if not values:
+        return {}
+    if not isinstance(values, dict):
+        raise ValueError("parameter_values must be an object keyed by parameter name")
+    declared = parameters or {}
+    unknown = sorted(str(name) for name in values if name not in declared)
+    if unknown:
+        raise ValueError(f"Unknown template parameters: {', '.join(unknown)}")
+    for name, value in values.items():
+        _ensure_scalar_value(str(name), value)
+    return {str(name): value for name, value in values.items() if value is not None}
+
+
+def apply_parameter_values(
+    workflow_json: dict | None,
+    parameters: dict[str, dict] | None,
+    values: dict[str, Any] | None,
+) -> dict | None:
+    """
+    Build the submit payload from a template workflow plus per-task values.
+
+    Unset parameters fall back to their declared default, or keep the value in
+    the workflow. The template workflow is not mutated: the result is a shallow
+    copy with only the overridden nodes and their inputs rebuilt.
+    """
+    if not isinstance(workflow_json, dict) or not parameters:
+        return workflow_json
+
+    overrides: dict[str, dict[str, Any]] = {}
+    for name, spec in parameters.items():
+        if values and name in values:
+            value = values[name]
+        elif "default" in spec:
+            value = spec["default"]
+        else:
+            continue
+        overrides.setdefault(str(spec["node_id"]), {})[str(spec["input_name"])] = value
+
+    if not overrides:
+        return workflow_json
+
+    assembled = dict(workflow_json)
+    for node_id, node_inputs in overrides.items():
+        node = workflow_json.get(node_id)
+        if not isinstance(node, dict):
+            continue
+        inputs = node.get("inputs")
+        assembled[node_id] = {**node, "inputs": {**(inputs if isinstance(inputs, dict) else {}), **node_inputs}}
+    return assembled
@@ -0,0 +1,268 @@
+"""
+Microbenchmarks for pure functions on hot paths, with stored baselines.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_hot_paths              # compare against baselines.json
+    python -m benchmarks.bench_hot_paths --save       # record new baselines
+    python -m benchmarks.bench_hot_paths -k state     # only cases whose name contains "state"
+
+Baselines are per machine: record them on the machine that runs the comparison.
+A case fails when it is slower than its baseline by more than --tolerance; the
+exit status is 1 when any case fails.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.api.v1.execution import _deserialize_execution_state, _new_execution_state, _serialize_execution_state
+from app.models import SubTask, SubTaskGeneratedImage, SubTaskPhoto, Task
+from app.models.enums import PhotoSourceType, TaskStatus
+from app.models.generated_video import SubTaskGeneratedVideo
+from app.schemas.task import TaskRead
+from app.services.comfyui_service import _parse_comfy_message, _peek_comfy_frame
+from app.services.status import aggregate_parent_status
+from app.services.task_service import bind_task_id_to_workflow
+from app.services.upload_service import _find_first_str
+from app.services.workflow_metadata_service import build_workflow_metadata
+from benchmarks.bench_workflow_binding import build_workflow
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+REPEAT = 5
+MIN_RUN_SECONDS = 0.2
+EVENT_LOG_ENTRIES = 300
+SUBTASKS_PER_TASK = 50
+IMAGES_PER_SUBTASK = 4
+
+
+# ──────────────────────────────────────────────
+# Fixtures
+# ──────────────────────────────────────────────
+
+
+def build_comfy_messages() -> list[dict]:
+    prompt_id = str(uuid.uuid4())
+    return [
+        {"type": "status", "data": {"status": {"exec_info": {"queue_remaining": 3}}}},
+        {"type": "execution_start", "data": {"prompt_id": prompt_id, "timestamp": 1700000000000}},
+        {"type": "execution_cached", "data": {"prompt_id": prompt_id, "nodes": [str(i) for i in range(40)]}},
+        {"type": "executing", "data": {"node": "51", "prompt_id": prompt_id}},
+        {"type": "progress", "data": {"value": 12, "max": 30, "prompt_id": prompt_id, "node": "51"}},
+        {
+            "type": "executed",
+            "data": {
+                "node": "99",
+                "prompt_id": prompt_id,
+                "output": {"images": [{"filename": f"out_{i}.png", "subfolder": "", "type": "output"} for i in range(4)]},
+            },
+        },
+        {"type": "crystools.monitor", "data": {"cpu_utilization": 12.5}},
+    ]
+
+
+def build_execution_state(node_map: dict) -> dict:
+    state = _new_execution_state(str(uuid.uuid4()), status_value=TaskStatus.running.value)
+    state["_node_map"] = node_map
+    state["prompt_id"] = str(uuid.uuid4())
+    state["prompt_ids"] = [state["prompt_id"]]
+    state["event_log"] = [
+        {"time": "12:00:00", "message": f"执行节点: #{index} Sampler {index} (KSampler)", "type": "info"}
+        for index in range(EVENT_LOG_ENTRIES)
+    ]
+    state["progress"] = {"node_id": "51", "node_title": "Sampler 51", "node_class_type": "KSampler", "value": 12, "max": 30}
+    return state
+
+
+def build_upload_response() -> dict:
+    return {
+        "code": 0,
+        "msg": "ok",
+        "request_id": uuid.uuid4().hex,
+        "meta": {"server": "edge-3", "elapsed_ms": 42, "quota": {"used": 1200, "limit": 100000}},
+        "data": {
+            "files": [
+                {
+                    "name": "upload.png",
+                    "size": 482133,
+                    "mime": "image/png",
+                    "storage": {"bucket": "images", "region": "us-east-1", "object_key": "u/2026/10/upload.png"},
+                    "url": "https://cdn.example.invalid/u/2026/10/upload.png",
+                }
+            ]
+        },
+    }
+
+
+def build_task_graph() -> Task:
+    now = datetime.now(timezone.utc)
+    task = Task(
+        id=uuid.uuid4(),
+        title="benchmark task",
+        description="task with a full set of subtasks",
+        status=TaskStatus.running,
+        comfy_message="Execution requested",
+        extra={"campaign": "benchmark", "tags": ["a", "b", "c"]},
+        workflow_json=None,
+        parameter_values={},
+        schedule_enabled=False,
+        schedule_auto_dispatch=True,
+        created_at=now,
+        updated_at=now,
+    )
+    for index in range(SUBTASKS_PER_TASK):
+        subtask = SubTask(
+            id=uuid.uuid4(),
+            task_id=task.id,
+            platform="tiktok",
+            account_name=f"account-{index}",
+            account_no=f"no-{index}",
+            status=TaskStatus.success,
+            result={"post_id": f"p{index}"},
+            extra={"locale": "en"},
+            created_at=now,
+            updated_at=now,
+        )
+        subtask.photos = [
+            SubTaskPhoto(
+                id=uuid.uuid4(),
+                source_type=PhotoSourceType.img_url,
+                url=f"https://cdn.example.invalid/in/{index}/{number}.png",
+                sort_order=number,
+                created_at=now,
+            )
+            for number in range(2)
+        ]
+        subtask.generated_images = [
+            SubTaskGeneratedImage(
+                id=uuid.uuid4(),
+                url=f"https://cdn.example.invalid/out/{index}/{number}.png",
+                sort_order=number,
+                extra={},
+                created_at=now,
+            )
+            for number in range(IMAGES_PER_SUBTASK)
+        ]
+        subtask.generated_videos = [
+            SubTaskGeneratedVideo(
+                id=uuid.uuid4(),
+                url=f"https://cdn.example.invalid/out/{index}.mp4",
+                sort_order=0,
+                extra={},
+                created_at=now,
+            )
+        ]
+        task.subtasks.append(subtask)
+    return task
+
+
+def build_cases() -> dict[str, Callable[[], object]]:
+    messages = build_comfy_messages()
+    frames = [json.dumps(message) for message in messages]
+    workflow = build_workflow()
+    task_id = uuid.uuid4()
+    bound_workflow, _, _ = bind_task_id_to_workflow(workflow, task_id)
+    metadata = build_workflow_metadata(workflow, workflow_hash="benchmark")
+    state = build_execution_state(metadata.node_map)
+    serialized_state = _serialize_execution_state(state)
+    mixed_statuses = [TaskStatus.success] * (SUBTASKS_PER_TASK - 1) + [TaskStatus.pending]
+    upload_response = build_upload_response()
+    task = build_task_graph()
+
+    def parse_messages() -> None:
+        for message in messages:
+            _parse_comfy_message(message)
+
+    def peek_frames() -> None:
+        for frame in frames:
+            _peek_comfy_frame(frame)
+
+    return {
+        "parse_comfy_message x7": parse_messages,
+        "peek_comfy_frame x7": peek_frames,
+        "build_workflow_metadata 500 nodes": lambda: build_workflow_metadata(workflow, workflow_hash="benchmark"),
+        "bind_task_id first bind": lambda: bind_task_id_to_workflow(workflow, task_id),
+        "bind_task_id already bound": lambda: bind_task_id_to_workflow(bound_workflow, task_id),
+        "serialize_execution_state 300 log": lambda: _serialize_execution_state(state),
+        "deserialize_execution_state 300 log": lambda: _deserialize_execution_state(serialized_state),
+        "aggregate_parent_status 50 subtasks": lambda: aggregate_parent_status(mixed_statuses),
+        "find_first_str url": lambda: _find_first_str(upload_response, {"url", "image_url", "file_url", "data", "src"}),
+        "find_first_str object_key": lambda: _find_first_str(upload_response, {"object_key", "key", "path"}),
+        "TaskRead.model_validate 50 subtasks": lambda: TaskRead.model_validate(task),
+    }
+
+
+# ──────────────────────────────────────────────
+# Runner
+# ──────────────────────────────────────────────
+
+
+def measure_us(stmt: Callable[[], object]) -> float:
+    """Best per-call time over REPEAT runs, each long enough to dwarf timer overhead."""
+    timer = timeit.Timer(stmt)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * MIN_RUN_SECONDS / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number * 1e6
+
+
+def _load_baselines() -> dict[str, float]:
+    if not BASELINE_PATH.exists():
+        return {}
+    return json.loads(BASELINE_PATH.read_text(encoding="utf-8")).get("results_us", {})
+
+
+def _save_baselines(results: dict[str, float]) -> None:
+    existing = _load_baselines()
+    existing.update({name: round(value, 3) for name, value in results.items()})
+    payload = {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "results_us": dict(sorted(existing.items())),
+    }
+    BASELINE_PATH.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this text")
+    parser.add_argument("--save", action="store_true", help="store results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    cases = {name: stmt for name, stmt in build_cases().items() if args.filter in name}
+    baselines = {} if args.save else _load_baselines()
+    results: dict[str, float] = {}
+    regressions: list[str] = []
+    for name, stmt in cases.items():
+        value = measure_us(stmt)
+        results[name] = value
+        baseline = baselines.get(name)
+        if baseline:
+            change = value / baseline - 1
+            verdict = "REGRESSED" if change > args.tolerance else "ok"
+            if verdict == "REGRESSED":
+                regressions.append(name)
+            print(f"  {name:<40} {value:12.2f} us   baseline {baseline:12.2f} us   {change:+7.1%}  {verdict}")
+        else:
+            print(f"  {name:<40} {value:12.2f} us")
+
+    if args.save:
+        _save_baselines(results)
+        print(f"Baselines written to {BASELINE_PATH}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+GetTaskInfoNode binding on a 500-node workflow: the old deepcopy binder
+against the overlay binder in app.services.task_service.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_workflow_binding
+"""
+
+from __future__ import annotations
+
+import base64
+import copy
+import os
+import timeit
+import uuid
+
+from app.services.task_service import bind_task_id_to_workflow
+from app.services.workflow_metadata_service import find_task_info_node_ids
+
+NODE_COUNT = 500
+TASK_INFO_NODE_EVERY = 50
+PROMPT_CHARS = 4000
+INLINE_IMAGE_BYTES = 64 * 1024
+REPEAT = 5
+NUMBER = 20
+
+
+def build_workflow() -> dict:
+    inline_image = base64.b64encode(os.urandom(INLINE_IMAGE_BYTES)).decode("ascii")
+    workflow: dict[str, dict] = {}
+    for index in range(NODE_COUNT):
+        node_id = str(index + 1)
+        if index % TASK_INFO_NODE_EVERY == 0:
+            workflow[node_id] = {
+                "class_type": "GetTaskInfoNode",
+                "inputs": {"task_id": ""},
+                "_meta": {"title": f"Task Info {index}"},
+            }
+            continue
+        inputs: dict = {
+            "seed": index,
+            "steps": 30,
+            "cfg": 7.5,
+            "model": [str(max(1, index)), 0],
+            "text": ("a very long embedded prompt " * (PROMPT_CHARS // 28))[:PROMPT_CHARS],
+        }
+        if index % 100 == 1:
+            inputs["image"] = inline_image
+        workflow[node_id] = {
+            "class_type": "KSampler",
+            "inputs": inputs,
+            "_meta": {"title": f"Sampler {index}"},
+        }
+    return workflow
+
+
+def legacy_bind(workflow_json: dict, task_id: uuid.UUID) -> tuple[dict, bool, int]:
+    updated = copy.deepcopy(workflow_json)
+    changed = False
+    matched_node_count = 0
+    task_id_str = str(task_id)
+    for node in updated.values():
+        if not isinstance(node, dict) or str(node.get("class_type") or "") != "GetTaskInfoNode":
+            continue
+        matched_node_count += 1
+        inputs = node.setdefault("inputs", {})
+        if str(inputs.get("task_id") or "") != task_id_str:
+            inputs["task_id"] = task_id_str
+            changed = True
+    return updated, changed, matched_node_count
+
+
+def _best_ms(stmt) -> float:
+    return min(timeit.repeat(stmt, repeat=REPEAT, number=NUMBER)) / NUMBER * 1000
+
+
+def main() -> None:
+    workflow = build_workflow()
+    task_id = uuid.uuid4()
+    bound, _, _ = bind_task_id_to_workflow(workflow, task_id)
+    node_ids = find_task_info_node_ids(workflow)
+
+    assert legacy_bind(workflow, task_id)[0] == bind_task_id_to_workflow(workflow, task_id)[0]
+
+    cases = [
+        ("legacy deepcopy, first bind", lambda: legacy_bind(workflow, task_id)),
+        ("overlay, first bind", lambda: bind_task_id_to_workflow(workflow, task_id)),
+        ("overlay, first bind, cached node ids", lambda: bind_task_id_to_workflow(workflow, task_id, task_info_node_ids=node_ids)),
+        ("legacy deepcopy, already bound", lambda: legacy_bind(bound, task_id)),
+        ("overlay, already bound", lambda: bind_task_id_to_workflow(bound, task_id)),
+        ("overlay, already bound, cached node ids", lambda: bind_task_id_to_workflow(bound, task_id, task_info_node_ids=node_ids)),
+    ]
+    print(f"{NODE_COUNT} nodes, {len(node_ids)} GetTaskInfoNode, best of {REPEAT}x{NUMBER}")
+    for label, stmt in cases:
+        print(f"  {label:<42} {_best_ms(stmt):9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
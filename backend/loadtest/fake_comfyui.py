@@ -0,0 +1,421 @@
+"""
+Fake ComfyUI server for load tests.
+
+Implements the parts of the ComfyUI API the backend talks to: POST /api/prompt,
+GET/POST /queue, POST /interrupt, GET /history, GET /object_info and /ws. Prompts
+are "executed" by walking their nodes in order and emitting the same WebSocket
+events ComfyUI sends, with configurable step rates, latencies and failure
+injection.
+
+Run from the backend directory:
+
+    python -m loadtest.fake_comfyui --port 8189 --parallelism 4 --steps 20 --step-rate 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
+
+SAMPLER_CLASS_TYPES = {"KSampler", "KSamplerAdvanced"}
+FAKE_CHECKPOINT = "fake-model.safetensors"
+_HISTORY_LIMIT = 10000
+
+
+@dataclass
+class FakeComfyUIConfig:
+    # Simultaneous prompts; real ComfyUI executes one at a time.
+    parallelism: int = 1
+    # Sampler nodes report `steps` progress events at `step_rate` steps per second.
+    steps: int = 20
+    step_rate: float = 50.0
+    # Time spent in every non-sampler node.
+    node_latency_ms: float = 5.0
+    # Delay before /api/prompt answers.
+    submit_latency_ms: float = 0.0
+    # Fraction of /api/prompt calls answered with HTTP 500.
+    submit_failure_rate: float = 0.0
+    # Fraction of prompts that end in execution_error at a random node.
+    execution_failure_rate: float = 0.0
+    # Size of the binary JPEG preview frame sent after every sampler step; 0 sends none.
+    preview_bytes: int = 0
+    seed: int | None = None
+
+
+def build_fake_workflow(node_count: int, *, task_info_node: bool = True) -> dict:
+    """A valid API-format chain: checkpoint loader -> samplers -> SaveImage."""
+    node_count = max(2, node_count)
+    workflow: dict[str, dict] = {
+        "1": {
+            "class_type": "CheckpointLoaderSimple",
+            "inputs": {"ckpt_name": FAKE_CHECKPOINT},
+            "_meta": {"title": "Load Checkpoint"},
+        }
+    }
+    for index in range(2, node_count):
+        workflow[str(index)] = {
+            "class_type": "KSampler",
+            "inputs": {"model": [str(index - 1), 0], "seed": index, "steps": 20, "cfg": 7.0},
+            "_meta": {"title": f"Sampler {index}"},
+        }
+    workflow[str(node_count)] = {
+        "class_type": "SaveImage",
+        "inputs": {"images": [str(node_count - 1), 0], "filename_prefix": "loadtest"},
+        "_meta": {"title": "Save Image"},
+    }
+    if task_info_node:
+        workflow[str(node_count + 1)] = {
+            "class_type": "GetTaskInfoNode",
+            "inputs": {"task_id": ""},
+            "_meta": {"title": "Task Info"},
+        }
+    return workflow
+
+
+def fake_object_info() -> dict:
+    return {
+        "CheckpointLoaderSimple": {
+            "input": {"required": {"ckpt_name": [[FAKE_CHECKPOINT]]}},
+            "output": ["MODEL"],
+            "output_node": False,
+        },
+        "KSampler": {
+            "input": {"required": {"model": ["MODEL"], "seed": ["INT"], "steps": ["INT"], "cfg": ["FLOAT"]}},
+            "output": ["MODEL"],
+            "output_node": False,
+        },
+        "SaveImage": {
+            "input": {"required": {"images": ["MODEL"], "filename_prefix": ["STRING"]}},
+            "output": [],
+            "output_node": True,
+        },
+        "GetTaskInfoNode": {
+            "input": {"required": {"task_id": ["STRING"]}},
+            "output": ["STRING"],
+            "output_node": False,
+        },
+    }
+
+
+# ──────────────────────────────────────────────
+# Server State
+# ──────────────────────────────────────────────
+
+
+@dataclass
+class _QueuedPrompt:
+    number: int
+    prompt_id: str
+    client_id: str
+    prompt: dict
+    interrupted: bool = False
+
+
+@dataclass
+class FakeComfyUI:
+    config: FakeComfyUIConfig
+    rng: random.Random = field(init=False)
+    pending: OrderedDict[str, _QueuedPrompt] = field(default_factory=OrderedDict)
+    running: dict[str, _QueuedPrompt] = field(default_factory=dict)
+    history: OrderedDict[str, dict] = field(default_factory=OrderedDict)
+    clients: dict[str, set[WebSocket]] = field(default_factory=dict)
+    counter: int = 0
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+
+    def __post_init__(self) -> None:
+        self.rng = random.Random(self.config.seed)
+        self._work: asyncio.Event | None = None
+        self._workers: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        self._work = asyncio.Event()
+        for _ in range(max(1, self.config.parallelism)):
+            self._workers.append(asyncio.get_running_loop().create_task(self._worker()))
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def enqueue(self, prompt: dict, client_id: str) -> _QueuedPrompt:
+        self.counter += 1
+        self.submitted += 1
+        item = _QueuedPrompt(number=self.counter, prompt_id=str(uuid.uuid4()), client_id=client_id, prompt=prompt)
+        self.pending[item.prompt_id] = item
+        if self._work is not None:
+            self._work.set()
+        return item
+
+    def queue_snapshot(self) -> dict:
+        def entry(item: _QueuedPrompt) -> list:
+            return [item.number, item.prompt_id, {}, {"client_id": item.client_id}, []]
+
+        return {
+            "queue_running": [entry(item) for item in self.running.values()],
+            "queue_pending": [entry(item) for item in self.pending.values()],
+        }
+
+    async def send(self, client_id: str | None, event_type: str, data: dict) -> None:
+        text = json.dumps({"type": event_type, "data": data})
+        targets = self.clients.get(client_id, set()) if client_id else set().union(*self.clients.values())
+        for websocket in list(targets):
+            try:
+                await websocket.send_text(text)
+            except Exception:
+                targets.discard(websocket)
+
+    async def send_preview(self, client_id: str) -> None:
+        # PREVIEW_IMAGE frame: event type 1, image format 1 (JPEG), then the image bytes.
+        body = b"\xff\xd8" + bytes(max(self.config.preview_bytes - 4, 0)) + b"\xff\xd9"
+        frame = (1).to_bytes(4, "big") + (1).to_bytes(4, "big") + body
+        for websocket in list(self.clients.get(client_id, set())):
+            try:
+                await websocket.send_bytes(frame)
+            except Exception:
+                self.clients.get(client_id, set()).discard(websocket)
+
+    async def broadcast_status(self) -> None:
+        remaining = len(self.pending) + len(self.running)
+        await self.send(None, "status", {"status": {"exec_info": {"queue_remaining": remaining}}})
+
+    async def _worker(self) -> None:
+        while True:
+            if not self.pending:
+                self._work.clear()
+                await self._work.wait()
+                continue
+            _, item = self.pending.popitem(last=False)
+            self.running[item.prompt_id] = item
+            try:
+                await self._execute(item)
+            finally:
+                self.running.pop(item.prompt_id, None)
+                await self.broadcast_status()
+
+    async def _execute(self, item: _QueuedPrompt) -> None:
+        config = self.config
+        prompt_id = item.prompt_id
+        started = time.time()
+        await self.send(item.client_id, "execution_start", {"prompt_id": prompt_id, "timestamp": int(started * 1000)})
+        await self.send(item.client_id, "execution_cached", {"prompt_id": prompt_id, "nodes": []})
+        node_ids = [node_id for node_id, node in item.prompt.items() if isinstance(node, dict)]
+        failing_node = (
+            self.rng.choice(node_ids) if node_ids and self.rng.random() < config.execution_failure_rate else None
+        )
+        outputs: dict[str, dict] = {}
+        for node_id in node_ids:
+            if item.interrupted:
+                await self.send(item.client_id, "execution_interrupted", {"prompt_id": prompt_id, "node_id": node_id})
+                self._record_history(item, "error", outputs, started)
+                return
+            class_type = str(item.prompt[node_id].get("class_type") or "")
+            await self.send(item.client_id, "executing", {"node": node_id, "prompt_id": prompt_id})
+            if class_type in SAMPLER_CLASS_TYPES:
+                step_seconds = 1 / config.step_rate if config.step_rate > 0 else 0.0
+                for step in range(1, config.steps + 1):
+                    await asyncio.sleep(step_seconds)
+                    await self.send(
+                        item.client_id,
+                        "progress",
+                        {"value": step, "max": config.steps, "prompt_id": prompt_id, "node": node_id},
+                    )
+                    if config.preview_bytes > 0:
+                        await self.send_preview(item.client_id)
+            else:
+                await asyncio.sleep(config.node_latency_ms / 1000)
+            if node_id == failing_node:
+                self.failed += 1
+                await self.send(
+                    item.client_id,
+                    "execution_error",
+                    {
+                        "prompt_id": prompt_id,
+                        "node_id": node_id,
+                        "node_type": class_type,
+                        "exception_message": "Injected failure",
+                        "exception_type": "RuntimeError",
+                    },
+                )
+                self._record_history(item, "error", outputs, started)
+                return
+            if class_type == "SaveImage":
+                output = {"images": [{"filename": f"{prompt_id}.png", "subfolder": "", "type": "output"}]}
+                outputs[node_id] = output
+                await self.send(item.client_id, "executed", {"node": node_id, "output": output, "prompt_id": prompt_id})
+        await self.send(item.client_id, "executing", {"node": None, "prompt_id": prompt_id})
+        await self.send(item.client_id, "execution_success", {"prompt_id": prompt_id})
+        self.completed += 1
+        self._record_history(item, "success", outputs, started)
+
+    def _record_history(self, item: _QueuedPrompt, status_str: str, outputs: dict, started: float) -> None:
+        self.history[item.prompt_id] = {
+            "prompt": [item.number, item.prompt_id, {}, {"client_id": item.client_id}, []],
+            "outputs": outputs,
+            "status": {"status_str": status_str, "completed": status_str == "success", "messages": []},
+            "meta": {"duration_ms": round((time.time() - started) * 1000, 1)},
+        }
+        while len(self.history) > _HISTORY_LIMIT:
+            self.history.popitem(last=False)
+
+
+# ──────────────────────────────────────────────
+# App
+# ──────────────────────────────────────────────
+
+
+def create_fake_comfyui_app(config: FakeComfyUIConfig | None = None) -> FastAPI:
+    server = FakeComfyUI(config or FakeComfyUIConfig())
+    object_info_body = json.dumps(fake_object_info()).encode("utf-8")
+    object_info_etag = f'"{hashlib.sha256(object_info_body).hexdigest()[:16]}"'
+
+    app = FastAPI(title="Fake ComfyUI")
+    app.state.fake = server
+
+    @app.on_event("startup")
+    async def _startup() -> None:
+        server.start()
+
+    @app.on_event("shutdown")
+    async def _shutdown() -> None:
+        await server.stop()
+
+    @app.post("/api/prompt")
+    @app.post("/prompt")
+    async def submit_prompt(request: Request) -> JSONResponse:
+        if server.config.submit_latency_ms > 0:
+            await asyncio.sleep(server.config.submit_latency_ms / 1000)
+        if server.rng.random() < server.config.submit_failure_rate:
+            return JSONResponse({"error": {"type": "injected", "message": "Injected submit failure"}}, status_code=500)
+        payload = await request.json()
+        prompt = payload.get("prompt")
+        if not isinstance(prompt, dict) or not prompt:
+            return JSONResponse({"error": {"type": "prompt_no_outputs", "message": "Prompt is empty"}}, status_code=400)
+        item = server.enqueue(prompt, str(payload.get("client_id") or ""))
+        await server.broadcast_status()
+        return JSONResponse({"prompt_id": item.prompt_id, "number": item.number, "node_errors": {}})
+
+    @app.get("/queue")
+    async def get_queue() -> dict:
+        return server.queue_snapshot()
+
+    @app.post("/queue")
+    async def post_queue(request: Request) -> Response:
+        payload = await request.json()
+        if payload.get("clear"):
+            server.pending.clear()
+        for prompt_id in payload.get("delete") or []:
+            server.pending.pop(str(prompt_id), None)
+        return Response(status_code=200)
+
+    @app.post("/interrupt")
+    async def interrupt() -> Response:
+        for item in server.running.values():
+            item.interrupted = True
+        return Response(status_code=200)
+
+    @app.get("/history")
+    async def get_history(max_items: int | None = None) -> dict:
+        items = list(server.history.items())
+        if max_items is not None:
+            items = items[-max_items:]
+        return dict(items)
+
+    @app.get("/history/{prompt_id}")
+    async def get_prompt_history(prompt_id: str) -> dict:
+        entry = server.history.get(prompt_id)
+        return {prompt_id: entry} if entry is not None else {}
+
+    @app.get("/object_info")
+    async def object_info(request: Request) -> Response:
+        if request.headers.get("if-none-match") == object_info_etag:
+            return Response(status_code=304, headers={"ETag": object_info_etag})
+        return Response(object_info_body, media_type="application/json", headers={"ETag": object_info_etag})
+
+    @app.get("/stats")
+    async def stats() -> dict:
+        return {
+            "submitted": server.submitted,
+            "completed": server.completed,
+            "failed": server.failed,
+            "pending": len(server.pending),
+            "running": len(server.running),
+            "ws_clients": sum(len(sockets) for sockets in server.clients.values()),
+        }
+
+    @app.websocket("/ws")
+    async def websocket_endpoint(websocket: WebSocket) -> None:
+        client_id = websocket.query_params.get("clientId") or uuid.uuid4().hex
+        await websocket.accept()
+        server.clients.setdefault(client_id, set()).add(websocket)
+        try:
+            remaining = len(server.pending) + len(server.running)
+            await websocket.send_text(
+                json.dumps({"type": "status", "data": {"status": {"exec_info": {"queue_remaining": remaining}}, "sid": client_id}})
+            )
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sockets = server.clients.get(client_id)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    server.clients.pop(client_id, None)
+
+    return app
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeComfyUIConfig()
+    parser.add_argument("--parallelism", type=int, default=defaults.parallelism)
+    parser.add_argument("--steps", type=int, default=defaults.steps)
+    parser.add_argument("--step-rate", type=float, default=defaults.step_rate, help="sampler steps per second")
+    parser.add_argument("--node-latency-ms", type=float, default=defaults.node_latency_ms)
+    parser.add_argument("--submit-latency-ms", type=float, default=defaults.submit_latency_ms)
+    parser.add_argument("--submit-failure-rate", type=float, default=defaults.submit_failure_rate)
+    parser.add_argument("--execution-failure-rate", type=float, default=defaults.execution_failure_rate)
+    parser.add_argument("--preview-bytes", type=int, default=defaults.preview_bytes, help="binary preview per step")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeComfyUIConfig:
+    return FakeComfyUIConfig(
+        parallelism=args.parallelism,
+        steps=args.steps,
+        step_rate=args.step_rate,
+        node_latency_ms=args.node_latency_ms,
+        submit_latency_ms=args.submit_latency_ms,
+        submit_failure_rate=args.submit_failure_rate,
+        execution_failure_rate=args.execution_failure_rate,
+        preview_bytes=args.preview_bytes,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8189)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_fake_comfyui_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+End-to-end load test: create -> execute -> WS progress -> callbacks -> completion.
+
+Start the backend first (for example `uvicorn app.main:app --port 8000`), then
+run from the backend directory:
+
+    python -m loadtest.harness --tasks 2000 --concurrency 200 --fake-port 8189
+
+With --fake-port the harness serves a fake ComfyUI in-process and registers it as
+the backend's only endpoint for the run; the previous endpoint registry is put
+back when the run ends. Use --comfy-host/--comfy-port with --no-fake to point
+at a fake ComfyUI started separately. Throughput, per-stage p50/p99 latencies, and
+the backend's memory and DB query growth (scraped from /metrics) are reported.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import httpx
+import websockets
+
+from loadtest.fake_comfyui import add_config_arguments, build_fake_workflow, config_from_args, create_fake_comfyui_app
+
+STAGES = ("create", "execute", "first_progress", "completion", "callbacks", "total")
+
+
+@dataclass
+class TaskOutcome:
+    status: str = "pending"
+    error: str | None = None
+    event_count: int = 0
+    preview_count: int = 0
+    stage_ms: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class LoadTestOptions:
+    api_base_url: str
+    comfy_host: str
+    comfy_port: int
+    tasks: int
+    concurrency: int
+    nodes: int
+    subtasks: int
+    images_per_subtask: int
+    timeout_seconds: float
+    token: str | None
+    previews: bool = False
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _parse_metrics(text: str) -> dict[str, float]:
+    """Sum every sample of each metric name across label sets."""
+    totals: dict[str, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name_and_labels, _, value = line.rpartition(" ")
+        name = name_and_labels.split("{", 1)[0]
+        try:
+            totals[name] = totals.get(name, 0.0) + float(value)
+        except ValueError:
+            continue
+    return totals
+
+
+async def _scrape_metrics(client: httpx.AsyncClient) -> dict[str, float]:
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return {}
+    return _parse_metrics(response.text) if response.status_code == 200 else {}
+
+
+def _ws_url(api_base_url: str, task_id: str) -> str:
+    base = api_base_url.rstrip("/")
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://") :]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://") :]
+    return f"{base}/api/v1/execution/ws/{task_id}"
+
+
+# ──────────────────────────────────────────────
+# One Task
+# ──────────────────────────────────────────────
+
+
+async def _run_one(client: httpx.AsyncClient, options: LoadTestOptions, index: int, workflow: dict) -> TaskOutcome:
+    outcome = TaskOutcome()
+    started = time.perf_counter()
+
+    def mark(stage: str, since: float) -> float:
+        now = time.perf_counter()
+        outcome.stage_ms[stage] = (now - since) * 1000
+        return now
+
+    payload = {
+        "title": f"loadtest-{index}",
+        "workflow_json": workflow,
+        "subtasks": [
+            {"platform": "loadtest", "account_name": f"account-{number}", "account_no": f"{index}-{number}"}
+            for number in range(options.subtasks)
+        ],
+    }
+    response = await client.post("/api/v1/tasks", json=payload)
+    if response.status_code != 200:
+        outcome.status, outcome.error = "create_failed", f"HTTP {response.status_code}: {response.text[:200]}"
+        return outcome
+    task = response.json()
+    task_id = task["id"]
+    subtask_ids = [subtask["id"] for subtask in task.get("subtasks", [])]
+    stage_started = mark("create", started)
+
+    # Subscribe before executing so no progress event is missed.
+    ws_url = _ws_url(options.api_base_url, task_id) + ("?previews=true" if options.previews else "")
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        response = await client.post(
+            f"/api/v1/execution/task/{task_id}",
+            json={"server_ip": options.comfy_host, "port": options.comfy_port},
+        )
+        if response.status_code != 200:
+            outcome.status, outcome.error = "execute_failed", f"HTTP {response.status_code}: {response.text[:200]}"
+            return outcome
+        execute_done = mark("execute", stage_started)
+
+        final_status = None
+        deadline = time.monotonic() + options.timeout_seconds
+        while final_status is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                outcome.status, outcome.error = "timeout", "No all_completed before timeout"
+                return outcome
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+            except websockets.ConnectionClosed:
+                outcome.status, outcome.error = "ws_closed", "Backend closed the execution WebSocket"
+                return outcome
+            if isinstance(raw, bytes):
+                outcome.preview_count += 1
+                continue
+            message = json.loads(raw)
+            message_type = message.get("type")
+            if message_type in {"state_sync", "pong"}:
+                continue
+            outcome.event_count += 1
+            if message_type == "progress" and "first_progress" not in outcome.stage_ms:
+                mark("first_progress", execute_done)
+            if message_type == "all_completed":
+                final_status = (message.get("data") or {}).get("status")
+            elif message_type == "listener_error":
+                outcome.status, outcome.error = "listener_error", str((message.get("data") or {}).get("message"))
+                return outcome
+        callbacks_started = mark("completion", execute_done)
+
+    if final_status != "success":
+        outcome.status = final_status or "unknown"
+        return outcome
+
+    # What the ComfyUI output nodes would post back for each subtask.
+    for subtask_id in subtask_ids:
+        images = [
+            {"url": f"https://example.invalid/{task_id}/{subtask_id}/{number}.png", "sort_order": number}
+            for number in range(options.images_per_subtask)
+        ]
+        for path, body in (
+            ("/api/v1/callbacks/subtask-generated-images", {"subtask_id": subtask_id, "images": images}),
+            ("/api/v1/callbacks/subtask-status", {"subtask_id": subtask_id, "status": "success"}),
+        ):
+            response = await client.post(path, json=body)
+            if response.status_code != 200:
+                outcome.status, outcome.error = "callback_failed", f"{path} HTTP {response.status_code}"
+                return outcome
+    mark("callbacks", callbacks_started)
+    mark("total", started)
+    outcome.status = final_status
+    return outcome
+
+
+# ──────────────────────────────────────────────
+# Run and Report
+# ──────────────────────────────────────────────
+
+
+async def _register_endpoint(client: httpx.AsyncClient, options: LoadTestOptions) -> dict:
+    """Make the test ComfyUI the backend's only endpoint; returns the settings to restore afterwards."""
+    response = await client.get("/api/v1/settings/comfyui")
+    response.raise_for_status()
+    previous = response.json()
+    response = await client.put(
+        "/api/v1/settings/comfyui",
+        json={"endpoints": [{"host": options.comfy_host, "port": options.comfy_port}]},
+    )
+    response.raise_for_status()
+    return previous
+
+
+async def _restore_endpoints(client: httpx.AsyncClient, previous: dict) -> None:
+    response = await client.put("/api/v1/settings/comfyui", json=previous)
+    if response.is_error:
+        print(f"WARNING: could not restore the backend's ComfyUI settings ({response.status_code}): {previous}")
+
+
+async def run_load_test(options: LoadTestOptions) -> dict:
+    headers = {"Authorization": f"Bearer {options.token}"} if options.token else {}
+    limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+    workflow = build_fake_workflow(options.nodes)
+    async with httpx.AsyncClient(
+        base_url=options.api_base_url,
+        headers=headers,
+        limits=limits,
+        timeout=httpx.Timeout(options.timeout_seconds),
+    ) as client:
+        previous_settings = await _register_endpoint(client, options)
+        try:
+            before = await _scrape_metrics(client)
+            semaphore = asyncio.Semaphore(options.concurrency)
+
+            async def guarded(index: int) -> TaskOutcome:
+                async with semaphore:
+                    try:
+                        return await _run_one(client, options, index, workflow)
+                    except Exception as exc:
+                        return TaskOutcome(status="error", error=f"{type(exc).__name__}: {exc}")
+
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*[guarded(index) for index in range(options.tasks)])
+            elapsed = time.perf_counter() - started
+            after = await _scrape_metrics(client)
+        finally:
+            await _restore_endpoints(client, previous_settings)
+
+    statuses = Counter(outcome.status for outcome in outcomes)
+    completed = [outcome for outcome in outcomes if "total" in outcome.stage_ms]
+    report: dict = {
+        "tasks": options.tasks,
+        "concurrency": options.concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_tasks_per_second": round(len(completed) / elapsed, 2) if elapsed > 0 else 0.0,
+        "statuses": dict(statuses),
+        "ws_events_per_task": round(statistics.mean(outcome.event_count for outcome in outcomes), 1) if outcomes else 0,
+        "previews_per_task": round(statistics.mean(outcome.preview_count for outcome in outcomes), 1) if outcomes else 0,
+        "stages_ms": {},
+        "errors": Counter(outcome.error for outcome in outcomes if outcome.error).most_common(5),
+    }
+    for stage in STAGES:
+        values = [outcome.stage_ms[stage] for outcome in outcomes if stage in outcome.stage_ms]
+        if values:
+            report["stages_ms"][stage] = {
+                "p50": round(_percentile(values, 0.5), 1),
+                "p99": round(_percentile(values, 0.99), 1),
+                "max": round(max(values), 1),
+            }
+    if before and after:
+        report["backend"] = {
+            "rss_growth_mb": round(
+                (after.get("process_resident_memory_bytes", 0) - before.get("process_resident_memory_bytes", 0))
+                / (1024 * 1024),
+                1,
+            ),
+            "rss_mb": round(after.get("process_resident_memory_bytes", 0) / (1024 * 1024), 1),
+            "db_queries": int(
+                after.get("db_query_duration_seconds_count", 0) - before.get("db_query_duration_seconds_count", 0)
+            ),
+            "db_queries_per_task": round(
+                (after.get("db_query_duration_seconds_count", 0) - before.get("db_query_duration_seconds_count", 0))
+                / max(1, options.tasks),
+                1,
+            ),
+            "http_requests": int(
+                after.get("http_request_duration_seconds_count", 0)
+                - before.get("http_request_duration_seconds_count", 0)
+            ),
+        }
+    return report
+
+
+def _print_report(report: dict) -> None:
+    print(
+        f"{report['tasks']} tasks, concurrency {report['concurrency']}: "
+        f"{report['elapsed_seconds']}s, {report['throughput_tasks_per_second']} tasks/s"
+    )
+    print(
+        f"  statuses: {report['statuses']}  ws events/task: {report['ws_events_per_task']}"
+        f"  previews/task: {report['previews_per_task']}"
+    )
+    for stage, values in report["stages_ms"].items():
+        print(f"  {stage:<14} p50 {values['p50']:9.1f} ms   p99 {values['p99']:9.1f} ms   max {values['max']:9.1f} ms")
+    backend = report.get("backend")
+    if backend:
+        print(
+            f"  backend: rss {backend['rss_mb']} MB (+{backend['rss_growth_mb']} MB), "
+            f"{backend['db_queries']} DB queries ({backend['db_queries_per_task']}/task), "
+            f"{backend['http_requests']} HTTP requests"
+        )
+    for error, count in report["errors"]:
+        print(f"  error x{count}: {error}")
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    options = LoadTestOptions(
+        api_base_url=args.api,
+        comfy_host=args.comfy_host,
+        comfy_port=args.fake_port if not args.no_fake else args.comfy_port,
+        tasks=args.tasks,
+        concurrency=args.concurrency,
+        nodes=args.nodes,
+        subtasks=args.subtasks,
+        images_per_subtask=args.images_per_subtask,
+        timeout_seconds=args.timeout,
+        token=args.token,
+        previews=args.previews,
+    )
+    if args.no_fake:
+        return await run_load_test(options)
+
+    import uvicorn
+
+    fake_app = create_fake_comfyui_app(config_from_args(args))
+    server = uvicorn.Server(
+        uvicorn.Config(fake_app, host=args.comfy_host, port=args.fake_port, log_level="warning", ws_max_size=2**24)
+    )
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if serve_task.done():
+            serve_task.result()
+        await asyncio.sleep(0.05)
+    try:
+        return await run_load_test(options)
+    finally:
+        server.should_exit = True
+        await serve_task
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--api", default="http://127.0.0.1:8000", help="backend base URL")
+    parser.add_argument("--token", default=None, help="bearer token, if the backend requires one")
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--nodes", type=int, default=10, help="workflow size")
+    parser.add_argument("--subtasks", type=int, default=2)
+    parser.add_argument("--images-per-subtask", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-task timeout in seconds")
+    parser.add_argument("--comfy-host", default="127.0.0.1")
+    parser.add_argument("--comfy-port", type=int, default=8189)
+    parser.add_argument("--fake-port", type=int, default=8189)
+    parser.add_argument("--no-fake", action="store_true", help="use an already running ComfyUI or fake")
+    parser.add_argument("--previews", action="store_true", help="subscribe to binary preview frames")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    report = asyncio.run(_main(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()